@@ -1,28 +1,159 @@
 from __future__ import annotations
-import importlib, time, json
-from typing import Dict, List, Tuple
+
+import importlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait as _wait
+from functools import cache, lru_cache
 from pathlib import Path
+
 import yaml
-from analytics.fees import exchange_fee_pct, gas_overhead_usd, network_fee_estimates
+
+from analytics.fees import (
+    exchange_fee_pct,
+    gas_overhead_usd,
+    network_fee_ages,
+    network_fee_estimates,
+)
+from providers import prices_from_quotes
+
 
 def load_config(path="config/feeds.yaml") -> dict:
     with open(path,"r",encoding="utf-8") as f:
         return yaml.safe_load(f)
 
+@cache
 def _load_fn(module_path: str, fn_name: str):
     mod = importlib.import_module(module_path)
     return getattr(mod, fn_name)
 
-def collect_all_prices(symbols: List[str], providers_cfg: dict) -> Dict[str, Dict[str, float]]:
-    book: Dict[str, Dict[str, float]] = {}
-    for name, meta in providers_cfg.items():
-        if not meta.get("enabled", False):
+@cache
+def _quotes_fn(module_path: str, fn_name: str):
+    """Bulk {sym: {bid, ask, last}} fetcher for a provider; plain fetch_prices is wrapped."""
+    mod = importlib.import_module(module_path)
+    fq = getattr(mod, "fetch_quotes", None)
+    if fq is not None:
+        return fq
+    fn = _load_fn(module_path, fn_name)
+    return lambda symbols: {s: {"bid": None, "ask": None, "last": p}
+                            for s, p in (fn(symbols) or {}).items()}
+
+# Providers run concurrently under one cycle deadline. A provider that misses it
+# is reported as late and its last good quotes are reused (rows marked stale); its
+# call keeps running and is not resubmitted until it returns (unless the symbol
+# list changed), so a hung provider holds at most one worker. A call carried over
+# from an earlier cycle is stale even if it lands in time. Stale rows are shown
+# but never picked as a route leg.
+COLLECT_DEADLINE_S = float(os.getenv("ARB_COLLECT_DEADLINE", "8"))
+_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("ARB_PROVIDER_WORKERS", "8")),
+                           thread_name_prefix="provider")
+# name -> (call, submitted, symbols)
+_INFLIGHT: dict[str, tuple[Future, float, tuple[str, ...]]] = {}
+_LAST: dict[str, tuple[float, dict[str, dict]]] = {}      # name -> (ts, quotes) of last good run
+_LOCK = threading.Lock()
+
+def _run_provider(name: str, fn, symbols: list[str]):
+    quotes = fn(symbols)
+    if quotes:
+        with _LOCK:
+            _LAST[name] = (time.time(), quotes)
+    return quotes
+
+def collect_quotes(symbols: list[str], providers_cfg: dict, deadline: float | None = None
+                   ) -> tuple[dict[str, dict[str, dict]], dict[str, float]]:
+    """
+    (book, late): book is {provider: {symbol: {"bid", "ask", "last"}}} from everyone who
+    finished within `deadline` seconds, plus the last good quotes of those who did not;
+    late maps each of the latter to the age (s) of the quotes used, or None if there were none.
+    """
+    deadline = COLLECT_DEADLINE_S if deadline is None else deadline
+    cycle = time.time()
+    want = tuple(symbols)
+    futs: dict[str, tuple[Future, float]] = {}
+    with _LOCK:
+        for name, meta in providers_cfg.items():
+            if not meta.get("enabled", False):
+                continue
+            f, submitted, syms = _INFLIGHT.get(name, (None, 0.0, ()))
+            if f is None or f.done() or syms != want:
+                fn = _quotes_fn(meta["module"], meta["fn"])
+                f = _POOL.submit(_run_provider, name, fn, list(symbols))
+                submitted = cycle
+                _INFLIGHT[name] = (f, submitted, want)
+            futs[name] = (f, submitted)
+    _wait([f for f, _ in futs.values()], timeout=deadline)
+    book: dict[str, dict[str, dict]] = {}
+    late: dict[str, float] = {}
+    now = time.time()
+    for name, (f, submitted) in futs.items():
+        quotes = None
+        if f.done() and submitted < cycle:      # carried over from an earlier cycle
+            try:
+                quotes = f.result()
+            except Exception:
+                quotes = None
+            late[name] = now - submitted
+        elif f.done():
+            try:
+                quotes = f.result()
+            except Exception:
+                quotes = None
+        else:
+            ts, quotes = _LAST.get(name, (None, None))
+            late[name] = (now - ts) if ts else None
+        if quotes:
+            book[name] = quotes
+    return book, late
+
+def collect_prices(symbols: list[str], providers_cfg: dict, deadline: float | None = None
+                   ) -> tuple[dict[str, dict[str, float]], dict[str, float]]:
+    """collect_quotes reduced to {provider: {symbol: price}} (last, else mid)."""
+    quotes, late = collect_quotes(symbols, providers_cfg, deadline)
+    book = {name: prices_from_quotes(q) for name, q in quotes.items()}
+    return {k: v for k, v in book.items() if v}, late
+
+def collect_all_prices(symbols: list[str], providers_cfg: dict) -> dict[str, dict[str, float]]:
+    return collect_prices(symbols, providers_cfg)[0]
+
+def _store_quotes(store, symbols: list[str], max_age=None) -> dict[str, dict[str, dict]]:
+    out: dict[str, dict[str, dict]] = {}
+    for venue in sorted({q.venue for q in store.snapshot(max_age)}):
+        for s in symbols:
+            # Providers price USD symbols off stablecoin books where needed; mirror that.
+            q = store.get(venue, s, max_age, alias_quote=True)
+            if q is not None and q.price is not None:
+                out.setdefault(venue, {})[s] = {"bid": q.bid, "ask": q.ask, "last": q.last,
+                                                "quote": q.symbol.split("/")[1]}
+    return out
+
+def _to_symbol_quote(quotes: dict[str, dict[str, dict]]) -> dict[str, dict[str, dict]]:
+    """
+    Quotes priced off a stand-in book ("quote": "USDT" for a USD symbol) converted
+    into the symbol's own quote with quote_fx, so no USDT/USD basis shows up as an edge.
+    """
+    import numpy as np
+
+    from quote_fx import QUOTE_FX, default_fx
+    from symbol_registry import canonical
+    todo = [(ex, s, q["quote"], canonical(s).split("/")[1]) for ex, m in quotes.items()
+            for s, q in m.items() if q.get("quote") and q["quote"] != canonical(s).split("/")[1]]
+    if not todo:
+        return quotes
+    fx = default_fx()
+    if QUOTE_FX:
+        fx.refresh(sorted({ex for ex, _, _, _ in todo}))
+    exs, syms, frm, to = zip(*todo, strict=True)
+    out = {ex: dict(m) for ex, m in quotes.items()}
+    for ex, s, k, to_q in zip(exs, syms, fx.factors(exs, frm, to=list(to)), to, strict=True):
+        q = quotes[ex][s]
+        if not np.isfinite(k):          # no rate for that quote: not comparable
+            out[ex].pop(s, None)
             continue
-        fn = _load_fn(meta["module"], meta["fn"])
-        prices = fn(symbols)
-        if prices:
-            book[name] = prices
-    return book
+        out[ex][s] = {**{f: float(q[f] * k) if q.get(f) else q.get(f)
+                         for f in ("bid", "ask", "last")}, "quote": to_q}
+    return out
 
 def effective_price(raw: float, ex_name: str, sym: str, taker=True) -> float:
     pct = exchange_fee_pct(ex_name, taker=taker)
@@ -31,38 +162,87 @@ def effective_price(raw: float, ex_name: str, sym: str, taker=True) -> float:
     # we'll return a tuple in caller
     return pct, gas
 
-def analyze(symbols: List[str], providers_cfg: dict, notional=10_000.0):
-    prices = collect_all_prices(symbols, providers_cfg)
-    gas_live = network_fee_estimates()  # override gas if available
-    metrics: Dict[str, Tuple[float,bool]] = {}
+# Depth-aware edge (ARB_DEPTH_EDGE=1): the best route per symbol is also filled
+# against both venues' L2 books over a notional ladder (executable_edge), giving
+# the executable profit at `notional` and the largest size with net edge >= ARB_MIN_EDGE_PCT.
+DEPTH_EDGE = os.getenv("ARB_DEPTH_EDGE", "0") == "1"
+MIN_EDGE_PCT = float(os.getenv("ARB_MIN_EDGE_PCT", "0"))
+
+def _depth_edge(tables: dict, notional: float) -> None:
+    import numpy as np
+    import pandas as pd
+
+    from executable_edge import executable_routes, geometric_ladder
+    routes = pd.DataFrame([{"symbol": s, "buy_ex": t["best_buy_ex"], "sell_ex": t["best_sell_ex"]}
+                           for s, t in tables.items() if t["best_buy_ex"] != t["best_sell_ex"]],
+                          columns=["symbol", "buy_ex", "sell_ex"])
+    ladder = np.unique(np.append(geometric_ladder(100.0, notional * 10), notional))
+    ex = executable_routes(routes, ladder, min_edge_pct=MIN_EDGE_PCT)
+
+    def f(v):
+        return None if pd.isna(v) else float(v)
+
+    for sym, g in ex.groupby("symbol"):
+        at = g[g["notional"] == notional].iloc[0]
+        tables[sym]["executable"] = {"notional": notional, "net_usd": f(at["net_usd"]),
+                                     "net_pct": f(at["net_pct"]), "buy_vwap": f(at["buy_vwap"]),
+                                     "sell_vwap": f(at["sell_vwap"]),
+                                     "max_notional": f(at["max_notional"]),
+                                     "min_edge_pct": MIN_EDGE_PCT}
+
+def _venue_rows(sym: str, prices: dict, quotes: dict, gas_live: dict, late: dict) -> list[dict]:
+    # build per-provider effective buy/sell
+    rows = []
+    for ex, mapping in prices.items():
+        if sym not in mapping: continue
+        raw = mapping[sym]
+        q = quotes[ex][sym]
+        bid, ask = q.get("bid") or raw, q.get("ask") or raw   # cross the real spread when quoted
+        pct_taker = exchange_fee_pct(ex, taker=True)
+        pct_maker = exchange_fee_pct(ex, taker=False)
+        gas = gas_live.get(sym, gas_overhead_usd(sym))
+        buy_eff  = ask * (1 + pct_taker) + gas  # assume taker buy at the ask
+        sell_eff = bid * (1 - pct_taker) - gas  # assume taker sell at the bid
+        rows.append({
+            "exchange": ex,
+            "raw": raw,
+            "bid": q.get("bid"),
+            "ask": q.get("ask"),
+            "buy_eff": buy_eff,
+            "sell_eff": sell_eff,
+            "pct_taker": pct_taker,
+            "gas_usd": gas,
+            "stale": ex in late,
+        })
+    return rows
+
+def analyze(symbols: list[str], providers_cfg: dict, notional=10_000.0, store=None, max_age=None):
+    """
+    `store` (a feeds.quote_store.QuoteStore fed by the stream aggregator) replaces
+    polling the providers; quotes older than `max_age` seconds are ignored.
+    """
+    late: dict[str, float] = {}
+    if store is not None:
+        quotes = _store_quotes(store, symbols, max_age)
+    else:
+        quotes, late = collect_quotes(symbols, providers_cfg)
+    quotes = _to_symbol_quote(quotes)
+    prices = {ex: p for ex, p in ((ex, prices_from_quotes(q)) for ex, q in quotes.items()) if p}
+    gas_live = network_fee_estimates()  # override gas if available (blocks only on a cold cache)
+    gas_age = network_fee_ages()
+    metrics: dict[str, tuple[float,bool]] = {}
     tables = {}  # per-symbol breakdown
 
     for sym in symbols:
-        # build per-provider effective buy/sell
-        rows = []
-        for ex, mapping in prices.items():
-            if sym not in mapping: continue
-            raw = mapping[sym]
-            pct_taker = exchange_fee_pct(ex, taker=True)
-            pct_maker = exchange_fee_pct(ex, taker=False)
-            gas = gas_live.get(sym, gas_overhead_usd(sym))
-            buy_eff  = raw * (1 + pct_taker) + gas  # assume taker buy
-            sell_eff = raw * (1 - pct_taker) - gas  # assume taker sell
-            rows.append({
-                "exchange": ex,
-                "raw": raw,
-                "buy_eff": buy_eff,
-                "sell_eff": sell_eff,
-                "pct_taker": pct_taker,
-                "gas_usd": gas,
-            })
-
-        if len(rows) < 2:
+        rows = _venue_rows(sym, prices, quotes, gas_live, late)
+
+        fresh = [r for r in rows if not r["stale"]]   # late providers are shown, not traded
+        if len(fresh) < 2:
             continue
 
         # best route
-        best_buy  = min(rows, key=lambda r: r["buy_eff"])
-        best_sell = max(rows, key=lambda r: r["sell_eff"])
+        best_buy  = min(fresh, key=lambda r: r["buy_eff"])
+        best_sell = max(fresh, key=lambda r: r["sell_eff"])
         spread_abs = best_sell["sell_eff"] - best_buy["buy_eff"]
         spread_pct = spread_abs / best_buy["buy_eff"] if best_buy["buy_eff"] else 0.0
         gross = notional * spread_pct
@@ -77,8 +257,23 @@ def analyze(symbols: List[str], providers_cfg: dict, notional=10_000.0):
             "rows": rows,
             "spread_abs": spread_abs,
             "spread_pct": spread_pct,
+            "gas_source": "live" if sym in gas_live else "config",
+            "gas_age_s": gas_age.get(sym),
+            "late_providers": sorted(r["exchange"] for r in rows if r["stale"]),
         }
 
+    if DEPTH_EDGE and tables:
+        try:
+            _depth_edge(tables, notional)
+        except Exception:
+            pass    # books unavailable: keep the top-of-book metrics
+        for sym, t in tables.items():
+            ex = t.get("executable")
+            if ex and ex["net_usd"] is not None:
+                metrics[f"{sym} Exec Profit @${int(notional)} (depth)"] = (ex["net_usd"], False)
+            if ex and ex["max_notional"] is not None:
+                metrics[f"{sym} Max Size @{MIN_EDGE_PCT:g}% (USD)"] = (ex["max_notional"], False)
+
     # persist history for plots
     tdir = Path("logs/feeds"); tdir.mkdir(parents=True, exist_ok=True)
     Path("logs/feeds/last_prices.json").write_text(json.dumps(prices, indent=2), encoding="utf-8")
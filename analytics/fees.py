@@ -1,7 +1,16 @@
-import os, httpx, yaml
-from typing import Dict
+import json
+import os
+import threading
+import time
+from pathlib import Path
 
-def load_fee_overrides() -> Dict:
+import yaml
+
+import http_pool
+from fee_schedule import schedule
+
+
+def load_fee_overrides() -> dict:
     try:
         with open("config/fees.yaml","r",encoding="utf-8") as f:
             return yaml.safe_load(f) or {}
@@ -9,47 +18,156 @@ def load_fee_overrides() -> Dict:
         return {}
 
 def exchange_fee_pct(name: str, taker: bool=True) -> float:
-    ovr = load_fee_overrides().get("exchanges",{}).get(name.lower(),{})
-    key = "taker_pct" if taker else "maker_pct"
-    if key in ovr:
-        return float(ovr[key])
-    # fallback to defaults
-    import yaml
-    base = yaml.safe_load(open("config/feeds.yaml","r",encoding="utf-8").read())
-    dflt = float(base.get("fees",{}).get("taker_pct_default" if taker else "maker_pct_default", 0.002))
-    return dflt
+    # fees.yaml override -> fees_config.json -> feeds.yaml default, compiled once per config change
+    return schedule().fee(name, "taker" if taker else "maker")
 
 def gas_overhead_usd(sym: str) -> float:
-    import yaml
-    base = yaml.safe_load(open("config/feeds.yaml","r",encoding="utf-8").read())
-    return float(base.get("fees",{}).get("gas_overhead_usd",{}).get(sym, 0.0))
+    return schedule().gas_usd(sym)
+
+# ---- network (gas) fee estimates ----
+# Each upstream source is cached with its own TTL. Reads never block: they return
+# the last good value and, when it is past its TTL, kick a background refresh
+# (stale-while-revalidate). Both coins are priced with one batched CoinGecko call.
+# Values and fetch times persist to NETFEE_CACHE_PATH, so a fresh process (each
+# orchestrate_arbitrage run) starts from the last run's estimates.
+
+NETFEE_TIMEOUT = float(os.getenv("NETFEE_TIMEOUT", "5"))
+NETFEE_TTL = {                          # seconds
+    "mempool": float(os.getenv("NETFEE_TTL_MEMPOOL", "60")),
+    "rippled": float(os.getenv("NETFEE_TTL_RIPPLED", "300")),
+    "prices":  float(os.getenv("NETFEE_TTL_PRICES", "60")),
+}
+_GECKO_IDS = {"bitcoin": "BTC-USD", "ripple": "XRP-USD"}
+BTC_TX_VBYTES = 140                     # crude tx size
+NETFEE_CACHE_PATH = os.getenv("NETFEE_CACHE_PATH", "data/cache/netfees.json")
+
+def _src_mempool():
+    d = http_pool.get("https://mempool.space/api/v1/fees/recommended",
+                      timeout=NETFEE_TIMEOUT).json()
+    return float(d.get("halfHourFee") or d.get("fastestFee"))            # sat/vB
+
+def _src_rippled():
+    r = http_pool.post("https://s1.ripple.com:51234/", json={"method": "fee", "params": [{}]},
+                       timeout=NETFEE_TIMEOUT)
+    return int(r.json()["result"]["drops"]["open_ledger_fee"]) / 1_000_000  # XRP per tx
+
+def _src_prices():
+    d = http_pool.get("https://api.coingecko.com/api/v3/simple/price",
+                      params={"ids": ",".join(_GECKO_IDS), "vs_currencies": "usd"},
+                      timeout=NETFEE_TIMEOUT).json()
+    return {sym: float(d[gid]["usd"]) for gid, sym in _GECKO_IDS.items() if gid in d}
+
+_SOURCES = {"mempool": _src_mempool, "rippled": _src_rippled, "prices": _src_prices}
+
+class NetworkFeeCache:
+    def __init__(self, sources=None, ttl=None, path: str | None = NETFEE_CACHE_PATH):
+        self.sources = sources or _SOURCES
+        self.ttl = ttl or NETFEE_TTL
+        self.path = Path(path) if path else None
+        self.values: dict[str, object] = {}
+        self.fetched: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+        self._inflight: set = set()
+        self._lock = threading.Lock()
+        self._load()
+
+    # ---- persistence ----
+    def _load(self) -> None:
+        if self.path is None:
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            for name, (val, ts) in data.items():
+                if name in self.sources:
+                    self.values[name], self.fetched[name] = val, float(ts)
+        except Exception:
+            pass
+
+    def _save(self) -> None:
+        # caller holds _lock
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({n: [v, self.fetched[n]] for n, v in self.values.items()}),
+                           encoding="utf-8")
+            tmp.replace(self.path)
+        except Exception:
+            pass
 
-def network_fee_estimates() -> Dict[str, float]:
+    def _refresh(self, name: str) -> None:
+        try:
+            val = self.sources[name]()
+            with self._lock:
+                self.values[name] = val
+                self.fetched[name] = time.time()
+                self.errors.pop(name, None)
+                self._save()
+        except Exception as e:
+            self.errors[name] = str(e)[:160]      # keep serving the last good value
+        finally:
+            with self._lock:
+                self._inflight.discard(name)
+
+    def revalidate(self, wait: float = 0.0) -> None:
+        """Refresh every source past its TTL in the background; optionally wait up to `wait` s."""
+        now = time.time()
+        started = []
+        with self._lock:
+            for name in self.sources:
+                fresh = now - self.fetched.get(name, 0.0) < self.ttl.get(name, 60.0)
+                if name in self._inflight or fresh:
+                    continue
+                self._inflight.add(name)
+                t = threading.Thread(target=self._refresh, args=(name,), name=f"netfee-{name}",
+                                     daemon=True)
+                started.append(t)
+        for t in started:
+            t.start()
+        if wait:
+            for t in started:
+                t.join(max(0.0, wait - (time.time() - now)))
+
+    def cold(self) -> bool:
+        """True while some source has never been fetched (not even by an earlier run)."""
+        return any(name not in self.fetched for name in self.sources)
+
+    def age(self, name: str) -> float | None:
+        ts = self.fetched.get(name)
+        return time.time() - ts if ts else None
+
+    def estimates(self) -> dict[str, float]:
+        v = self.values
+        px = v.get("prices") or {}
+        out = {}
+        if "mempool" in v and "BTC-USD" in px:
+            out["BTC-USD"] = float(v["mempool"] * BTC_TX_VBYTES / 1e8 * px["BTC-USD"])
+        if "rippled" in v and "XRP-USD" in px:
+            out["XRP-USD"] = float(v["rippled"] * px["XRP-USD"])
+        return out
+
+    def ages(self) -> dict[str, float]:
+        """Per-symbol age (s) of the estimate: the older of its fee and price inputs."""
+        src = {"BTC-USD": "mempool", "XRP-USD": "rippled"}
+        out = {}
+        for sym in self.estimates():
+            a, b = self.age(src[sym]), self.age("prices")
+            out[sym] = max(a or 0.0, b or 0.0)
+        return out
+
+NETFEES = NetworkFeeCache()
+
+def network_fee_estimates(wait: float | None = None) -> dict[str, float]:
     """
-    Returns rough network fee in USD for BTC/XRP (best-effort).
+    Returns rough network fee in USD for BTC/XRP (best-effort) from the cache,
+    refreshing stale sources in the background. With wait=None a cold cache waits up
+    to NETFEE_TIMEOUT for the first fetch and a warm one never blocks.
     """
-    out = {}
-    try:
-        r = httpx.get("https://mempool.space/api/v1/fees/recommended", timeout=10)
-        if r.status_code == 200:
-            sats_vb = r.json().get("halfHourFee") or r.json().get("fastestFee")
-            # crude tx size 140 vB, BTCUSD ~ via coingecko
-            px = httpx.get("https://api.coingecko.com/api/v3/simple/price",
-                           params={"ids":"bitcoin","vs_currencies":"usd"}, timeout=10).json()["bitcoin"]["usd"]
-            fee_btc = (sats_vb * 140) / 1e8
-            out["BTC-USD"] = float(fee_btc * px)
-    except Exception:
-        pass
-    try:
-        # XRP network fee (drops), say 12 drops baseline; fetch from rippled public
-        r = httpx.get("https://s1.ripple.com:51234/", json={"method":"fee","params":[{}]}, timeout=10)
-        if r.status_code == 200:
-            d = r.json()["result"]["drops"]["open_ledger_fee"]
-            # 1 XRP = 1,000,000 drops; price via gecko
-            px = httpx.get("https://api.coingecko.com/api/v3/simple/price",
-                           params={"ids":"ripple","vs_currencies":"usd"}, timeout=10).json()["ripple"]["usd"]
-            xrp = int(d)/1_000_000
-            out["XRP-USD"] = float(xrp * px)
-    except Exception:
-        pass
-    return out
+    if wait is None:
+        wait = NETFEE_TIMEOUT if NETFEES.cold() else 0.0
+    NETFEES.revalidate(wait)
+    return NETFEES.estimates()
+
+def network_fee_ages() -> dict[str, float]:
+    return NETFEES.ages()
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Callable, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from fee_schedule import schedule
+from symbol_registry import canonical
+
+# Multi-hop / triangular arbitrage as negative cycles in a rate graph.
+#
+#   nodes   (venue, asset), e.g. ("binance", "USDT")
+#   edges   trade     BASE->QUOTE at bid*(1-taker), QUOTE->BASE at (1-taker)/ask
+#           transfer  (v1, A)->(v2, A) at 1 - withdrawal fee / notional
+#   weight  -log(rate), so a cycle whose rates multiply to > 1 has negative weight
+#
+# Cycles are found with Bellman-Ford from a virtual source, one vectorized
+# relaxation over the dense [n, n] weight matrix per round (O(n^2) each, n rounds
+# at most), which stays well under a refresh interval at a few hundred nodes.
+#
+#   g = build_graph(fetch_graph_quotes(["binance", "kraken"], ["BTC", "ETH", "USD", "USDT"]))
+#   g.cycles()        # DataFrame: path, hops, gain_pct, best first
+
+ASSETS = [a.strip() for a in
+          os.getenv("GRAPH_ASSETS", "BTC,ETH,XRP,SOL,ADA,LTC,USD,USDT,USDC").split(",")]
+FIAT = frozenset({"USD", "EUR", "GBP"})          # not transferable between venues here
+NOTIONAL_USD = float(os.getenv("GRAPH_NOTIONAL_USD", "10000"))
+_EPS = 1e-12
+
+Node = tuple[str, str]
+
+
+class RateGraph:
+    def __init__(self):
+        self.nodes: list[Node] = []
+        self._idx: dict[Node, int] = {}
+        self._edges: dict[tuple[int, int], tuple[float, str]] = {}   # (i, j) -> (rate, label)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def node(self, venue: str, asset: str) -> int:
+        key = (venue, asset)
+        i = self._idx.get(key)
+        if i is None:
+            i = self._idx[key] = len(self.nodes)
+            self.nodes.append(key)
+        return i
+
+    def add_edge(self, src: Node, dst: Node, rate: float, label: str) -> None:
+        """Keep the best rate per (src, dst)."""
+        if not (rate > 0 and np.isfinite(rate)):
+            return
+        i, j = self.node(*src), self.node(*dst)
+        if i != j and rate > self._edges.get((i, j), (0.0, ""))[0]:
+            self._edges[(i, j)] = (rate, label)
+
+    def add_market(self, venue: str, symbol: str, bid, ask, taker: float) -> None:
+        base, quote = canonical(symbol).split("/")
+        if bid:
+            self.add_edge((venue, base), (venue, quote), float(bid) * (1 - taker),
+                          f"sell {base}/{quote}")
+        if ask:
+            self.add_edge((venue, quote), (venue, base), (1 - taker) / float(ask),
+                          f"buy {base}/{quote}")
+
+    def add_transfers(self, usd_px: dict[str, float], notional_usd: float = NOTIONAL_USD,
+                      withdraw: Callable[[str, str], float] | None = None) -> None:
+        """Venue-to-venue moves for every non-fiat asset; withdrawal fee at `notional_usd`."""
+        fs = schedule()
+        withdraw = withdraw or (lambda venue, asset: fs.withdraw_coin(venue, f"{asset}/USD"))
+        by_asset: dict[str, list[str]] = {}
+        for v, a in list(self.nodes):
+            if a not in FIAT:
+                by_asset.setdefault(a, []).append(v)
+        for a, venues in by_asset.items():
+            px = usd_px.get(a)
+            if not px:
+                continue
+            for v1 in venues:
+                rate = 1.0 - withdraw(v1, a) * px / notional_usd
+                for v2 in venues:
+                    if v2 != v1:
+                        self.add_edge((v1, a), (v2, a), rate, f"transfer {a}")
+
+    def weights(self) -> np.ndarray:
+        """[n, n] -log(rate), +inf where there is no edge."""
+        n = len(self.nodes)
+        W = np.full((n, n), np.inf)
+        if self._edges:
+            ij = np.array(list(self._edges), dtype=np.intp)
+            W[ij[:, 0], ij[:, 1]] = -np.log([r for r, _ in self._edges.values()])
+        return W
+
+    def cycles(self, min_gain_pct: float = 0.0, W: np.ndarray | None = None) -> pd.DataFrame:
+        """Profitable cycles (rates multiply to > 1 + min_gain_pct/100), best first."""
+        W = self.weights() if W is None else W
+        cols = ["path", "hops", "gain_pct", "legs"]
+        found = []
+        seen = set()
+        for cyc in negative_cycles(W):
+            key = frozenset(cyc)
+            if key in seen:
+                continue
+            seen.add(key)
+            steps = list(zip(cyc, cyc[1:] + cyc[:1], strict=True))
+            gain = (np.exp(-sum(W[i, j] for i, j in steps)) - 1.0) * 100.0
+            if gain <= min_gain_pct:
+                continue
+            found.append({
+                "path": " -> ".join(f"{self.nodes[i][0]}:{self.nodes[i][1]}"
+                                    for i in cyc + cyc[:1]),
+                "hops": len(cyc), "gain_pct": gain,
+                "legs": [self._edges[(i, j)][1] for i, j in steps],
+            })
+        out = pd.DataFrame(found, columns=cols)
+        return out.sort_values("gain_pct", ascending=False, ignore_index=True) if len(out) else out
+
+
+def _bellman_ford(W: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(pred, still_relaxing) after n rounds from a virtual source joined to every node."""
+    n = len(W)
+    d = np.zeros(n)
+    pred = np.full(n, -1, dtype=np.intp)
+    cols = np.arange(n)
+    upd = np.zeros(n, dtype=bool)
+    for _ in range(n):
+        cand = d[:, None] + W                     # [from, to]
+        frm = cand.argmin(axis=0)
+        best = cand[frm, cols]
+        upd = best < d - _EPS
+        if not upd.any():
+            break
+        d = np.where(upd, best, d)
+        pred = np.where(upd, frm, pred)
+    return pred, upd
+
+
+def negative_cycles(W: np.ndarray) -> list[list[int]]:
+    """Node-index cycles (in traversal order) reachable from the nodes still relaxing."""
+    n = len(W)
+    if n == 0:
+        return []
+    pred, upd = _bellman_ford(W)
+    out, done = [], set()
+    for v in np.flatnonzero(upd):
+        for _ in range(n):                        # step back onto the cycle
+            v = pred[v]
+            if v < 0:
+                break
+        if v < 0 or v in done:
+            continue
+        cyc, u = [v], pred[v]
+        while u != v and u >= 0 and len(cyc) <= n:
+            cyc.append(u)
+            u = pred[u]
+        if u != v:
+            continue
+        done.update(cyc)
+        out.append([int(x) for x in reversed(cyc)])
+    return out
+
+
+def usd_prices(quotes: Iterable[tuple[str, str, float | None, float | None]]) -> dict[str, float]:
+    """Median USD-ish mid per asset from */USD, */USDT and */USDC markets."""
+    mids: dict[str, list[float]] = {}
+    for _, sym, bid, ask in quotes:
+        base, quote = canonical(sym).split("/")
+        if quote in ("USD", "USDT", "USDC") and bid and ask:
+            mids.setdefault(base, []).append((bid + ask) / 2.0)
+    px = {a: float(np.median(v)) for a, v in mids.items()}
+    for q in ("USD", "USDT", "USDC"):
+        px.setdefault(q, 1.0)
+    return px
+
+
+def build_graph(quotes: Sequence[tuple[str, str, float | None, float | None]],
+                fee: Callable[[str, str], float] | None = None, transfers: bool = True,
+                notional_usd: float = NOTIONAL_USD) -> RateGraph:
+    """quotes: (venue, symbol, bid, ask) rows, e.g. from fetch_graph_quotes()."""
+    fs = schedule()
+    fee = fee or (lambda venue, symbol: fs.fee(venue, "taker", symbol))
+    g = RateGraph()
+    for venue, sym, bid, ask in quotes:
+        g.add_market(venue, sym, bid, ask, fee(venue, sym))
+    if transfers:
+        g.add_transfers(usd_prices(quotes), notional_usd)
+    return g
+
+
+def fetch_graph_quotes(venues: Iterable[str], assets: Iterable[str] = ASSETS
+                       ) -> list[tuple[str, str, float | None, float | None]]:
+    """Bid/ask for every listed spot market whose base and quote are both in `assets`."""
+    from exchange_prices import _load, venue_tickers
+    from symbol_registry import get_registry
+    assets = set(assets)
+    reg = get_registry()
+    rows = []
+    for venue, inst in _load(list(venues)).items():
+        reg.ensure(venue, inst)
+        syms = [u for s, u in reg.markets(venue).items() if set(s.split("/")) <= assets]
+        if not syms:
+            continue
+        for u, (t, _, _) in venue_tickers(inst, syms).items():
+            if t and t.get("bid") and t.get("ask"):
+                rows.append((venue, u, t["bid"], t["ask"]))
+    return rows
+
+
+def scan(venues: Iterable[str], assets: Iterable[str] = ASSETS,
+         min_gain_pct: float = 0.0) -> pd.DataFrame:
+    return build_graph(fetch_graph_quotes(venues, assets)).cycles(min_gain_pct)
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from fee_schedule import schedule
+
+# Replay of the history fetch_and_publish.append_history writes:
+#
+#   data/best_edges.csv    best route per symbol per run (older rows: ... edge_pct;
+#                          newer rows: ... gross/fees/net columns, same header line)
+#   data/sym_summary.csv   min/max venue and spread per symbol per run
+#
+# Each best-edge row is a candidate trade. The edge still there when the order
+# lands decays with latency (half-life fitted from sym_summary's spread
+# autocorrelation unless given), taker fees on both legs and the withdrawal come
+# from the fee schedule, and trade size is capped per trade and per run. Every
+# step is a column operation over the whole history; fee lookups touch only the
+# unique (venue, asset) pairs.
+#
+#   res = run_backtest()                      # or run_backtest(load_edges(...), ...)
+#   res.summary                               # pnl_usd, trades, hit_rate, max_drawdown_usd, ...
+#   res.trades / res.equity / res.by_symbol
+
+EDGES_CSV = "data/best_edges.csv"
+SUMMARY_CSV = "data/sym_summary.csv"
+SIZE_USD = float(os.getenv("BT_SIZE_USD", "10000"))          # per trade
+CAPITAL_USD = float(os.getenv("BT_CAPITAL_USD", "50000"))    # per run, shared by that run's trades
+LATENCY_S = float(os.getenv("BT_LATENCY_S", "2"))
+# net edge (at observed prices) to take a trade
+MIN_EDGE_PCT = float(os.getenv("BT_MIN_EDGE_PCT", "0"))
+
+_EDGE_COLS = ["timestamp", "symbol", "buy_ex", "buy", "sell_ex", "sell",
+              "c6", "gross_spread_pct", "fees_usd", "net_spread_usd", "net_spread_pct"]
+
+
+def load_edges(path: str = EDGES_CSV) -> pd.DataFrame:
+    """best_edges.csv as columns: timestamp (UTC), symbol, buy_ex, buy, sell_ex, sell, gross_pct."""
+    raw = pd.read_csv(path, header=None, skiprows=1, names=_EDGE_COLS, engine="c")
+    df = pd.DataFrame({
+        "timestamp": pd.to_datetime(raw["timestamp"], utc=True, format="ISO8601", errors="coerce"),
+        "symbol": raw["symbol"], "buy_ex": raw["buy_ex"], "sell_ex": raw["sell_ex"],
+        "buy": pd.to_numeric(raw["buy"], errors="coerce"),
+        "sell": pd.to_numeric(raw["sell"], errors="coerce"),
+    })
+    # recomputed from prices, so both row formats agree (c6 is edge_pct or gross_spread_usd)
+    df["gross_pct"] = (df["sell"] - df["buy"]) / df["buy"] * 100.0
+    df = df[df["timestamp"].notna() & (df["buy"] > 0) & (df["sell"] > 0)]
+    return df.sort_values("timestamp", kind="stable", ignore_index=True)
+
+
+def load_summary(path: str = SUMMARY_CSV) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True, format="ISO8601", errors="coerce")
+    return df[df["timestamp"].notna()].sort_values("timestamp", kind="stable", ignore_index=True)
+
+
+def fit_half_life(summary: pd.DataFrame, default_s: float = 60.0) -> float:
+    """
+    Edge half-life (s) from the lag-1 autocorrelation of spread_pct between
+    consecutive snapshots of each symbol: rho = 0.5 ** (dt / half_life).
+    """
+    s = summary[["symbol", "timestamp", "spread_pct"]].dropna()
+    g = s.groupby("symbol", sort=False)
+    x = s["spread_pct"] - g["spread_pct"].transform("mean")
+    x_next = x.groupby(s["symbol"], sort=False).shift(-1)
+    dt = (g["timestamp"].shift(-1) - s["timestamp"]).dt.total_seconds()
+    ok = x_next.notna() & (dt > 0)
+    if ok.sum() < 3:
+        return default_s
+    rho = float((x[ok] * x_next[ok]).sum() / np.sqrt((x[ok] ** 2).sum() * (x_next[ok] ** 2).sum()))
+    if not (0.0 < rho < 1.0):
+        return default_s
+    return float(np.median(dt[ok]) * np.log(0.5) / np.log(rho))
+
+
+def _fee_columns(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(taker_buy, taker_sell, withdraw_coin) arrays, looked up once per unique (venue, symbol)."""
+    fs = schedule()
+
+    def lookup(ex_col: str) -> tuple[np.ndarray, np.ndarray]:
+        codes, uniq = pd.MultiIndex.from_arrays([df[ex_col], df["symbol"]]).factorize()
+        rate, wd = fs.rates(uniq.get_level_values(0), uniq.get_level_values(1))
+        return rate[codes], wd[codes]
+
+    taker_buy, wd = lookup("buy_ex")
+    taker_sell, _ = lookup("sell_ex")
+    return taker_buy, taker_sell, wd
+
+
+class BacktestResult:
+    def __init__(self, trades: pd.DataFrame, equity: pd.Series, summary: dict[str, float]):
+        self.trades, self.equity, self.summary = trades, equity, summary
+
+    @property
+    def by_symbol(self) -> pd.DataFrame:
+        t = self.trades[self.trades["taken"]]
+        return t.groupby("symbol").agg(trades=("pnl_usd", "size"), pnl_usd=("pnl_usd", "sum"),
+                                       hit_rate=("hit", "mean"),
+                                       avg_edge_pct=("captured_pct", "mean"))
+
+    def __repr__(self):
+        return f"BacktestResult({self.summary})"
+
+
+def run_backtest(edges: pd.DataFrame | None = None, summary: pd.DataFrame | None = None,
+                 size_usd: float = SIZE_USD, capital_usd: float = CAPITAL_USD,
+                 latency_s: float = LATENCY_S, half_life_s: float | None = None,
+                 min_edge_pct: float = MIN_EDGE_PCT) -> BacktestResult:
+    """
+    Take every route whose net edge at the observed prices is >= min_edge_pct.
+    Fill size is min(size_usd, capital_usd / trades in that run); the edge realised
+    is gross_pct * 0.5 ** (latency_s / half_life_s), and fees are charged on it.
+    """
+    edges = load_edges() if edges is None else edges
+    if half_life_s is None:
+        try:
+            half_life_s = fit_half_life(load_summary() if summary is None else summary)
+        except (OSError, KeyError):
+            half_life_s = 60.0
+    t = edges.reset_index(drop=True).copy()
+    buy, sell = t["buy"].to_numpy(float), t["sell"].to_numpy(float)
+    gross = t["gross_pct"].to_numpy(float)
+    taker_buy, taker_sell, wd = _fee_columns(t)
+
+    # decision at observed prices (what the publisher showed)
+    qty_obs = size_usd / buy
+    net_obs = qty_obs * (sell - buy) - qty_obs * (buy * taker_buy + sell * taker_sell) - wd * sell
+    taken = np.isfinite(net_obs) & (net_obs / size_usd * 100.0 >= min_edge_pct)
+
+    # size: per-trade cap, then the run's capital shared across its trades
+    n_run = pd.Series(taken).groupby(t["timestamp"]).transform("sum").to_numpy(float)
+    notional = np.where(taken, np.minimum(size_usd, capital_usd / np.maximum(n_run, 1.0)), 0.0)
+
+    # realised: the edge decays while the orders are in flight
+    decay = 0.5 ** (latency_s / half_life_s) if half_life_s > 0 else 0.0
+    captured = gross * decay
+    sell_fill = buy * (1.0 + captured / 100.0)
+    qty = notional / buy
+    pnl = np.where(taken, qty * (sell_fill - buy) - qty * (buy * taker_buy + sell_fill * taker_sell)
+                   - wd * sell_fill, 0.0)
+
+    t["taker_buy"], t["taker_sell"], t["withdraw_coin"] = taker_buy, taker_sell, wd
+    t["taken"], t["notional_usd"], t["captured_pct"], t["pnl_usd"] = taken, notional, captured, pnl
+    t["hit"] = taken & (pnl > 0)
+
+    equity = pd.Series(pnl).groupby(t["timestamp"]).sum().cumsum().rename("equity_usd")
+    dd = equity - np.maximum.accumulate(np.maximum(equity.to_numpy(), 0.0))    # peak starts at 0
+    n_taken = int(taken.sum())
+    summary_out = {
+        "rows": int(len(t)), "runs": int(t["timestamp"].nunique()),
+        "trades": n_taken, "pnl_usd": float(pnl.sum()),
+        "hit_rate": float(t["hit"].sum() / n_taken) if n_taken else float("nan"),
+        "avg_pnl_usd": float(pnl[taken].mean()) if n_taken else float("nan"),
+        "turnover_usd": float(notional.sum()),
+        "max_drawdown_usd": float(max(0.0, -dd.min())) if len(dd) else 0.0,
+        "half_life_s": float(half_life_s), "latency_s": float(latency_s),
+        "start": str(t["timestamp"].min()), "end": str(t["timestamp"].max()),
+    }
+    return BacktestResult(t, equity, summary_out)
+
+
+if __name__ == "__main__":
+    res = run_backtest()
+    for k, v in res.summary.items():
+        print(f"{k:>18}: {v}")
+    print(res.by_symbol.to_string())
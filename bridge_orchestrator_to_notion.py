@@ -1,11 +1,14 @@
-import os, sys
-from orchestrate_feeds import collect_metrics
-from visual_display import display_metrics
+import os
+import sys
+
 from notion_publish import publish_to_notion
+from orchestrate_feeds import collect_metrics_concurrent
+from visual_display import display_metrics
+
 
 def main():
     page_id = os.getenv("PAGE_ID", "").strip()
-    rows = collect_metrics()
+    rows = collect_metrics_concurrent()
     display_metrics(rows)
     if page_id:
         ok, msg = publish_to_notion(page_id, rows)
@@ -1,20 +1,26 @@
-import os, pandas as pd, plotly.graph_objects as go, ccxt
-from dotenv import load_dotenv
+import os
+
+import ccxt
+import pandas as pd
+import plotly.graph_objects as go
 import streamlit as st
+from dotenv import load_dotenv
 
 # Load .env if present; don't crash if missing
 load_dotenv(dotenv_path=os.path.join(os.getcwd(), ".env"), override=False)
 
 from dashboard.sidebar_status import render_sidebar_status
-from dashboard.tab_env_health import render_env_health
-from dashboard.tab_balances import render_balances
 from dashboard.tab_ai_summary import render_ai_summary
-from dashboard.tab_fees_arbitrage import render_fees_arbitrage
+from dashboard.tab_balances import render_balances
 from dashboard.tab_big_numbers import render_big_numbers
+from dashboard.tab_env_health import render_env_health
+from dashboard.tab_fees_arbitrage import render_fees_arbitrage
 from dashboard.tab_notion_snapshot import render_notion_snapshot
 from dashboard.tab_trade import render_trade
+from feeds.stream_aggregator import start_if_enabled  # noqa: E402  (reads STREAMING after .env)
 
 st.set_page_config(page_title="Coinbase Pipeline — EVERYTHING", layout="wide")
+start_if_enabled()   # STREAMING=1: tabs read fresh streamed quotes (fresh_price) before REST
 HAS_COINBASE = bool(os.getenv("CB_API_KEY") and os.getenv("CB_API_SECRET") and os.getenv("CB_API_PASSPHRASE"))
 render_sidebar_status(HAS_COINBASE)
 st.title("Trading Control Panel")
@@ -1,22 +1,34 @@
 # Remove the cache decorator, leave function as plain Python
-def fetch_prices(timeout_ms=5000):
-    import ccxt
-    pairs = {
-        "coinbase": "BTC/USD",
-        "kraken":   "BTC/USD",
-        "binance":  "BTC/USDT",
-        "bitstamp": "BTC/USD",
-        "bitfinex": "BTC/USD",
+def fetch_prices(timeout_ms=5000, pairs=None):
+    import numpy as np
+    import pandas as pd
+
+    from exchange_pool import get_exchange
+    from exchange_prices import venue_tickers
+    # venue -> symbols; each venue is asked once for all of its symbols
+    pairs = pairs or {
+        "coinbase": ["BTC/USD"],
+        "kraken":   ["BTC/USD"],
+        "binance":  ["BTC/USDT"],
+        "bitstamp": ["BTC/USD"],
+        "bitfinex": ["BTC/USD"],
     }
     rows = []
-    for ex_name, symbol in pairs.items():
+    for ex_name, symbols in pairs.items():
+        symbols = [symbols] if isinstance(symbols, str) else list(symbols)
         try:
-            ex = getattr(ccxt, ex_name)({"timeout": timeout_ms, "enableRateLimit": True})
-            t = ex.fetch_ticker(symbol)
-            last = float(t["last"])
-            bid = float(t.get("bid") or last)
-            ask = float(t.get("ask") or last)
-            rows.append({"exchange": ex_name, "symbol": symbol, "last": last, "bid": bid, "ask": ask})
+            ex = get_exchange(ex_name, timeout=timeout_ms)
+            got = venue_tickers(ex, symbols)
         except Exception as e:
-            rows.append({"exchange": ex_name, "symbol": symbol, "last": np.nan, "bid": np.nan, "ask": np.nan, "error": str(e)[:160]})
+            got = {s: (None, None, str(e)[:160]) for s in symbols}
+        for symbol, (t, _ms, err) in got.items():
+            try:
+                if t is None:
+                    raise ValueError(err or "no ticker")
+                last = float(t["last"])
+                bid = float(t.get("bid") or last)
+                ask = float(t.get("ask") or last)
+                rows.append({"exchange": ex_name, "symbol": symbol, "last": last, "bid": bid, "ask": ask})
+            except Exception as e:
+                rows.append({"exchange": ex_name, "symbol": symbol, "last": np.nan, "bid": np.nan, "ask": np.nan, "error": str(e)[:160]})
     return pd.DataFrame(rows)
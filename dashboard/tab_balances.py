@@ -1,12 +1,18 @@
-import ccxt, pandas as pd, streamlit as st
+import pandas as pd
+import streamlit as st
+
+from exchange_pool import get_exchange
+from exchange_prices import cached_price
+
+
 def _ex(id_):
     try:
-        e=getattr(ccxt, id_)(); e.load_markets(); return e
+        e=get_exchange(id_)
+        if not e.markets: e.load_markets()
+        return e
     except Exception: return None
 def _price(ex,sym):
-    try:
-        t=ex.fetch_ticker(sym); return t.get("last") or t.get("close") or t.get("ask") or t.get("bid")
-    except Exception: return None
+    return cached_price(ex.id,sym,ex)   # streamed quote, else ticker shared via quote_cache
 def render_balances():
     st.header("Balances")
     c1,c2,c3 = st.columns(3)
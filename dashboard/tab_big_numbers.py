@@ -1,48 +1,47 @@
-import os
 import math
+
 import pandas as pd
-import streamlit as st
 import plotly.graph_objects as go
-import ccxt
+import streamlit as st
+
+from exchange_pool import coinbase_private, get_exchange
+from exchange_prices import cached_price
+from quote_fx import convert
+from symbol_registry import get_registry
+
 
 # ---------- Helpers ----------
 def _safe_ex(id_: str, auth: bool = False):
     """
-    Return a ccxt exchange instance.
+    Return a shared (pooled) ccxt exchange client.
     If auth=True and id_=='coinbase', use env creds.
     """
     try:
         if auth and id_ == "coinbase":
-            k = os.getenv("CB_API_KEY")
-            s = os.getenv("CB_API_SECRET")
-            p = os.getenv("CB_API_PASSPHRASE")
-            if not (k and s and p):
+            ex = coinbase_private()
+            if ex is None:
                 return None
-            ex = ccxt.coinbase({"enableRateLimit": True})
-            ex.api_key = k
-            ex.secret = s
-            ex.password = p
         else:
-            ex = getattr(ccxt, id_)({"enableRateLimit": True})
-        ex.load_markets()
+            ex = get_exchange(id_)
+        if not ex.markets:
+            ex.load_markets()
+        get_registry().ensure(id_, ex)
         return ex
     except Exception:
         return None
 
 def _norm_pair(ex_id: str, base: str, quote: str) -> str:
-    # Coinbase uses USD; Binance prefers USDT
-    if ex_id == "coinbase":
-        return f"{base}/USD"
-    if ex_id == "binance" and quote == "USD":
-        return f"{base}/USDT"
-    return f"{base}/{quote}"
-
-def _last_price(ex, pair: str):
+    # Venue spelling comes from the symbol registry (e.g. Binance BTC/USD -> BTC/USDT)
+    return get_registry().unified(ex_id, f"{base}/{quote}", alias_quote=True) or f"{base}/{quote}"
+
+def _last_price(ex, pair: str, quote: str = "USD"):
+    # streamed quote when the aggregator is running, else a ticker shared via quote_cache;
+    # alias books (Binance BTC/USDT for BTC/USD) are converted to `quote` via quote_fx
+    px = cached_price(ex.id, pair, ex)
     try:
-        t = ex.fetch_ticker(pair)
-        return t.get("last") or t.get("close") or t.get("ask") or t.get("bid")
+        return convert(px, ex.id, pair.split("/")[1], quote)
     except Exception:
-        return None
+        return px
 
 def _ohlcv(ex, pair: str, tf: str = "1h", limit: int = 200):
     try:
@@ -112,8 +111,8 @@ def render_big_numbers():
     cb_pair = _norm_pair("coinbase", base, quote)
     bn_pair = _norm_pair("binance", base, quote)
 
-    cb_px = _last_price(cb_ex, cb_pair) if cb_ex else None
-    bn_px = _last_price(bn_ex, bn_pair) if bn_ex else None
+    cb_px = _last_price(cb_ex, cb_pair, quote) if cb_ex else None
+    bn_px = _last_price(bn_ex, bn_pair, quote) if bn_ex else None
 
     # Real spread
     spread_val = None
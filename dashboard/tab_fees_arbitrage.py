@@ -1,4 +1,11 @@
-import streamlit as st, pandas as pd, ccxt
+import pandas as pd
+import streamlit as st
+
+from exchange_pool import get_exchange
+from exchange_prices import cached_price
+from opportunity_index import OpportunityIndex
+from quote_fx import convert
+
 FEE_TABLE=[
     {"Exchange":"Coinbase Advanced","Maker %":0.40,"Taker %":0.60},
     {"Exchange":"Binance","Maker %":0.10,"Taker %":0.10},
@@ -6,11 +13,39 @@ FEE_TABLE=[
     {"Exchange":"KuCoin","Maker %":0.10,"Taker %":0.10},
 ]
 def _ex(id_):
-    try: e=getattr(ccxt,id_)(); e.load_markets(); return e
+    try:
+        e=get_exchange(id_)
+        if not e.markets: e.load_markets()
+        return e
     except Exception: return None
 def _p(ex,sym):
-    try: t=ex.fetch_ticker(sym); return t.get("last") or t.get("close")
-    except Exception: return None
+    return cached_price(ex.id,sym,ex)   # streamed quote, else ticker shared via quote_cache
+_ROUTES=OpportunityIndex()   # survives reruns; follows the stream store when STREAMING=1
+_FOLLOWING=[]
+def _top_routes(n,by):
+    from feeds.stream_aggregator import start_if_enabled
+    agg=start_if_enabled()
+    if agg is not None:
+        if not _FOLLOWING:
+            _ROUTES.attach(agg.store)
+            _FOLLOWING.append(agg)
+    else:
+        from exchange_prices import calc_spreads, fetch_tickers
+        _ROUTES.load_pairs(calc_spreads(fetch_tickers())[2])
+    return _ROUTES.top_frame(n,by)
+def render_top_routes():
+    st.subheader("Top Routes (fees incl)")
+    by=st.selectbox("Rank by",["net_usd","net_pct","gross_usd"],0)
+    try:
+        top=_top_routes(8,by)
+    except Exception as e:
+        st.warning(f"Routes unavailable: {e}")
+        return
+    if top.empty:
+        st.info("No cross-venue routes yet.")
+        return
+    st.dataframe(top[["symbol","buy_ex","buy","sell_ex","sell","gross_usd","fees_usd","net_usd","net_pct"]],
+                 width='stretch')
 def render_fees_arbitrage():
     st.header("Arbitrage & Fees")
     st.subheader("Indicative Fee Comparison")
@@ -30,10 +65,16 @@ def render_fees_arbitrage():
     for name,(sym,ex) in exs.items():
         if ex:
             p=_p(ex,sym)
+            try:
+                p=convert(p,name,sym.split("/")[1],quote)   # substituted books -> selected quote
+            except Exception:
+                pass
             if p: rows.append({"Exchange":name,"Symbol":sym,"Price":p})
     if not rows:
         st.warning("No live prices available for that selection."); return
     spot=pd.DataFrame(rows).sort_values("Price")
+    st.caption(f"Prices in {quote}; books quoted in another stablecoin/USD are converted "
+               "at each venue's live rate.")
     st.dataframe(spot, width='stretch')
     lo,hi=spot.iloc[0], spot.iloc[-1]
     spread=hi["Price"]-lo["Price"]; pct=(spread/lo["Price"]*100) if lo["Price"] else 0
@@ -41,3 +82,4 @@ def render_fees_arbitrage():
                 f"**Best Sell:** {hi['Exchange']} @ {hi['Price']:,.2f}  •  "
                 f"**Gross Spread:** {spread:,.2f} ({pct:.2f}%)")
     st.caption("Net profit must include fees/withdrawals/slippage/latency.")
+    render_top_routes()
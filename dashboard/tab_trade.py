@@ -1,21 +1,17 @@
-import os, time
+import os
+import time
+
 import streamlit as st
-import ccxt
+
+from exchange_pool import coinbase_private
+
 
 def _coinbase_private():
-    apiKey=os.getenv("CB_API_KEY")
-    secret=os.getenv("CB_API_SECRET")
-    passphrase=os.getenv("CB_API_PASSPHRASE")
-    if not (apiKey and secret and passphrase):
-        return None
-    ex = ccxt.coinbase({
-        "apiKey": apiKey,
-        "secret": secret,
-        "password": passphrase,   # ccxt uses "password" for passphrase
-        "enableRateLimit": True,
-    })
+    # Shared authenticated client (ccxt uses "password" for the passphrase)
     try:
-        ex.load_markets()
+        ex = coinbase_private()
+        if ex is not None and not ex.markets:
+            ex.load_markets()
         return ex
     except Exception:
         return None
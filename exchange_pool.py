@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import os
+import threading
+
+import ccxt
+
+import venue_limits
+from markets_cache import hydrate
+from singleflight import arg_key, default_flight
+
+# Process-wide registry of long-lived ccxt clients. Streamlit keeps imported
+# modules alive across reruns and browser sessions, so every tab and session
+# shares one client (one HTTP session, one set of loaded markets) per
+# (venue, credentials, config) instead of building its own on each render.
+
+_clients: dict[tuple[str, str, str], PooledExchange] = {}
+_lock = threading.Lock()
+
+COALESCED = frozenset({"fetch_ticker", "fetch_tickers", "fetch_bids_asks", "fetch_order_book",
+                       "fetch_l2_order_book", "fetch_ohlcv"})
+_flight = default_flight()
+
+
+class PooledExchange:
+    """
+    Thin proxy around a ccxt instance. Method calls are serialized with a
+    per-client lock (sync ccxt and its rate limiter are not thread-safe);
+    attribute reads (markets, has, id, ...) pass straight through. Identical
+    concurrent market-data calls (COALESCED) share one request via singleflight.
+    """
+
+    __slots__ = ("raw", "lock", "key")
+
+    def __init__(self, raw, key=None):
+        object.__setattr__(self, "raw", raw)
+        object.__setattr__(self, "lock", threading.RLock())
+        object.__setattr__(self, "key", key or (raw.id,))
+
+    def __getattr__(self, name):
+        attr = getattr(self.raw, name)
+        if not callable(attr) or name.startswith("__"):
+            return attr
+        lock = self.lock
+
+        @functools.wraps(attr)
+        def call(*a, **kw):
+            with lock:
+                return attr(*a, **kw)
+        if name not in COALESCED:
+            return call
+        key = self.key
+
+        @functools.wraps(attr)
+        def coalesced(*a, **kw):
+            return _flight.do((key, name, arg_key(a, kw)), lambda: call(*a, **kw))
+        return coalesced
+
+    def __setattr__(self, name, value):
+        setattr(self.raw, name, value)
+
+    def __repr__(self):
+        return f"PooledExchange({self.raw.id})"
+
+
+def _guard(raw, venue: str) -> None:
+    """Route every HTTP call the client makes (ccxt's low-level fetch) through venue_limits."""
+    fetch = raw.fetch
+    ctl = venue_limits.controller(venue)
+
+    def guarded(*a, **kw):
+        ctl.acquire()
+        try:
+            out = fetch(*a, **kw)
+        except (ccxt.RateLimitExceeded, ccxt.DDoSProtection):   # 429/418
+            ctl.throttled()
+            raise
+        except ccxt.NetworkError:            # timeouts, 5xx, maintenance
+            ctl.failure()
+            raise
+        except Exception:
+            ctl.success()                    # the venue answered (bad symbol, auth, ...)
+            raise
+        except BaseException:
+            ctl.abandon()                    # interrupted before an outcome
+            raise
+        ctl.success()
+        return out
+    raw.fetch = guarded
+
+
+def _fingerprint(d: dict | None) -> str:
+    if not d:
+        return ""
+    return hashlib.sha256(json.dumps(d, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def get_exchange(venue: str, creds: dict | None = None, **config) -> PooledExchange:
+    """
+    Shared client for `venue`. `creds` ({"apiKey", "secret", "password", ...}) and any
+    extra ccxt config (e.g. timeout=5000) are part of the key; secrets are only
+    kept as a hash in the key. Markets come from markets_cache.
+    """
+    key = (venue, _fingerprint(creds), _fingerprint(config))
+    hit = _clients.get(key)
+    if hit is not None:
+        return hit
+    with _lock:
+        hit = _clients.get(key)
+        if hit is None:
+            opts = {"enableRateLimit": True, **config, **(creds or {})}
+            raw = getattr(ccxt, venue)(opts)
+            _guard(raw, venue)
+            try:
+                hydrate(raw, venue)
+            except Exception:
+                pass  # markets load lazily on first call
+            hit = _clients[key] = PooledExchange(raw, key)
+    return hit
+
+
+def coinbase_private() -> PooledExchange | None:
+    """Authenticated Coinbase client from CB_API_KEY / CB_API_SECRET / CB_API_PASSPHRASE."""
+    k, s, p = os.getenv("CB_API_KEY"), os.getenv("CB_API_SECRET"), os.getenv("CB_API_PASSPHRASE")
+    if not (k and s and p):
+        return None
+    return get_exchange("coinbase", {"apiKey": k, "secret": s, "password": p})
+
+
+def clear() -> None:
+    """Drop every pooled client (e.g. after rotating credentials)."""
+    with _lock:
+        _clients.clear()
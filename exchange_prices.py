@@ -1,72 +1,252 @@
-import os, time
-import pandas as pd, numpy as np, ccxt
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ccxt
+import numpy as np
+import pandas as pd
+
+import quote_cache
+import venue_limits
+from exchange_pool import get_exchange
+from feeds.quote_store import fresh_price
+from quote_fx import QUOTE_FX, default_fx
+from symbol_registry import get_registry
 
 DEFAULT_SYMBOLS=[s.strip() for s in os.getenv("SYMBOLS","BTC/USD,XRP/USD").split(",")]
 DEFAULT_EXCHANGES=[e.strip() for e in os.getenv("EXCHANGES","coinbase,binance,kraken,bitstamp,bitfinex").split(",")]
+# Venues are fetched in parallel (one worker per venue, so each venue's own
+# ccxt rate limiter still paces its requests). FETCH_CONCURRENT=0 restores the serial loop.
+FETCH_CONCURRENT = os.getenv("FETCH_CONCURRENT","1").lower() in ("1","true","yes","y")
+MAX_VENUE_WORKERS = int(os.getenv("MAX_VENUE_WORKERS","8"))
+# One multi-symbol fetch_tickers call per venue where supported (per-symbol fallback otherwise).
+BULK_FETCH = os.getenv("BULK_FETCH","1").lower() in ("1","true","yes","y")
+BULK_BATCH = int(os.getenv("BULK_BATCH","100"))
+
+_TICKER_COLS=["exchange","symbol","price","latency_ms","ts","quote"]
 
 def _load(names):
     out={}
     for n in names:
         if hasattr(ccxt, n):
-            out[n]=getattr(ccxt, n)({"enableRateLimit": True})
+            out[n]=get_exchange(n)
     return out
 
-def fetch_tickers(symbols=None, exchanges=None):
+def _price_of(t):
+    last=t.get("last") or t.get("close")
+    bid,ask=t.get("bid"), t.get("ask")
+    return last or ((bid+ask)/2.0 if bid and ask else None)
+
+def venue_tickers(inst, symbols):
+    """
+    Fetch tickers for many symbols from one venue.
+    Returns {symbol: (ticker | None, latency_ms, error | None)}.
+    Uses the venue's multi-symbol fetch_tickers in batches of BULK_BATCH when it
+    has one, and falls back to fetch_ticker only for symbols the bulk call missed.
+    """
+    out={}
+    if BULK_FETCH and len(symbols) > 1 and (getattr(inst, "has", None) or {}).get("fetchTickers"):
+        for i in range(0, len(symbols), BULK_BATCH):
+            chunk=symbols[i:i+BULK_BATCH]
+            t0=time.perf_counter()
+            try:
+                got=inst.fetch_tickers(chunk) or {}
+            except Exception:
+                continue
+            ms=(time.perf_counter()-t0)*1000.0
+            for sym in chunk:
+                if sym in got:
+                    out[sym]=(got[sym], ms, None)
+    for sym in symbols:
+        if sym in out:
+            continue
+        t0=time.perf_counter()
+        try:
+            out[sym]=(inst.fetch_ticker(sym), (time.perf_counter()-t0)*1000.0, None)
+        except Exception as e:
+            out[sym]=(None, (time.perf_counter()-t0)*1000.0, str(e)[:160])
+    return {sym: out[sym] for sym in symbols}
+
+def cached_ticker(exn, symbol, inst=None):
+    """
+    Ticker for one (venue, symbol) through quote_cache's "last" tier, so every
+    dashboard tab and rerun asking within the TTL shares one request.
+    """
+    inst = inst if inst is not None else get_exchange(exn)
+    return quote_cache.cached("last", (exn, symbol), lambda: inst.fetch_ticker(symbol))
+
+def cached_price(exn, symbol, inst=None):
+    """Streamed quote when fresh (feeds.quote_store), else cached_ticker's last/close/ask/bid."""
+    px = fresh_price(exn, symbol)
+    if px:
+        return px
+    try:
+        t = cached_ticker(exn, symbol, inst)
+    except Exception:
+        return None
+    return t.get("last") or t.get("close") or t.get("ask") or t.get("bid")
+
+def _quote(sym):
+    return sym.split("/")[1].split(":")[0] if "/" in sym else ""
+
+def _fetch_venue(exn, inst, symbols):
+    # Sequential within a venue: ccxt's enableRateLimit throttle is per instance
+    # and not thread-safe, so a single worker per venue keeps it honest.
+    if venue_limits.is_open(exn):
+        # breaker open after repeated failures: no round trips this cycle
+        return [{"exchange":exn,"symbol":sym,"price":np.nan,"latency_ms":0.0,"ts":time.time(),
+                 "quote":_quote(sym)} for sym in symbols]
+    reg=get_registry()
+    reg.ensure(exn, inst)
+    # With QUOTE_FX a USD symbol may be served by the venue's USDT/USDC book; the row
+    # keeps the canonical symbol and records the quote actually traded for calc_spreads.
+    native={sym: reg.unified(exn, sym, alias_quote=QUOTE_FX) for sym in symbols}
+    skipped=[sym for sym,u in native.items() if not u]
+    # Markets the venue doesn't list are recorded as NaN without a round trip.
+    rows=[{"exchange":exn,"symbol":sym,"price":np.nan,"latency_ms":0.0,"ts":time.time(),
+           "quote":_quote(sym)} for sym in skipped]
+    by_native={u: sym for sym,u in native.items() if u}
+    for u,(t,ms,_err) in venue_tickers(inst, list(by_native)).items():
+        price=np.nan
+        if t is not None:
+            price=_price_of(t)
+            if price is None:
+                continue
+            price=float(price)
+        rows.append({"exchange":exn,"symbol":by_native[u],"price":price,"latency_ms":ms,"ts":time.time(),"quote":_quote(u)})
+    return rows
+
+def fetch_tickers(symbols=None, exchanges=None, concurrent=None):
+    """
+    Return one row per (exchange, symbol): exchange, symbol, price, latency_ms, ts, quote
+    (the quote currency the price is in; differs from the symbol's on alias books).
+    With concurrent=True (default from FETCH_CONCURRENT) venues run in parallel.
+    """
     symbols = symbols or DEFAULT_SYMBOLS
     ex = _load(exchanges or DEFAULT_EXCHANGES)
+    concurrent = FETCH_CONCURRENT if concurrent is None else concurrent
     rows=[]
-    for exn, inst in ex.items():
-        for sym in symbols:
-            try:
-                t=inst.fetch_ticker(sym)
-                last=t.get("last") or t.get("close")
-                bid,ask=t.get("bid"), t.get("ask")
-                price = last or ((bid+ask)/2.0 if bid and ask else None)
-                if price is None: 
-                    continue
-                rows.append({"exchange":exn,"symbol":sym,"price":float(price)})
-            except Exception:
-                rows.append({"exchange":exn,"symbol":sym,"price":np.nan})
-    return pd.DataFrame(rows)
+    if concurrent and len(ex) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(ex), MAX_VENUE_WORKERS)) as pool:
+            futs=[pool.submit(_fetch_venue, exn, inst, symbols) for exn, inst in ex.items()]
+            for f in futs:
+                rows.extend(f.result())
+    else:
+        for exn, inst in ex.items():
+            rows.extend(_fetch_venue(exn, inst, symbols))
+    df=pd.DataFrame(rows, columns=_TICKER_COLS)
+    if QUOTE_FX and (df["quote"]!=df["symbol"].map(_quote)).any():
+        # every venue in the frame plus the FX_VENUES seed: a substituted book with no
+        # USD market of its own (Binance) converts at the live cross-venue rate
+        default_fx().refresh(df["exchange"].unique())
+    return df
+
+def tickers_from_store(store=None, symbols=None, max_age=None):
+    """
+    Same frame as fetch_tickers, read from a streaming QuoteStore (feeds.stream_aggregator)
+    instead of polling. latency_ms is exchange->receive delay where the venue stamps quotes.
+    With QUOTE_FX a stablecoin book (binance BTC/USDT) stands in for the canonical
+    symbol (BTC/USD) with quote="USDT", as in fetch_tickers.
+    """
+    from feeds.quote_store import default_store
+    from symbol_registry import QUOTE_ALIASES, canonical
+    store = store or default_store()
+    snap = store.snapshot(max_age)
+    if symbols:
+        want = list(dict.fromkeys(canonical(s) for s in symbols))
+    else:
+        alias_of = {alt: q for q, alts in QUOTE_ALIASES.items() for alt in alts} if QUOTE_FX else {}
+        pairs = {(q.symbol.split("/")[0], _quote(q.symbol)) for q in snap}
+        want = sorted({f"{base}/{alias_of.get(qt, qt)}" for base, qt in pairs})
+    rows=[]
+    for venue in sorted({q.venue for q in snap}):
+        for sym in want:
+            q = store.get(venue, sym, max_age, alias_quote=QUOTE_FX)
+            if q is None:
+                continue
+            px = q.price
+            rows.append({"exchange":venue,"symbol":sym,
+                         "price":float(px) if px is not None else np.nan,
+                         "latency_ms":(q.ts_recv-q.ts_exchange)*1000.0 if q.ts_exchange else np.nan,
+                         "ts":q.ts_recv,"quote":_quote(q.symbol)})
+    df=pd.DataFrame(rows, columns=_TICKER_COLS)
+    if QUOTE_FX and (df["quote"]!=df["symbol"].map(_quote)).any():
+        default_fx().refresh(df["exchange"].unique())
+    return df
+
+_SUMMARY_COLS=["symbol","min_ex","min_price","max_ex","max_price","spread_abs","spread_pct"]
+_PAIR_COLS=["symbol","buy_ex","buy","sell_ex","sell","edge_pct"]
 
-def calc_spreads(df: pd.DataFrame):
+def spread_kernel(prices: np.ndarray, min_edge_pct=None, fx=None):
+    """
+    All-pairs edge tensor for a (symbols x exchanges) price matrix (NaN = no quote).
+    Returns (sym_idx, buy_idx, sell_idx, edge_pct) for every valid buy != sell route,
+    in symbol-major, buy-major order; with min_edge_pct only routes at/above it.
+    `fx` (same shape, or broadcastable) multiplies prices onto a common quote first.
+    """
+    P=np.asarray(prices, dtype=float)
+    if fx is not None:
+        P=P*np.asarray(fx, dtype=float)
+    ok=np.isfinite(P)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        edge=(P[:,None,:]-P[:,:,None])/P[:,:,None]*100.0      # [sym, buy, sell]
+    mask=ok[:,:,None] & ok[:,None,:] & (P[:,:,None]>0) & ~np.eye(P.shape[1], dtype=bool)[None]
+    if min_edge_pct is not None:
+        mask&=edge>=min_edge_pct
+    si,bi,ki=np.nonzero(mask)
+    return si,bi,ki,edge[si,bi,ki]
+
+def _fx_matrix(df, pivot):
+    """[symbol, exchange] factors taking each row's traded quote to its symbol's quote."""
+    f=default_fx().factors(df["exchange"].tolist(), df["quote"].tolist(),
+                           to=df["symbol"].map(_quote).tolist())
+    F=df.assign(_fx=f).pivot_table(index=["symbol"], columns="exchange", values="_fx",
+                                   aggfunc="last", dropna=False)
+    return F.reindex(index=pivot.index, columns=pivot.columns).to_numpy(dtype=float)
+
+def calc_spreads(df: pd.DataFrame, min_edge_pct=None):
+    """
+    (pivot, sym_summary, pair_detail). pair_detail holds every buy/sell route, or only
+    those with edge_pct >= min_edge_pct so the full N^2 frame is never built.
+    When df has a quote column (fetch_tickers), prices on USDT/USDC books are
+    converted to the symbol's quote (quote_fx) before any spread is computed;
+    sym_summary and pair_detail report the converted prices, pivot the raw ones.
+    """
     pivot=df.pivot_table(index=["symbol"], columns="exchange", values="price", aggfunc="last")
-    sym_rows=[]
-    for sym,row in pivot.iterrows():
-        s=row.dropna()
-        if s.empty: 
-            continue
-        mx_ex, mx = s.idxmax(), s.max()
-        mn_ex, mn = s.idxmin(), s.min()
-        spread_abs = mx - mn
-        spread_pct = (spread_abs / mn * 100.0) if mn else np.nan
-        sym_rows.append({
-            "symbol": sym,
-            "min_ex": mn_ex, "min_price": mn,
-            "max_ex": mx_ex, "max_price": mx,
-            "spread_abs": spread_abs, "spread_pct": spread_pct
-        })
-    sym_summary=pd.DataFrame(sym_rows).sort_values("spread_pct", ascending=False)
-
-    pairs=[]
-    for sym,row in pivot.iterrows():
-        s=row.dropna(); exs=list(s.index)
-        for i in range(len(exs)):
-            for j in range(len(exs)):
-                if i==j: 
-                    continue
-                b_ex, s_ex = exs[i], exs[j]
-                b, s_ = s[b_ex], s[s_ex]
-                if not (np.isfinite(b) and np.isfinite(s_)) or b<=0:
-                    continue
-                edge = (s_ - b)/b*100.0
-                pairs.append({"symbol":sym,"buy_ex":b_ex,"buy":b,"sell_ex":s_ex,"sell":s_,"edge_pct":edge})
-    pair_detail = pd.DataFrame(pairs)
-    # Ensure expected columns exist
-    if 'symbol' not in pair_detail.columns:
-        pair_detail['symbol'] = 'UNKNOWN'
-    if 'edge_pct' not in pair_detail.columns:
-        pair_detail['edge_pct'] = 0.0
+    P=pivot.to_numpy(dtype=float)
+    syms=pivot.index.to_numpy()
+    exs=pivot.columns.to_numpy()
+    F=None
+    aliased="quote" in df.columns and len(df) and (df["quote"]!=df["symbol"].map(_quote)).any()
+    if QUOTE_FX and aliased:
+        F=_fx_matrix(df, pivot)
+    Pc=P if F is None else P*F
+
+    has=np.isfinite(Pc).any(axis=1)
+    Ph=Pc[has]
+    if Ph.size:
+        mx_i=np.nanargmax(Ph, axis=1)
+        mn_i=np.nanargmin(Ph, axis=1)
+        r=np.arange(len(Ph))
+        mx=Ph[r,mx_i]
+        mn=Ph[r,mn_i]
+        spread_abs=mx-mn
+        with np.errstate(divide="ignore", invalid="ignore"):
+            spread_pct=np.where(mn!=0, spread_abs/mn*100.0, np.nan)
+        sym_summary=pd.DataFrame({
+            "symbol": syms[has],
+            "min_ex": exs[mn_i], "min_price": mn,
+            "max_ex": exs[mx_i], "max_price": mx,
+            "spread_abs": spread_abs, "spread_pct": spread_pct,
+        }).sort_values("spread_pct", ascending=False)
+    else:
+        sym_summary=pd.DataFrame(columns=_SUMMARY_COLS)
+
+    si,bi,ki,edge=spread_kernel(P, min_edge_pct, F)
+    pair_detail=pd.DataFrame({
+        "symbol": syms[si], "buy_ex": exs[bi], "buy": Pc[si,bi],
+        "sell_ex": exs[ki], "sell": Pc[si,ki], "edge_pct": edge,
+    }, columns=_PAIR_COLS)
     pair_detail = pair_detail.sort_values(['symbol','edge_pct'], ascending=False)
     return pivot, sym_summary, pair_detail
 
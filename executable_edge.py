@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Callable, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+import quote_cache
+from fee_schedule import schedule
+from symbol_registry import canonical, get_registry
+
+# Depth-aware executable edge. Both legs are filled against L2 books:
+#
+#   buy leg   spend X quote walking the asks  -> base bought (VWAP = X / base)
+#   sell leg  sell that base walking the bids -> quote proceeds
+#   net       proceeds*(1-taker_sell) - X*(1+taker_buy) - withdrawal*sell_vwap
+#
+# Fills come from cumulative sums over the book levels, broadcast over
+# [route, notional, level], so a full notional ladder for every candidate route
+# is one NumPy pass. The max executable size is the largest ladder notional whose
+# net edge is at/above a threshold; every rung is checked, since a fixed withdrawal
+# fee makes small sizes lose even where larger ones clear.
+#
+#   res = ladder(asks, bids, notionals, taker_buy, taker_sell)
+#   executable_routes(routes_df, [1_000, 10_000, 50_000], min_edge_pct=0.1)
+
+DEPTH_LEVELS = int(os.getenv("DEPTH_LEVELS", "50"))
+Levels = Sequence[tuple[float, float]]          # [(price, qty), ...] best first
+
+
+def book_arrays(books: Iterable[Levels | None], n: int = DEPTH_LEVELS
+                ) -> tuple[np.ndarray, np.ndarray]:
+    """Pad per-route books to (px[R, L], qty[R, L]); missing levels are px=NaN, qty=0."""
+    books = list(books)
+    L = max([min(len(b or ()), n) for b in books] + [1])
+    px = np.full((len(books), L), np.nan)
+    qty = np.zeros((len(books), L))
+    for r, b in enumerate(books):
+        lv = np.asarray((b or ())[:n], dtype=float).reshape(-1, 2)
+        px[r, :len(lv)], qty[r, :len(lv)] = lv[:, 0], lv[:, 1]
+    return px, qty
+
+
+def _walk(px: np.ndarray, qty: np.ndarray, target: np.ndarray, by_quote: bool) -> np.ndarray:
+    """
+    Fill `target` [R, N] against books px/qty [R, L]. by_quote=True: target is quote to
+    spend, returns base received; else target is base to sell, returns quote received.
+    NaN where the book is too thin.
+    """
+    cq = np.cumsum(np.nan_to_num(px) * qty, axis=1)          # cumulative quote
+    cb = np.cumsum(qty, axis=1)                               # cumulative base
+    cum = cq if by_quote else cb
+    k = (cum[:, None, :] < target[:, :, None]).sum(axis=2)   # level where the fill completes [R, N]
+    L = px.shape[1]
+    kk = np.minimum(k, L - 1)
+
+    def pad(a):
+        return np.concatenate([np.zeros((a.shape[0], 1)), a], axis=1)
+
+    prev_q = np.take_along_axis(pad(cq), kk, axis=1)
+    prev_b = np.take_along_axis(pad(cb), kk, axis=1)
+    p_k = np.take_along_axis(px, kk, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = prev_b + (target - prev_q) / p_k if by_quote else prev_q + (target - prev_b) * p_k
+    return np.where((k < L) & np.isfinite(p_k), out, np.nan)
+
+
+def ladder(asks: tuple[np.ndarray, np.ndarray], bids: tuple[np.ndarray, np.ndarray],
+           notionals: Sequence[float], taker_buy, taker_sell, withdraw_coin=0.0
+           ) -> dict[str, np.ndarray]:
+    """
+    Executable fills for R routes x N notionals. asks/bids are book_arrays() of the buy
+    and sell venues; fees are scalars or [R] arrays. Returns [R, N] arrays.
+    """
+    R = asks[0].shape[0]
+    X = np.broadcast_to(np.asarray(notionals, dtype=float), (R, len(notionals)))
+
+    def col(v):
+        return np.broadcast_to(np.asarray(v, dtype=float).reshape(-1, 1), (R, 1))
+
+    fb, fs, wd = col(taker_buy), col(taker_sell), col(withdraw_coin)
+    base = _walk(*asks, X, by_quote=True)
+    sell_base = base - wd
+    proceeds = _walk(*bids, sell_base, by_quote=False)
+    net = proceeds * (1 - fs) - X * (1 + fb)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {"notional": X, "base": base,
+                "buy_vwap": X / base, "sell_vwap": proceeds / sell_base,
+                "net_usd": net, "net_pct": net / X * 100.0}
+
+
+def geometric_ladder(lo: float, hi: float, n: int = 32) -> np.ndarray:
+    """n notionals spaced geometrically from lo to hi (the max-size search grid)."""
+    return np.geomspace(lo, hi, n)
+
+
+def max_notional(res: dict[str, np.ndarray], min_edge_pct: float = 0.0) -> np.ndarray:
+    """[R] largest ladder notional whose net_pct >= min_edge_pct (NaN if none)."""
+    ok = res["net_pct"] >= min_edge_pct
+    return np.where(ok.any(axis=1), np.where(ok, res["notional"], 0.0).max(axis=1), np.nan)
+
+
+def fetch_depth(venue: str, symbol: str, n: int = DEPTH_LEVELS) -> dict[str, Levels] | None:
+    """L2 book for (venue, symbol): Coinbase stream/REST level=2, else the pooled ccxt client."""
+    sym = canonical(symbol)
+    if venue == "coinbase":
+        from feeds import coinbase_public
+        return coinbase_public.get_depth(sym.replace("/", "-"), n)
+    import ccxt
+    if not hasattr(ccxt, venue):             # aggregators (coingecko) have no book
+        return None
+    from exchange_pool import get_exchange
+    ex = get_exchange(venue)
+    usym = get_registry().unified(venue, sym, alias_quote=True) or sym
+    ob = quote_cache.cached("book", (venue, usym, "l2", n), lambda: ex.fetch_order_book(usym, n))
+    return {"bids": [tuple(lv[:2]) for lv in ob.get("bids") or ()],
+            "asks": [tuple(lv[:2]) for lv in ob.get("asks") or ()]} if ob else None
+
+
+def executable_routes(routes: pd.DataFrame, notionals: Sequence[float], min_edge_pct: float = 0.0,
+                      depth: Callable[[str, str], dict[str, Levels] | None] = fetch_depth,
+                      fee: Callable[[str, str], float] | None = None) -> pd.DataFrame:
+    """
+    One row per (route, notional) for a frame with symbol, buy_ex, sell_ex columns:
+    buy/sell VWAPs, net_usd, net_pct and max_notional (largest ladder size >= min_edge_pct).
+    Books are fetched once per (venue, symbol).
+    """
+    if routes.empty:
+        return pd.DataFrame(columns=["symbol", "buy_ex", "sell_ex", "notional", "buy_vwap",
+                                     "sell_vwap", "net_usd", "net_pct", "max_notional"])
+    fs = schedule()
+    fee = fee or (lambda venue, symbol: fs.fee(venue, "taker", symbol))
+    books: dict[tuple[str, str], dict[str, Levels] | None] = {}
+    legs = {*zip(routes["buy_ex"], routes["symbol"], strict=True),
+            *zip(routes["sell_ex"], routes["symbol"], strict=True)}
+    for v, s in legs:
+        try:
+            books[(v, s)] = depth(v, s)
+        except Exception:
+            books[(v, s)] = None
+    sy, bx, sx = routes["symbol"].tolist(), routes["buy_ex"].tolist(), routes["sell_ex"].tolist()
+    asks = book_arrays((books[(b, s)] or {}).get("asks") for b, s in zip(bx, sy, strict=True))
+    bids = book_arrays((books[(k, s)] or {}).get("bids") for k, s in zip(sx, sy, strict=True))
+    res = ladder(asks, bids, notionals,
+                 np.array([fee(b, s) for b, s in zip(bx, sy, strict=True)]),
+                 np.array([fee(k, s) for k, s in zip(sx, sy, strict=True)]),
+                 np.array([fs.withdraw_coin(b, s) for b, s in zip(bx, sy, strict=True)]))
+    mx = max_notional(res, min_edge_pct)
+    N = len(notionals)
+    return pd.DataFrame({
+        "symbol": np.repeat(sy, N), "buy_ex": np.repeat(bx, N), "sell_ex": np.repeat(sx, N),
+        "notional": res["notional"].ravel(), "buy_vwap": res["buy_vwap"].ravel(),
+        "sell_vwap": res["sell_vwap"].ravel(), "net_usd": res["net_usd"].ravel(),
+        "net_pct": res["net_pct"].ravel(), "max_notional": np.repeat(mx, N),
+    })
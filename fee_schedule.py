@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+from symbol_registry import canonical
+
+# One compiled fee schedule for fees.py, analytics/fees.py and fetch_and_publish.py.
+#
+# Sources, highest precedence first:
+#   config/fees.yaml      exchanges.<venue>.taker_pct / maker_pct
+#   fees_config.json      exchanges.<venue>.taker / maker, defaults, withdrawals.<venue>.<ASSET>
+#   config/feeds.yaml     fees.taker_pct_default / maker_pct_default / gas_overhead_usd
+#
+# Rates compile into dense [venue, asset] arrays (last row/column = unknown venue/asset),
+# so lookups are a dict hit plus an array index. Files are re-read only when one of
+# their mtimes changes, and mtimes are checked at most every RELOAD_CHECK_S seconds.
+
+FEES_JSON = "fees_config.json"
+FEES_YAML = "config/fees.yaml"
+FEEDS_YAML = "config/feeds.yaml"
+RELOAD_CHECK_S = float(os.getenv("FEE_RELOAD_CHECK_S", "1.0"))
+
+_FALLBACK_TAKER = 0.002
+_FALLBACK_MAKER = 0.002
+
+# used when fees_config.json is missing or malformed
+DEFAULT_CFG = {
+    "defaults": {"usd_trade_size": 100.0, "assume_role": "taker"},
+    "exchanges": {
+        "kraken":   {"maker": 0.0020, "taker": 0.0035},
+        "bitfinex": {"maker": 0.0010, "taker": 0.0020},
+        "bitstamp": {"maker": 0.0010, "taker": 0.0020},
+        "coinbase": {"maker": 0.0040, "taker": 0.0060},
+    },
+}
+
+
+def _asset(symbol: str) -> str:
+    return canonical(symbol).split("/")[0] if symbol else ""
+
+
+class FeeSchedule:
+    def __init__(self, json_cfg: dict, fees_yaml: dict, feeds_yaml: dict):
+        ex_json = {k.lower(): v for k, v in (json_cfg.get("exchanges") or {}).items()}
+        ex_yaml = {k.lower(): v for k, v in (fees_yaml.get("exchanges") or {}).items()}
+        withdrawals = {k.lower(): v for k, v in (json_cfg.get("withdrawals") or {}).items()}
+        fee_defaults = feeds_yaml.get("fees") or {}
+        self.defaults = json_cfg.get("defaults") or {}
+
+        venues = sorted({*ex_json, *ex_yaml, *withdrawals})
+        assets = sorted({a.upper() for t in withdrawals.values() for a in (t or {})})
+        self.venue_ids: dict[str, int] = {v: i for i, v in enumerate(venues)}
+        self.asset_ids: dict[str, int] = {a: i for i, a in enumerate(assets)}
+        V, A = len(venues) + 1, len(assets) + 1
+
+        dflt_taker = float(fee_defaults.get("taker_pct_default", _FALLBACK_TAKER))
+        dflt_maker = float(fee_defaults.get("maker_pct_default", _FALLBACK_MAKER))
+        self.taker = np.full((V, A), dflt_taker)
+        self.maker = np.full((V, A), dflt_maker)
+        self.withdraw = np.zeros((V, A))
+        for v, i in self.venue_ids.items():
+            j, y = ex_json.get(v) or {}, ex_yaml.get(v) or {}
+            self.taker[i, :] = float(y.get("taker_pct", j.get("taker", dflt_taker)))
+            self.maker[i, :] = float(y.get("maker_pct", j.get("maker", dflt_maker)))
+            for a, amt in (withdrawals.get(v) or {}).items():
+                self.withdraw[i, self.asset_ids[a.upper()]] = float(amt)
+
+        gas = fee_defaults.get("gas_overhead_usd") or {}
+        self.gas: dict[str, float] = {canonical(s): float(v) for s, v in gas.items()}
+
+    # ---- ids ----
+    def vid(self, exchange: str) -> int:
+        return self.venue_ids.get((exchange or "").lower(), len(self.venue_ids))
+
+    def aid(self, symbol: str) -> int:
+        return self.asset_ids.get(_asset(symbol), len(self.asset_ids))
+
+    # ---- scalar lookups ----
+    def fee(self, exchange: str, role: str = "taker", symbol: str = "") -> float:
+        tbl = self.maker if role == "maker" else self.taker
+        return float(tbl[self.vid(exchange), self.aid(symbol)])
+
+    def withdraw_coin(self, exchange: str, symbol: str) -> float:
+        return float(self.withdraw[self.vid(exchange), self.aid(symbol)])
+
+    def gas_usd(self, symbol: str) -> float:
+        return self.gas.get(canonical(symbol), 0.0) if symbol else 0.0
+
+    def default_usd(self) -> float:
+        return float(self.defaults.get("usd_trade_size", 100.0))
+
+    # ---- vectorized lookups ----
+    def ids(self, exchanges: Iterable[str], symbols: Iterable[str]
+            ) -> tuple[np.ndarray, np.ndarray]:
+        v = np.fromiter((self.vid(e) for e in exchanges), dtype=np.intp)
+        a = np.fromiter((self.aid(s) for s in symbols), dtype=np.intp)
+        return v, a
+
+    def rates(self, exchanges: Iterable[str], symbols: Iterable[str], role: str = "taker"
+              ) -> tuple[np.ndarray, np.ndarray]:
+        """(fee rate, withdrawal in coin) arrays aligned with the inputs."""
+        v, a = self.ids(exchanges, symbols)
+        tbl = self.maker if role == "maker" else self.taker
+        return tbl[v, a], self.withdraw[v, a]
+
+
+def _read_json(path: Path) -> dict:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if isinstance(data, dict) and "exchanges" in data and "defaults" in data:
+            return data
+    except Exception:
+        pass
+    return DEFAULT_CFG
+
+
+def _read_yaml(path: Path) -> dict:
+    try:
+        return yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+    except Exception:
+        return {}
+
+
+class _Loader:
+    def __init__(self, json_path: str, fees_yaml: str, feeds_yaml: str):
+        self.paths = (Path(json_path), Path(fees_yaml), Path(feeds_yaml))
+        self._lock = threading.Lock()
+        self._mtimes: tuple[float, ...] | None = None
+        self._checked = 0.0
+        self._sched: FeeSchedule | None = None
+        self.reloads = 0
+
+    def _stat(self) -> tuple[float, ...]:
+        out = []
+        for p in self.paths:
+            try:
+                out.append(p.stat().st_mtime)
+            except OSError:
+                out.append(-1.0)
+        return tuple(out)
+
+    def get(self) -> FeeSchedule:
+        now = time.monotonic()
+        if self._sched is not None and now - self._checked < RELOAD_CHECK_S:
+            return self._sched
+        with self._lock:
+            self._checked = now
+            mt = self._stat()
+            if self._sched is None or mt != self._mtimes:
+                jp, fy, dy = self.paths
+                self._sched = FeeSchedule(_read_json(jp), _read_yaml(fy), _read_yaml(dy))
+                self._mtimes = mt
+                self.reloads += 1
+            return self._sched
+
+
+_loaders: dict[str, _Loader] = {}
+_loaders_lock = threading.Lock()
+
+
+def schedule(json_path: str = FEES_JSON) -> FeeSchedule:
+    """Current compiled schedule (cached; rebuilt only after a config file changes)."""
+    ld = _loaders.get(json_path)
+    if ld is None:
+        with _loaders_lock:
+            ld = _loaders.setdefault(json_path, _Loader(json_path, FEES_YAML, FEEDS_YAML))
+    return ld.get()
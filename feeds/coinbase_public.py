@@ -1,65 +1,315 @@
-import httpx
-from typing import Dict, Any
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any
+from urllib.parse import urlsplit
+
+import http_pool
+import quote_cache
+from singleflight import default_flight
 
 # We support Coinbase Retail v2 for spot + Coinbase Exchange (Advanced) for stats/orderbook.
 # Multiple fallbacks to survive minor API changes.
 
 TIMEOUT = 10.0
+_EXCHANGE_BASES = ("https://api.exchange.coinbase.com", "https://api.pro.coinbase.com")
+
+# Hedged mode: if the first host hasn't answered after HEDGE_DELAY seconds (default:
+# that host's observed p95), fire the next fallback too and take the first good answer.
+# Fallback order adapts to which host has been winning. COINBASE_HEDGE=0 -> strictly sequential.
+HEDGE = os.getenv("COINBASE_HEDGE", "1").lower() in ("1", "true", "yes", "y")
+HEDGE_DELAY = float(os.getenv("COINBASE_HEDGE_DELAY", "0"))  # 0 -> adaptive p95
+HEDGE_DELAY_DEFAULT = 0.5   # until a host has enough samples for a p95
+HEDGE_DELAY_MIN = 0.05
+
+Candidate = tuple[str, Callable[[Any], Any]]   # (url, parser)
+_flight = default_flight()
+
+
+class _HostStats:
+    """Per-host success latencies (for p95) and per-lookup win rates (for ordering)."""
+
+    def __init__(self, window: int = 200, alpha: float = 0.1):
+        self._lat: dict[str, deque] = defaultdict(lambda: deque(maxlen=window))
+        self._wins: dict[tuple[str, str], float] = {}
+        self._alpha = alpha
+        self._lock = threading.Lock()
+
+    def record(self, host: str, secs: float) -> None:
+        with self._lock:
+            self._lat[host].append(secs)
+
+    def p95(self, host: str) -> float | None:
+        s = sorted(self._lat.get(host) or ())
+        if len(s) < 5:
+            return None
+        return s[min(len(s) - 1, int(0.95 * len(s)))]
+
+    def won(self, kind: str, winner: str, hosts: list[str]) -> None:
+        with self._lock:
+            for h in hosts:
+                prev = self._wins.get((kind, h), 0.0)
+                self._wins[(kind, h)] = prev + self._alpha * ((1.0 if h == winner else 0.0) - prev)
+
+    def order(self, kind: str, cands: list[Candidate]) -> list[Candidate]:
+        # Stable sort: ties keep the documented fallback order.
+        return sorted(cands, key=lambda c: -self._wins.get((kind, _host(c[0])), 0.0))
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"p95_s": {h: self.p95(h) for h in list(self._lat)},
+                "win_rate": {f"{k}@{h}": round(v, 3) for (k, h), v in self._wins.items()}}
+
+
+STATS = _HostStats()
+_pool = ThreadPoolExecutor(max_workers=int(os.getenv("COINBASE_HEDGE_WORKERS", "16")),
+                           thread_name_prefix="cb-hedge")
 
-def _get_json(url: str, headers: Dict[str, str] | None = None) -> Any:
-    with httpx.Client(timeout=TIMEOUT) as client:
-        r = client.get(url, headers=headers or {})
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+def _delay(url: str) -> float:
+    if HEDGE_DELAY > 0:
+        return HEDGE_DELAY
+    p = STATS.p95(_host(url))
+    return max(HEDGE_DELAY_MIN, p if p is not None else HEDGE_DELAY_DEFAULT)
+
+
+def _get_json(url: str, headers: dict[str, str] | None = None) -> Any:
+    # Shared keep-alive client per host (see http_pool); identical concurrent GETs share one request
+    def get():
+        t0 = time.perf_counter()
+        r = http_pool.get(url, headers=headers or {}, timeout=TIMEOUT)
         r.raise_for_status()
-        return r.json()
+        out = r.json()
+        STATS.record(_host(url), time.perf_counter() - t0)   # real round trips only
+        return out
+    return _flight.do(("GET", url), get) if not headers else get()
 
-def get_spot(pair: str) -> float | None:
-    # Retail v2
+async def _aget_json(url: str, limit: asyncio.Semaphore | None = None) -> Any:
+    async def get():
+        t0 = time.perf_counter()
+        if limit is None:
+            r = await http_pool.async_session().get(url, timeout=TIMEOUT)
+        else:
+            async with limit:
+                r = await http_pool.async_session().get(url, timeout=TIMEOUT)
+        r.raise_for_status()
+        out = r.json()
+        STATS.record(_host(url), time.perf_counter() - t0)
+        return out
+    return await _flight.ado(("GET", url), get)
+
+def _fetch(url: str, parse: Callable[[Any], Any]) -> Any:
+    return parse(_get_json(url))
+
+async def _afetch(url: str, parse: Callable[[Any], Any], limit: asyncio.Semaphore | None) -> Any:
+    return parse(await _aget_json(url, limit))
+
+def _first_ok(kind: str, cands: list[Candidate]) -> Any:
+    cands = STATS.order(kind, cands)
+    hosts = [_host(u) for u, _ in cands]
+    if not HEDGE:
+        for url, parse in cands:
+            try:
+                out = _fetch(url, parse)
+            except Exception:
+                continue
+            STATS.won(kind, _host(url), hosts)
+            return out
+        return None
+    pending: dict[Any, str] = {}
+    nxt = 0
+    while True:
+        if nxt < len(cands):  # first call, or the previous one failed / outlived its hedge delay
+            url, parse = cands[nxt]
+            pending[_pool.submit(_fetch, url, parse)] = url
+            nxt += 1
+        if not pending:
+            return None
+        timeout = _delay(cands[nxt - 1][0]) if nxt < len(cands) else None
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for f in done:
+            url = pending.pop(f)
+            if f.exception() is None:
+                for other in pending:
+                    other.cancel()   # not-yet-started hedges never run; in-flight ones are ignored
+                STATS.won(kind, _host(url), hosts)
+                return f.result()
+
+async def _afirst_ok(kind: str, cands: list[Candidate], limit: asyncio.Semaphore | None) -> Any:
+    cands = STATS.order(kind, cands)
+    hosts = [_host(u) for u, _ in cands]
+    if not HEDGE:
+        for url, parse in cands:
+            try:
+                out = await _afetch(url, parse, limit)
+            except Exception:
+                continue
+            STATS.won(kind, _host(url), hosts)
+            return out
+        return None
+    pending: dict[asyncio.Task, str] = {}
+    nxt = 0
     try:
-        j = _get_json(f"https://api.coinbase.com/v2/prices/{pair}/spot")
-        return float(j["data"]["amount"])
-    except Exception:
-        pass
-    # Advanced (exchange) ticker
-    for base in ("https://api.exchange.coinbase.com", "https://api.pro.coinbase.com"):
-        try:
-            j = _get_json(f"{base}/products/{pair}/ticker")
-            return float(j.get("price") or j.get("last"))
-        except Exception:
-            continue
-    return None
-
-def get_24h_stats(pair: str) -> Dict[str, float] | None:
-    for base in ("https://api.exchange.coinbase.com", "https://api.pro.coinbase.com"):
-        try:
-            j = _get_json(f"{base}/products/{pair}/stats")
-            return {
-                "open": float(j.get("open", 0.0)),
-                "high": float(j.get("high", 0.0)),
-                "low":  float(j.get("low", 0.0)),
-                "volume": float(j.get("volume", 0.0)),
-                "last": float(j.get("last", 0.0)) if j.get("last") else None,
-            }
-        except Exception:
-            continue
-    return None
-
-def get_top_of_book(pair: str) -> Dict[str, float] | None:
-    for base in ("https://api.exchange.coinbase.com", "https://api.pro.coinbase.com"):
-        try:
-            j = _get_json(f"{base}/products/{pair}/book?level=1")
-            bids = j.get("bids") or []
-            asks = j.get("asks") or []
-            best_bid = float(bids[0][0]) if bids else None
-            best_ask = float(asks[0][0]) if asks else None
-            return {"best_bid": best_bid, "best_ask": best_ask}
-        except Exception:
-            continue
-    return None
-
-def assemble_pair_metrics(pair: str, fee_buy: float, fee_sell: float) -> Dict[str, Any]:
-    spot = get_spot(pair)
-    stats = get_24h_stats(pair) or {}
-    tob = get_top_of_book(pair) or {}
+        while True:
+            # first call, or the previous one failed / outlived its hedge delay
+            if nxt < len(cands):
+                url, parse = cands[nxt]
+                pending[asyncio.ensure_future(_afetch(url, parse, limit))] = url
+                nxt += 1
+            if not pending:
+                return None
+            timeout = _delay(cands[nxt - 1][0]) if nxt < len(cands) else None
+            done, _ = await asyncio.wait(pending, timeout=timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                url = pending.pop(t)
+                if t.exception() is None:
+                    STATS.won(kind, _host(url), hosts)
+                    return t.result()
+    finally:
+        for t in pending:
+            t.cancel()
+
+def _parse_stats(j: dict[str, Any]) -> dict[str, float]:
+    return {
+        "open": float(j.get("open", 0.0)),
+        "high": float(j.get("high", 0.0)),
+        "low":  float(j.get("low", 0.0)),
+        "volume": float(j.get("volume", 0.0)),
+        "last": float(j.get("last", 0.0)) if j.get("last") else None,
+    }
+
+def _parse_book(j: dict[str, Any]) -> dict[str, float]:
+    bids = j.get("bids") or []
+    asks = j.get("asks") or []
+    best_bid = float(bids[0][0]) if bids else None
+    best_ask = float(asks[0][0]) if asks else None
+    return {"best_bid": best_bid, "best_ask": best_ask}
+
+def _spot_candidates(pair: str) -> list[Candidate]:
+    # Retail v2 first, then the Advanced (exchange) ticker
+    retail = f"https://api.coinbase.com/v2/prices/{pair}/spot"
+    return [(retail, lambda j: float(j["data"]["amount"]))] + [
+        (f"{base}/products/{pair}/ticker", lambda j: float(j.get("price") or j.get("last")))
+        for base in _EXCHANGE_BASES]
+
+def _stats_candidates(pair: str) -> list[Candidate]:
+    return [(f"{base}/products/{pair}/stats", _parse_stats) for base in _EXCHANGE_BASES]
+
+def _book_candidates(pair: str) -> list[Candidate]:
+    return [(f"{base}/products/{pair}/book?level=1", _parse_book) for base in _EXCHANGE_BASES]
+
+def _parse_depth(j: dict[str, Any]) -> dict[str, list[tuple[float, float]]]:
+    # level=2 rows are [price, size, num_orders]
+    return {"bids": [(float(r[0]), float(r[1])) for r in j.get("bids") or ()],
+            "asks": [(float(r[0]), float(r[1])) for r in j.get("asks") or ()]}
+
+def _depth_candidates(pair: str) -> list[Candidate]:
+    return [(f"{base}/products/{pair}/book?level=2", _parse_depth) for base in _EXCHANGE_BASES]
+
+# Optional streaming source (feeds.coinbase_ws.CoinbaseStream): when attached and its
+# book for the pair is younger than STREAM_MAX_AGE seconds, reads skip REST entirely.
+STREAM_MAX_AGE = float(os.getenv("COINBASE_STREAM_MAX_AGE", "5"))
+_stream = None
+
+def attach_stream(stream) -> None:
+    """Serve get_spot / get_top_of_book from a running CoinbaseStream (None detaches)."""
+    global _stream
+    _stream = stream
+
+def _from_stream(pair: str, getter: str) -> Any:
+    s = _stream
+    if s is None:
+        return None
+    # spot is fresh while either the ticker or the book is; a quiet book keeps a live ticker
+    age = s.spot_age(pair) if getter == "get_spot" else s.age(pair)
+    if age is None or age > STREAM_MAX_AGE:
+        return None
+    return getattr(s, getter)(pair)
+
+# REST results go through quote_cache tiers (spot -> "last", stats -> "stats", book -> "book").
+
+def _rest_spot(pair: str) -> float | None:
+    return _first_ok("spot", _spot_candidates(pair))
+
+def _rest_stats(pair: str) -> dict[str, float] | None:
+    return _first_ok("stats", _stats_candidates(pair))
+
+def _rest_book(pair: str) -> dict[str, float] | None:
+    return _first_ok("book", _book_candidates(pair))
+
+def get_depth(pair: str, n: int = 50) -> dict[str, list[tuple[float, float]]] | None:
+    """Top `n` L2 levels per side, {"bids": [(px, qty), ...], "asks": [...]}, best first."""
+    s = _stream
+    age = s.age(pair) if s is not None else None
+    if age is not None and age <= STREAM_MAX_AGE:
+        return s.get_depth(pair, n)
+    d = quote_cache.cached("book", ("coinbase", pair, "l2"),
+                           lambda: _first_ok("depth", _depth_candidates(pair)))
+    return {"bids": d["bids"][:n], "asks": d["asks"][:n]} if d else None
+
+def get_spot(pair: str) -> float | None:
+    hit = _from_stream(pair, "get_spot")
+    if hit is not None:
+        return hit
+    return quote_cache.cached("last", ("coinbase", pair), lambda: _rest_spot(pair))
+
+def get_24h_stats(pair: str) -> dict[str, float] | None:
+    return quote_cache.cached("stats", ("coinbase", pair), lambda: _rest_stats(pair))
+
+def get_top_of_book(pair: str) -> dict[str, float] | None:
+    hit = _from_stream(pair, "get_top_of_book")
+    if hit is not None:
+        return hit
+    return quote_cache.cached("book", ("coinbase", pair), lambda: _rest_book(pair))
+
+# ---- asyncio versions (same fallbacks; `limit` caps in-flight requests globally) ----
+
+async def aget_spot(pair: str, limit: asyncio.Semaphore | None = None) -> float | None:
+    hit = _from_stream(pair, "get_spot")
+    if hit is not None:
+        return hit
+    return await quote_cache.acached("last", ("coinbase", pair),
+                                     lambda: _afirst_ok("spot", _spot_candidates(pair), limit),
+                                     lambda: _rest_spot(pair))
+
+async def aget_24h_stats(pair: str, limit: asyncio.Semaphore | None = None
+                         ) -> dict[str, float] | None:
+    return await quote_cache.acached("stats", ("coinbase", pair),
+                                     lambda: _afirst_ok("stats", _stats_candidates(pair), limit),
+                                     lambda: _rest_stats(pair))
+
+async def aget_top_of_book(pair: str, limit: asyncio.Semaphore | None = None
+                           ) -> dict[str, float] | None:
+    hit = _from_stream(pair, "get_top_of_book")
+    if hit is not None:
+        return hit
+    return await quote_cache.acached("book", ("coinbase", pair),
+                                     lambda: _afirst_ok("book", _book_candidates(pair), limit),
+                                     lambda: _rest_book(pair))
+
+def assemble_pair_metrics(pair: str, fee_buy: float, fee_sell: float) -> dict[str, Any]:
+    return _pair_metrics(pair, get_spot(pair), get_24h_stats(pair), get_top_of_book(pair),
+                         fee_buy, fee_sell)
+
+async def assemble_pair_metrics_async(pair: str, fee_buy: float, fee_sell: float,
+                                      limit: asyncio.Semaphore | None = None) -> dict[str, Any]:
+    """Same row as assemble_pair_metrics, with spot/stats/book fetched concurrently."""
+    spot, stats, tob = await asyncio.gather(
+        aget_spot(pair, limit), aget_24h_stats(pair, limit), aget_top_of_book(pair, limit))
+    return _pair_metrics(pair, spot, stats, tob, fee_buy, fee_sell)
+
+def _pair_metrics(pair: str, spot: float | None, stats: dict[str, float] | None,
+                  tob: dict[str, float] | None, fee_buy: float, fee_sell: float) -> dict[str, Any]:
+    stats = stats or {}
+    tob = tob or {}
 
     low = stats.get("low")
     high = stats.get("high")
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+# Streaming Coinbase market data (Advanced Trade WebSocket: ticker + level2 +
+# heartbeats). A background thread keeps a sequence-checked L2 book per product;
+# get_top_of_book / get_spot / get_depth read from memory and return the same
+# shapes as the REST helpers in feeds.coinbase_public.
+#
+#   stream = CoinbaseStream(["BTC-USD", "ETH-USD"]).start()
+#   stream.wait_ready(5)
+#   stream.get_top_of_book("BTC-USD")   # {"best_bid": ..., "best_ask": ...}
+
+WS_URL = os.getenv("COINBASE_WS_URL", "wss://advanced-trade-ws.coinbase.com")
+RECONNECT_MAX_S = 30.0
+
+
+class L2Book:
+    """Price -> size per side, with the best bid/ask cached after every update."""
+
+    def __init__(self):
+        self.bids: dict[float, float] = {}
+        self.asks: dict[float, float] = {}
+        self.top: tuple[float | None, float | None] = (None, None)
+        self.updated = 0.0
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.bids.clear()
+            self.asks.clear()
+            self.top = (None, None)
+
+    def apply(self, side: str, price: float, qty: float) -> None:
+        with self._lock:
+            levels = self.bids if side == "bid" else self.asks
+            if qty <= 0:
+                levels.pop(price, None)
+            else:
+                levels[price] = qty
+            bid, ask = self.top
+            if side == "bid":
+                if qty > 0 and (bid is None or price > bid):
+                    bid = price
+                elif qty <= 0 and price == bid:
+                    bid = max(self.bids) if self.bids else None
+            else:
+                if qty > 0 and (ask is None or price < ask):
+                    ask = price
+                elif qty <= 0 and price == ask:
+                    ask = min(self.asks) if self.asks else None
+            self.top = (bid, ask)   # single tuple swap: readers never see a half update
+            self.updated = time.time()
+
+    def depth(self, n: int = 10) -> dict[str, list[tuple[float, float]]]:
+        with self._lock:
+            bids = sorted(self.bids.items(), key=lambda kv: -kv[0])[:n]
+            asks = sorted(self.asks.items())[:n]
+        return {"bids": bids, "asks": asks}
+
+
+class CoinbaseStream:
+    def __init__(self, products: Iterable[str], url: str = WS_URL,
+                 channels: Iterable[str] = ("ticker", "level2"),
+                 on_update: Callable[[str, str], None] | None = None):
+        self.products = [p.upper() for p in products]
+        self.url = url
+        self.channels = list(channels)
+        self.on_update = on_update          # called as on_update(product, channel)
+        self.books: dict[str, L2Book] = {p: L2Book() for p in self.products}
+        self.last: dict[str, float] = {}
+        self.last_ts: dict[str, float] = {}     # receive time of each product's last ticker
+        self.snapshotted: set = set()
+        self.gaps = 0
+        self._seq: int | None = None
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self._stop = threading.Event()
+
+    # ---- sync reads (memory only) ----
+    def get_top_of_book(self, pair: str) -> dict[str, float] | None:
+        b = self.books.get(pair.upper())
+        if b is None or b.top == (None, None):
+            return None
+        bid, ask = b.top
+        return {"best_bid": bid, "best_ask": ask}
+
+    def get_spot(self, pair: str) -> float | None:
+        pair = pair.upper()
+        px = self.last.get(pair)
+        if px is not None:
+            return px
+        tob = self.get_top_of_book(pair)
+        if tob and tob["best_bid"] and tob["best_ask"]:
+            return (tob["best_bid"] + tob["best_ask"]) / 2.0
+        return None
+
+    def get_depth(self, pair: str, n: int = 10) -> dict[str, list[tuple[float, float]]] | None:
+        b = self.books.get(pair.upper())
+        return b.depth(n) if b is not None else None
+
+    def age(self, pair: str) -> float | None:
+        b = self.books.get(pair.upper())
+        return (time.time() - b.updated) if b is not None and b.updated else None
+
+    def spot_age(self, pair: str) -> float | None:
+        """Age of get_spot's inputs: the newer of the last ticker and the last book update."""
+        pair = pair.upper()
+        b = self.books.get(pair)
+        ts = max(self.last_ts.get(pair, 0.0), b.updated if b is not None else 0.0)
+        return (time.time() - ts) if ts else None
+
+    def ready(self) -> bool:
+        return all(p in self.snapshotted for p in self.products)
+
+    def wait_ready(self, timeout: float = 10.0) -> bool:
+        end = time.time() + timeout
+        while time.time() < end:
+            if self.ready():
+                return True
+            time.sleep(0.02)
+        return self.ready()
+
+    # ---- message handling ----
+    def subscribe_messages(self) -> list[dict[str, Any]]:
+        return [{"type": "subscribe", "product_ids": self.products, "channel": ch}
+                for ch in [*self.channels, "heartbeats"]]
+
+    def handle(self, msg: dict[str, Any]) -> bool:
+        """
+        Apply one decoded message. Returns False on a sequence gap, in which case the
+        caller must resubscribe (a fresh level2 snapshot rebuilds the books).
+        """
+        seq = msg.get("sequence_num")
+        if seq is not None:
+            if self._seq is not None and seq != self._seq + 1:
+                self.gaps += 1
+                self._seq = None
+                return False
+            self._seq = seq
+        ch = msg.get("channel")
+        for ev in msg.get("events") or ():
+            if ch == "l2_data":
+                self._on_l2(ev)
+            elif ch == "ticker":
+                self._on_ticker(ev)
+        return True
+
+    def _on_l2(self, ev: dict[str, Any]) -> None:
+        pid = ev.get("product_id")
+        book = self.books.get(pid)
+        if book is None:
+            return
+        if ev.get("type") == "snapshot":
+            book.clear()
+            self.snapshotted.add(pid)
+        for u in ev.get("updates") or ():
+            side = "bid" if u.get("side") == "bid" else "ask"
+            book.apply(side, float(u["price_level"]), float(u["new_quantity"]))
+        if self.on_update:
+            self.on_update(pid, "level2")
+
+    def _on_ticker(self, ev: dict[str, Any]) -> None:
+        for t in ev.get("tickers") or ():
+            pid = t.get("product_id")
+            if pid in self.books and t.get("price"):
+                self.last[pid] = float(t["price"])
+                self.last_ts[pid] = time.time()
+                if self.on_update:
+                    self.on_update(pid, "ticker")
+
+    def _reset(self) -> None:
+        self._seq = None
+        self.snapshotted.clear()
+
+    # ---- connection loop ----
+    async def _run(self) -> None:
+        import websockets
+        backoff = 0.5
+        while not self._stop.is_set():
+            self._reset()
+            try:
+                async with websockets.connect(self.url, max_size=None, ping_interval=20) as ws:
+                    for sub in self.subscribe_messages():
+                        await ws.send(json.dumps(sub))
+                    backoff = 0.5
+                    async for raw in ws:
+                        if self._stop.is_set():
+                            return
+                        if not self.handle(json.loads(raw)):
+                            break   # sequence gap -> reconnect for a fresh snapshot
+            except asyncio.CancelledError:
+                return
+            except Exception:
+                pass
+            if self._stop.is_set():
+                return
+            try:
+                await asyncio.sleep(backoff)
+            except asyncio.CancelledError:   # stop() during reconnect backoff
+                return
+            backoff = min(RECONNECT_MAX_S, backoff * 2)
+
+    def start(self) -> CoinbaseStream:
+        if self._thread and self._thread.is_alive():
+            return self
+
+        def _main():
+            self._loop = asyncio.new_event_loop()
+            self._task = self._loop.create_task(self._run())
+            try:
+                self._loop.run_until_complete(self._task)
+            finally:
+                self._loop.close()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=_main, name="coinbase-ws", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None and loop.is_running():
+            loop.call_soon_threadsafe(task.cancel)
+        if self._thread:
+            self._thread.join(timeout)
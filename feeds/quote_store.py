@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, replace
+
+from symbol_registry import QUOTE_ALIASES, canonical
+
+# In-process quote store shared by the streaming adapters and the readers
+# (calc_spreads via exchange_prices.tickers_from_store, analytics.arbitrage.analyze,
+# dashboard tabs). Keyed by (venue, canonical symbol).
+
+
+@dataclass(frozen=True)
+class Quote:
+    venue: str
+    symbol: str                      # canonical, e.g. "BTC/USD"
+    bid: float | None = None
+    ask: float | None = None
+    last: float | None = None
+    ts_exchange: float | None = None   # venue timestamp (epoch s) when provided
+    ts_recv: float = 0.0                  # local receive time (epoch s)
+
+    @property
+    def price(self) -> float | None:
+        """last, else mid -- the same preference as exchange_prices._price_of."""
+        if self.last:
+            return self.last
+        if self.bid and self.ask:
+            return (self.bid + self.ask) / 2.0
+        return None
+
+    def age(self, now: float | None = None) -> float:
+        return (now or time.time()) - self.ts_recv
+
+
+Listener = Callable[[Quote], None]
+
+
+class QuoteStore:
+    def __init__(self):
+        self._q: dict[tuple[str, str], Quote] = {}
+        self._lock = threading.Lock()
+        self._listeners: list[Listener] = []
+        self.updates = 0
+
+    def update(self, venue: str, symbol: str, **fields) -> Quote:
+        """Merge non-None fields into the (venue, symbol) quote and notify listeners."""
+        key = (venue, canonical(symbol))
+        fields = {k: v for k, v in fields.items() if v is not None}
+        fields.setdefault("ts_recv", time.time())
+        with self._lock:
+            prev = self._q.get(key) or Quote(venue=key[0], symbol=key[1])
+            q = self._q[key] = replace(prev, **fields)
+            self.updates += 1
+            listeners = list(self._listeners)
+        for fn in listeners:
+            fn(q)
+        return q
+
+    def subscribe(self, fn: Listener) -> None:
+        with self._lock:
+            self._listeners.append(fn)
+
+    def get(self, venue: str, symbol: str, max_age: float | None = None,
+            alias_quote: bool = False) -> Quote | None:
+        sym = canonical(symbol)
+        syms = [sym]
+        if alias_quote:
+            base, quote = sym.split("/", 1)
+            syms += [f"{base}/{alt}" for alt in QUOTE_ALIASES.get(quote, ())]
+        now = time.time()
+        for s in syms:
+            q = self._q.get((venue, s))
+            if q is not None and (max_age is None or q.age(now) <= max_age):
+                return q
+        return None
+
+    def last_price(self, venue: str, symbol: str, max_age: float | None = None) -> float | None:
+        q = self.get(venue, symbol, max_age)
+        return q.price if q else None
+
+    def snapshot(self, max_age: float | None = None) -> list[Quote]:
+        now = time.time()
+        with self._lock:
+            qs = list(self._q.values())
+        return [q for q in qs if max_age is None or q.age(now) <= max_age]
+
+    def prices(self, symbols: Iterable[str], max_age: float | None = None,
+               alias_quote: bool = False) -> dict[str, dict[str, float]]:
+        """{venue: {symbol-as-requested: price}} -- the providers' collect_all_prices shape."""
+        symbols = list(symbols)
+        out: dict[str, dict[str, float]] = {}
+        for venue in sorted({v for v, _ in list(self._q)}):
+            for s in symbols:
+                q = self.get(venue, s, max_age, alias_quote)
+                if q is not None and q.price is not None:
+                    out.setdefault(venue, {})[s] = float(q.price)
+        return out
+
+
+_DEFAULT = QuoteStore()
+STREAM_MAX_AGE = float(os.getenv("STREAM_MAX_AGE", "5"))
+
+
+def default_store() -> QuoteStore:
+    """Process-wide store the aggregator writes to unless given another one."""
+    return _DEFAULT
+
+
+def fresh_price(venue: str, symbol: str, max_age: float = STREAM_MAX_AGE) -> float | None:
+    """Streamed price for (venue, symbol) if one arrived within `max_age` seconds, else None."""
+    return _DEFAULT.last_price(venue, symbol, max_age)
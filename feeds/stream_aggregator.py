@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import abc
+import asyncio
+import json
+import os
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from feeds.coinbase_ws import CoinbaseStream
+from feeds.quote_store import QuoteStore, default_store
+from symbol_registry import canonical, get_registry
+
+# One WebSocket adapter per venue, all normalized into a QuoteStore keyed by
+# (venue, canonical symbol). Every adapter runs on a single background event loop.
+#
+#   agg = StreamAggregator(["BTC/USD", "ETH/USD"]).start()
+#   exchange_prices.tickers_from_store(agg.store)     # -> calc_spreads
+#
+# Venues only list what they actually trade: binance BTC/USD subscribes to
+# BTCUSDT and is stored as BTC/USDT.
+
+RECONNECT_MAX_S = 30.0
+# STREAMING=1 makes the dashboard and orchestrator read quotes from the aggregator
+# (start_if_enabled) instead of polling REST every refresh.
+STREAMING = os.getenv("STREAMING", "0").lower() in ("1", "true", "yes", "y")
+STREAM_SYMBOLS = [s.strip() for s in
+                  os.getenv("STREAM_SYMBOLS", os.getenv("SYMBOLS", "BTC/USD,XRP/USD")).split(",")]
+Update = tuple[str, dict[str, Any]]    # (canonical symbol, Quote fields)
+
+
+class Resync(Exception):
+    """Raised by an adapter when its stream is inconsistent and must reconnect."""
+
+
+def _f(x) -> float | None:
+    try:
+        return float(x) if x not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+class VenueAdapter(abc.ABC):
+    venue = ""
+    default_url = ""
+
+    def __init__(self, symbols: Iterable[str], url: str | None = None):
+        reg = get_registry()
+        self.native: dict[str, str] = {}          # native id -> canonical symbol at this venue
+        for s in symbols:
+            nid = reg.native(self.venue, s, alias_quote=True)
+            if nid:
+                self.native[nid] = canonical(reg.unified(self.venue, s, alias_quote=True) or s)
+        self.url = url or self.default_url
+
+    def connect_url(self) -> str:
+        return self.url
+
+    def subscribe_messages(self) -> list[dict[str, Any]]:
+        return []
+
+    def reset(self) -> None:  # noqa: B027  (optional hook, no-op by default)
+        """Drop per-connection state before a reconnect."""
+
+    @abc.abstractmethod
+    def handle(self, msg: Any) -> list[Update]:
+        """Decode one venue message into (symbol, fields) updates; raise Resync on a gap."""
+
+
+class CoinbaseAdapter(VenueAdapter):
+    venue = "coinbase"
+    default_url = os.getenv("COINBASE_WS_URL", "wss://advanced-trade-ws.coinbase.com")
+
+    def __init__(self, symbols, url=None):
+        super().__init__(symbols, url)
+        self.stream = CoinbaseStream(list(self.native), url=self.url)   # parser + books only
+
+    def subscribe_messages(self):
+        return self.stream.subscribe_messages()
+
+    def reset(self):
+        self.stream._reset()
+
+    def handle(self, msg):
+        if not self.stream.handle(msg):
+            raise Resync()
+        out = []
+        for ev in msg.get("events") or ():
+            pids = [ev.get("product_id")] if msg.get("channel") == "l2_data" else \
+                   [t.get("product_id") for t in ev.get("tickers") or ()]
+            for pid in pids:
+                if pid not in self.native:
+                    continue
+                tob = self.stream.get_top_of_book(pid) or {}
+                out.append((self.native[pid], {"bid": tob.get("best_bid"),
+                                               "ask": tob.get("best_ask"),
+                                               "last": self.stream.last.get(pid)}))
+        return out
+
+
+class KrakenAdapter(VenueAdapter):
+    # WebSocket v2 ticker:
+    #   {"channel":"ticker","data":[{"symbol":"BTC/USD","bid":..,"ask":..,"last":..}]}
+    venue = "kraken"
+    default_url = "wss://ws.kraken.com/v2"
+
+    def __init__(self, symbols, url=None):
+        super().__init__(symbols, url)
+        self.ws_symbols = set(self.native.values())   # v2 uses the "BTC/USD" spelling
+
+    def subscribe_messages(self):
+        return [{"method": "subscribe",
+                 "params": {"channel": "ticker", "symbol": sorted(self.ws_symbols)}}]
+
+    def handle(self, msg):
+        if not isinstance(msg, dict) or msg.get("channel") != "ticker":
+            return []
+        out = []
+        for d in msg.get("data") or ():
+            sym = canonical(d.get("symbol", ""))
+            if sym in self.ws_symbols:
+                out.append((sym, {"bid": _f(d.get("bid")), "ask": _f(d.get("ask")),
+                                  "last": _f(d.get("last"))}))
+        return out
+
+
+class BinanceAdapter(VenueAdapter):
+    # Combined stream: {"stream":"btcusdt@bookTicker","data":{"s":"BTCUSDT","b":..,"a":..}}
+    venue = "binance"
+    default_url = "wss://stream.binance.com:9443"
+
+    def connect_url(self):
+        streams = "/".join(f"{n.lower()}@{kind}"
+                           for n in self.native for kind in ("bookTicker", "miniTicker"))
+        return f"{self.url.rstrip('/')}/stream?streams={streams}"
+
+    def handle(self, msg):
+        d = msg.get("data") if isinstance(msg, dict) else None
+        if not d:
+            return []
+        sym = self.native.get(d.get("s"))
+        if sym is None:
+            return []
+        if d.get("e") == "24hrMiniTicker":
+            ts = (d.get("E") or 0) / 1000.0 or None
+            return [(sym, {"last": _f(d.get("c")), "ts_exchange": ts})]
+        return [(sym, {"bid": _f(d.get("b")), "ask": _f(d.get("a"))})]
+
+
+class BitstampAdapter(VenueAdapter):
+    # order_book_<pair> (top 100 each update) + live_trades_<pair>
+    venue = "bitstamp"
+    default_url = "wss://ws.bitstamp.net"
+
+    def subscribe_messages(self):
+        return [{"event": "bts:subscribe", "data": {"channel": f"{kind}_{n}"}}
+                for n in self.native for kind in ("order_book", "live_trades")]
+
+    def handle(self, msg):
+        if not isinstance(msg, dict) or msg.get("event") not in ("data", "trade"):
+            return []
+        kind, _, pair = (msg.get("channel") or "").rpartition("_")
+        sym = self.native.get(pair)
+        d = msg.get("data") or {}
+        if sym is None:
+            return []
+        ts = _f(d.get("microtimestamp"))
+        ts = ts / 1e6 if ts else None
+        if kind == "live_trades":
+            return [(sym, {"last": _f(d.get("price")), "ts_exchange": ts})]
+        bids, asks = d.get("bids") or [], d.get("asks") or []
+        return [(sym, {"bid": _f(bids[0][0]) if bids else None,
+                       "ask": _f(asks[0][0]) if asks else None, "ts_exchange": ts})]
+
+
+class BitfinexAdapter(VenueAdapter):
+    # [chanId, [BID, BID_SIZE, ASK, ASK_SIZE, CHG, CHG_PCT, LAST, VOL, HIGH, LOW]]
+    venue = "bitfinex"
+    default_url = "wss://api-pub.bitfinex.com/ws/2"
+
+    def __init__(self, symbols, url=None):
+        super().__init__(symbols, url)
+        self.channels: dict[int, str] = {}
+
+    def reset(self):
+        self.channels.clear()
+
+    def subscribe_messages(self):
+        return [{"event": "subscribe", "channel": "ticker", "symbol": n} for n in self.native]
+
+    def handle(self, msg):
+        if isinstance(msg, dict):
+            if msg.get("event") == "subscribed" and msg.get("symbol") in self.native:
+                self.channels[msg["chanId"]] = self.native[msg["symbol"]]
+            return []
+        if not isinstance(msg, list) or len(msg) < 2 or not isinstance(msg[1], list):
+            return []           # heartbeat ([chanId, "hb"]) or unknown
+        sym = self.channels.get(msg[0])
+        arr = msg[1]
+        if sym is None or len(arr) < 7:
+            return []
+        return [(sym, {"bid": _f(arr[0]), "ask": _f(arr[2]), "last": _f(arr[6])})]
+
+
+ADAPTERS = {a.venue: a for a in (CoinbaseAdapter, KrakenAdapter, BinanceAdapter,
+                                  BitstampAdapter, BitfinexAdapter)}
+
+
+class StreamAggregator:
+    def __init__(self, symbols: Iterable[str],
+                 venues: Iterable[str] = ("coinbase", "kraken", "binance", "bitstamp", "bitfinex"),
+                 store: QuoteStore | None = None, urls: dict[str, str] | None = None):
+        urls = urls or {}
+        symbols = list(symbols)
+        self.store = store or default_store()
+        self.adapters = [ADAPTERS[v](symbols, urls.get(v)) for v in venues if v in ADAPTERS]
+        self.errors: dict[str, str] = {}
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Future | None = None
+
+    def apply(self, adapter: VenueAdapter, msg: Any) -> int:
+        """Feed one decoded message through `adapter` into the store. Returns updates applied."""
+        n = 0
+        now = time.time()
+        for sym, fields in adapter.handle(msg):
+            self.store.update(adapter.venue, sym, ts_recv=now, **fields)
+            n += 1
+        return n
+
+    async def _run_adapter(self, adapter: VenueAdapter) -> None:
+        import websockets
+        backoff = 0.5
+        while True:
+            adapter.reset()
+            try:
+                async with websockets.connect(adapter.connect_url(), max_size=None,
+                                              ping_interval=20) as ws:
+                    for sub in adapter.subscribe_messages():
+                        await ws.send(json.dumps(sub))
+                    backoff = 0.5
+                    async for raw in ws:
+                        self.apply(adapter, json.loads(raw))
+            except asyncio.CancelledError:
+                return
+            except Resync:
+                pass
+            except Exception as e:
+                self.errors[adapter.venue] = str(e)[:160]
+            await asyncio.sleep(backoff)
+            backoff = min(RECONNECT_MAX_S, backoff * 2)
+
+    def start(self) -> StreamAggregator:
+        if self._thread and self._thread.is_alive():
+            return self
+
+        def _main():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._main())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=_main, name="stream-aggregator", daemon=True)
+        self._thread.start()
+        return self
+
+    async def _main(self) -> None:
+        self._task = asyncio.gather(*(self._run_adapter(a) for a in self.adapters))
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def stop(self, timeout: float = 2.0) -> None:
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None and loop.is_running():
+            loop.call_soon_threadsafe(task.cancel)
+        if self._thread:
+            self._thread.join(timeout)
+
+
+_AGG: StreamAggregator | None = None
+_AGG_LOCK = threading.Lock()
+
+
+def get_aggregator(symbols: Iterable[str], **kw) -> StreamAggregator:
+    """Process-wide aggregator, started on first use (e.g. by the dashboard)."""
+    global _AGG
+    with _AGG_LOCK:
+        if _AGG is None:
+            _AGG = StreamAggregator(symbols, **kw).start()
+    return _AGG
+
+
+def running() -> StreamAggregator | None:
+    return _AGG
+
+
+def start_if_enabled(symbols: Iterable[str] | None = None,
+                     wait: float = 0.0) -> StreamAggregator | None:
+    """
+    With STREAMING on, start (once) the process-wide aggregator, serve feeds.coinbase_public
+    from its Coinbase books, and wait up to `wait` s for first quotes. None when off.
+    """
+    if not STREAMING:
+        return None
+    agg = get_aggregator(symbols or STREAM_SYMBOLS)
+    from feeds import coinbase_public
+    for a in agg.adapters:
+        if isinstance(a, CoinbaseAdapter):
+            coinbase_public.attach_stream(a.stream)
+    end = time.time() + wait
+    while time.time() < end and not agg.store.snapshot():
+        time.sleep(0.05)
+    return agg
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+# Local WebSocket stand-in for exchange feeds. Serves recorded messages (a list of
+# dicts or a JSONL file) to every client after it sends its first (subscribe)
+# message, then holds the connection open. Used to exercise CoinbaseStream and the
+# venue adapters offline:
+#
+#   srv = ReplayServer("data/recordings/coinbase_btc.jsonl").start()
+#   stream = CoinbaseStream(["BTC-USD"], url=srv.url).start()
+#
+# record() captures live messages into that JSONL format.
+
+
+def load_messages(path: str | Path) -> list[dict[str, Any]]:
+    out = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line:
+            out.append(json.loads(line))
+    return out
+
+
+class ReplayServer:
+    def __init__(self, messages: Iterable[dict[str, Any]] | str | Path,
+                 host: str = "127.0.0.1", port: int = 0, interval: float = 0.0):
+        self.messages = (load_messages(messages) if isinstance(messages, (str, Path))
+                         else list(messages))
+        self.host, self.port = host, port
+        self.interval = interval            # seconds between replayed messages
+        self.received: list[dict[str, Any]] = []   # client messages (subscriptions)
+        self._ready = threading.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._stop: asyncio.Event | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, ws, *_):
+        try:
+            first = await ws.recv()
+            self.received.append(json.loads(first))
+            for m in self.messages:
+                await ws.send(json.dumps(m))
+                if self.interval:
+                    await asyncio.sleep(self.interval)
+            async for extra in ws:          # keep reading so the client can close cleanly
+                self.received.append(json.loads(extra))
+        except Exception:
+            pass
+
+    async def _serve(self):
+        import websockets
+        self._stop = asyncio.Event()
+        async with websockets.serve(self._handler, self.host, self.port) as server:
+            self.port = next(iter(server.sockets)).getsockname()[1]
+            self._ready.set()
+            await self._stop.wait()
+
+    def start(self, timeout: float = 5.0) -> ReplayServer:
+        def _main():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._serve())
+            self._loop.close()
+        self._thread = threading.Thread(target=_main, name="ws-replay", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout)
+        return self
+
+    def stop(self) -> None:
+        if self._loop and self._stop:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        if self._thread:
+            self._thread.join(2.0)
+
+
+def record(url: str, subscribe: Iterable[dict[str, Any]], path: str | Path,
+           seconds: float = 10.0) -> int:
+    """Capture `seconds` of live messages from `url` into a JSONL file. Returns the count."""
+    import websockets
+
+    async def _go() -> int:
+        n = 0
+        end = time.time() + seconds
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            async with websockets.connect(url, max_size=None) as ws:
+                for sub in subscribe:
+                    await ws.send(json.dumps(sub))
+                while time.time() < end:
+                    try:
+                        left = max(0.01, end - time.time())
+                        raw = await asyncio.wait_for(ws.recv(), timeout=left)
+                    except TimeoutError:
+                        break
+                    f.write(raw.strip() + "\n")
+                    n += 1
+        return n
+
+    return asyncio.run(_go())
@@ -1,17 +1,9 @@
 from __future__ import annotations
-import json
+
 from dataclasses import dataclass
-from pathlib import Path
-
-DEFAULT_CFG = {
-    "defaults": {"usd_trade_size": 100.0, "assume_role": "taker"},
-    "exchanges": {
-        "kraken":   {"maker": 0.0020, "taker": 0.0035},
-        "bitfinex": {"maker": 0.0010, "taker": 0.0020},
-        "bitstamp": {"maker": 0.0010, "taker": 0.0020},
-        "coinbase": {"maker": 0.0040, "taker": 0.0060},
-    },
-}
+
+from fee_schedule import DEFAULT_CFG, schedule  # noqa: F401  (DEFAULT_CFG re-exported)
+
 
 @dataclass
 class TradeLeg:
@@ -26,26 +18,30 @@ class TradeAssumptions:
     role: str = "taker"
 
 class FeeBook:
+    """Thin view over the compiled fee_schedule; cheap to construct, picks up config edits."""
+
     def __init__(self, path: str = "fees_config.json"):
-        self.cfg = DEFAULT_CFG
-        p = Path(path)
-        if p.exists():
-            try:
-                data = json.loads(p.read_text())
-                if isinstance(data, dict) and "exchanges" in data and "defaults" in data:
-                    self.cfg = data
-            except Exception:
-                self.cfg = DEFAULT_CFG
+        self.path = path
+
+    @property
+    def schedule(self):
+        return schedule(self.path)
 
     def fee_pct(self, exchange: str, role: str) -> float:
-        exch_table = self.cfg.get("exchanges") or DEFAULT_CFG["exchanges"]
-        exch = (exchange or "").lower()
         role = role if role in ("maker", "taker") else "taker"
-        return float(exch_table.get(exch, {"taker": 0.002}).get(role, 0.002))
+        return self.schedule.fee(exchange, role)
 
     def default_usd(self) -> float:
-        defaults = self.cfg.get("defaults") or DEFAULT_CFG["defaults"]
-        return float(defaults.get("usd_trade_size", 100.0))
+        return self.schedule.default_usd()
+
+    def withdraw_coin(self, exchange: str, symbol: str) -> float:
+        # optional "withdrawals": {"kraken": {"BTC": 0.00015}, ...} section in fees_config.json
+        return self.schedule.withdraw_coin(exchange, symbol)
+
+def get_fees(exchange: str, symbol: str) -> tuple[float, float]:
+    """(taker fee rate, withdrawal fee in coin units) for buying/selling `symbol` on `exchange`."""
+    fs = schedule()
+    return fs.fee(exchange, "taker", symbol), fs.withdraw_coin(exchange, symbol)
 
 def compute_dollars(buy: TradeLeg, sell: TradeLeg, a: TradeAssumptions) -> dict:
     usd = float(a.usd_size)
@@ -60,9 +56,10 @@ def compute_dollars(buy: TradeLeg, sell: TradeLeg, a: TradeAssumptions) -> dict:
             "sell_fee_usd": 0.0,
             "net_profit_usd": gross_spread_usd,
         }
-    fb = FeeBook()
-    buy_fee = usd * fb.fee_pct(buy.exchange, a.role)
-    sell_fee = gross_sell * fb.fee_pct(sell.exchange, a.role)
+    fs = schedule()
+    role = a.role if a.role in ("maker", "taker") else "taker"
+    buy_fee = usd * fs.fee(buy.exchange, role)
+    sell_fee = gross_sell * fs.fee(sell.exchange, role)
     net = gross_spread_usd - buy_fee - sell_fee
     return {
         "usd_size": usd,
@@ -74,6 +71,8 @@ def compute_dollars(buy: TradeLeg, sell: TradeLeg, a: TradeAssumptions) -> dict:
 
 # --- tiny renderer for Streamlit cards ---
 import streamlit as st
+
+
 def render_opportunity_detail(buy_ex, buy_px, sell_ex, sell_px, usd_size, include_fees, role):
     buy_leg = TradeLeg(buy_ex, buy_px, role)
     sell_leg = TradeLeg(sell_ex, sell_px, role)
@@ -1,9 +1,10 @@
 import os
+import urllib.parse
 from datetime import datetime, timezone
+from pathlib import Path
+
 import numpy as np
-import urllib.parse
 import pandas as pd
-from pathlib import Path
 
 # Load .env
 if os.path.exists(".env"):
@@ -11,10 +12,15 @@ if os.path.exists(".env"):
         if "=" in line and not line.strip().startswith("#"):
             k,v=line.strip().split("=",1); os.environ.setdefault(k,v)
 
-from exchange_prices import fetch_tickers, calc_spreads
-from notion_publish import publish_dashboard, _p_spans
 from coinbase_balance import get_btc_balance
+from exchange_prices import calc_spreads, fetch_tickers
+from fee_schedule import schedule
 from fees import get_fees
+from notion_publish import _p_spans, publish_dashboard
+from opportunity_index import OpportunityIndex
+
+# Routes from the latest run, ranked by gross_usd / net_usd / net_pct (see opportunity_index)
+OPPORTUNITIES = OpportunityIndex()
 
 def fmt_usd(x, dec=2):
     if x is None or (isinstance(x,float) and (np.isnan(x) or np.isinf(x))):
@@ -55,6 +61,37 @@ def compute_net_for_pair(symbol, buy_ex, buy_px, sell_ex, sell_px):
         "taker_buy_usd": taker_buy_usd, "taker_sell_usd": taker_sell_usd, "withdraw_usd": withdraw_usd,
     }
 
+def _fee_lookup(exchanges, symbols):
+    # (taker rate, withdrawal coin) per row: id lookups + one gather from the compiled schedule
+    return schedule().rates(exchanges, symbols, "taker")
+
+def compute_net_frame(pairs: pd.DataFrame) -> pd.DataFrame:
+    """
+    Vectorized compute_net_for_pair over a pair_detail-shaped frame
+    (symbol, buy_ex, buy, sell_ex, sell): returns it with the same fee/net columns appended.
+    """
+    out = pairs.reset_index(drop=True)
+    buy_px  = out["buy"].to_numpy(dtype=float)
+    sell_px = out["sell"].to_numpy(dtype=float)
+    taker_buy, wd_coin = _fee_lookup(out["buy_ex"], out["symbol"])
+    taker_sell, _      = _fee_lookup(out["sell_ex"], out["symbol"])
+    gross_usd = sell_px - buy_px
+    taker_buy_usd  = buy_px  * taker_buy
+    taker_sell_usd = sell_px * taker_sell
+    withdraw_usd   = wd_coin * sell_px
+    fees_usd = taker_buy_usd + taker_sell_usd + withdraw_usd
+    net_usd = gross_usd - fees_usd
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gross_pct = np.where(buy_px != 0, gross_usd / buy_px * 100, np.nan)
+        net_pct   = np.where(buy_px != 0, net_usd   / buy_px * 100, np.nan)
+    net = pd.DataFrame({
+        "gross_usd": gross_usd, "gross_pct": gross_pct,
+        "fees_usd": fees_usd,   "net_usd": net_usd, "net_pct": net_pct,
+        "taker_buy": taker_buy, "taker_sell": taker_sell, "withdraw_coin": wd_coin,
+        "taker_buy_usd": taker_buy_usd, "taker_sell_usd": taker_sell_usd, "withdraw_usd": withdraw_usd,
+    })
+    return pd.concat([out, net], axis=1)
+
 def make_fee_spans(symbol, taker_buy, taker_buy_usd, taker_sell, taker_sell_usd, withdraw_coin, withdraw_usd):
     base = symbol.split("/")[0]
     return [
@@ -87,26 +124,29 @@ def make_net_spans(symbol, net_usd, net_pct):
 
 def append_history(ts_iso, pair_detail, sym_summary):
     Path("data").mkdir(exist_ok=True)
-    rows=[]
-    for sym in sym_summary["symbol"].dropna().unique().tolist():
-        sub = pair_detail[pair_detail["symbol"]==sym].sort_values("edge_pct", ascending=False).head(1)
-        if sub.empty: continue
-        r=sub.iloc[0]
-        calc = compute_net_for_pair(sym, r["buy_ex"], float(r["buy"]), r["sell_ex"], float(r["sell"]))
-        rows.append({
+    # best-edge route per symbol (first on ties), in sym_summary order
+    syms = sym_summary["symbol"].dropna().unique().tolist()
+    best = pd.DataFrame()
+    if not pair_detail.empty and syms:
+        pdx = pair_detail[pair_detail["symbol"].isin(syms)]
+        if not pdx.empty:
+            best = pdx.loc[pdx.groupby("symbol", sort=False)["edge_pct"].idxmax()]
+            best = best.set_index("symbol").reindex([s for s in syms if s in set(best["symbol"])]).reset_index()
+            best = compute_net_frame(best[["symbol","buy_ex","buy","sell_ex","sell"]])
+    if not best.empty:
+        rows = pd.DataFrame({
             "timestamp": ts_iso,
-            "symbol": sym,
-            "buy_ex": r["buy_ex"], "buy": float(r["buy"]),
-            "sell_ex": r["sell_ex"], "sell": float(r["sell"]),
-            "gross_spread_usd": calc["gross_usd"],
-            "gross_spread_pct": calc["gross_pct"],
-            "fees_usd": calc["fees_usd"],
-            "net_spread_usd": calc["net_usd"],
-            "net_spread_pct": calc["net_pct"],
+            "symbol": best["symbol"],
+            "buy_ex": best["buy_ex"], "buy": best["buy"].astype(float),
+            "sell_ex": best["sell_ex"], "sell": best["sell"].astype(float),
+            "gross_spread_usd": best["gross_usd"],
+            "gross_spread_pct": best["gross_pct"],
+            "fees_usd": best["fees_usd"],
+            "net_spread_usd": best["net_usd"],
+            "net_spread_pct": best["net_pct"],
         })
-    if rows:
         f1="data/best_edges.csv"; hdr = not Path(f1).exists()
-        pd.DataFrame(rows).to_csv(f1, mode="a", index=False, header=hdr)
+        rows.to_csv(f1, mode="a", index=False, header=hdr)
 
     sym = sym_summary.copy()
     sym.insert(0, "timestamp", ts_iso)
@@ -122,17 +162,12 @@ def run():
     title_main = "Daily Crypto Arbitrage"
     title_date = now
 
-    # Build augmented pair dataframe with fee breakdowns
+    # Build augmented pair dataframe with fee breakdowns, ranked by the top-K index
     pd2 = pair_detail.copy()
     if not pd2.empty:
-        net_fields = pd2.apply(
-            lambda r: compute_net_for_pair(r["symbol"], r["buy_ex"], float(r["buy"]), r["sell_ex"], float(r["sell"])),
-            axis=1
-        )
-        pd2 = pd.concat([pd2.reset_index(drop=True), pd.DataFrame(list(net_fields))], axis=1)
-        best_net = pd2.sort_values(["net_pct"], ascending=False).head(1)
-    else:
-        best_net = pd.DataFrame()
+        pd2 = compute_net_frame(pd2)
+    OPPORTUNITIES.load_frame(pd2)
+    best_net = OPPORTUNITIES.top_frame(1, "net_pct")
 
     # Spotlight/Best trade (as spans so we can color)
     best_trade_spans = None
@@ -154,7 +189,7 @@ def run():
     # Bulleted “Top Opportunities” as spans (fees in blue)
     bullets_spans = []
     if not pd2.empty:
-        for p in pd2.sort_values(["gross_usd"], ascending=False).head(8).itertuples():
+        for p in OPPORTUNITIES.top_frame(8, "gross_usd").itertuples():
             sym = p.symbol
             items = [
                 # GROSS first in green
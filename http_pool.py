@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import os
+import threading
+import weakref
+from urllib.parse import urlsplit
+
+import httpx
+
+import venue_limits
+
+# Shared keep-alive HTTP transport for feeds/, providers/, exchanges.py and
+# live_feeds.py. One pooled client per host (so connection limits apply per
+# host), reused for the life of the process instead of a new client and TLS
+# handshake per request. Every request is admitted by venue_limits (rate limit +
+# circuit breaker) for its host's venue. HTTP/2 is negotiated via ALPN when the
+# optional `h2` package is installed; hosts that only speak HTTP/1.1 fall back
+# transparently.
+
+DEFAULT_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+MAX_CONN_PER_HOST = int(os.getenv("HTTP_MAX_CONN_PER_HOST", "10"))
+MAX_KEEPALIVE_PER_HOST = int(os.getenv("HTTP_MAX_KEEPALIVE_PER_HOST", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+USER_AGENT = os.getenv("HTTP_USER_AGENT", "coinbase_pipeline")
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = os.getenv("HTTP2", "1").lower() in ("1", "true", "yes", "y")
+except ImportError:
+    HTTP2 = False
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=MAX_CONN_PER_HOST,
+                        max_keepalive_connections=MAX_KEEPALIVE_PER_HOST,
+                        keepalive_expiry=KEEPALIVE_EXPIRY)
+
+
+def _host(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class HostPool:
+    """Dispatches requests to a long-lived httpx.Client per scheme://host."""
+
+    def __init__(self):
+        self._clients: dict[str, httpx.Client] = {}
+        self._lock = threading.Lock()
+
+    def client(self, url: str) -> httpx.Client:
+        host = _host(url)
+        c = self._clients.get(host)
+        if c is None:
+            with self._lock:
+                c = self._clients.get(host)
+                if c is None:
+                    c = self._clients[host] = httpx.Client(
+                        http2=HTTP2, limits=_limits(), timeout=DEFAULT_TIMEOUT,
+                        headers={"User-Agent": USER_AGENT})
+        return c
+
+    def request(self, method: str, url: str, **kw) -> httpx.Response:
+        ctl = venue_limits.for_url(url)
+        ctl.acquire()
+        try:
+            r = self.client(url).request(method, url, **kw)
+        except Exception:
+            ctl.failure()
+            raise
+        except BaseException:
+            ctl.abandon()               # interrupted, not a venue failure
+            raise
+        ctl.record_status(r.status_code, r.headers.get("Retry-After"))
+        return r
+
+    def get(self, url: str, **kw) -> httpx.Response:
+        return self.request("GET", url, **kw)
+
+    def post(self, url: str, **kw) -> httpx.Response:
+        return self.request("POST", url, **kw)
+
+    def close(self) -> None:
+        with self._lock:
+            for c in self._clients.values():
+                c.close()
+            self._clients.clear()
+
+
+class AsyncHostPool:
+    """Async twin of HostPool; clients are per event loop (each asyncio.run makes a new one)."""
+
+    def __init__(self):
+        self._loops: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]] = weakref.WeakKeyDictionary()
+
+    def client(self, url: str) -> httpx.AsyncClient:
+        per_loop = self._loops.setdefault(asyncio.get_running_loop(), {})
+        host = _host(url)
+        c = per_loop.get(host)
+        if c is None:
+            c = per_loop[host] = httpx.AsyncClient(
+                http2=HTTP2, limits=_limits(), timeout=DEFAULT_TIMEOUT,
+                headers={"User-Agent": USER_AGENT})
+        return c
+
+    async def request(self, method: str, url: str, **kw) -> httpx.Response:
+        ctl = venue_limits.for_url(url)
+        await ctl.aacquire()
+        try:
+            r = await self.client(url).request(method, url, **kw)
+        except asyncio.CancelledError:
+            ctl.abandon()               # a hedge loser being cancelled is not a venue failure
+            raise
+        except Exception:
+            ctl.failure()
+            raise
+        ctl.record_status(r.status_code, r.headers.get("Retry-After"))
+        return r
+
+    async def get(self, url: str, **kw) -> httpx.Response:
+        return await self.request("GET", url, **kw)
+
+    async def post(self, url: str, **kw) -> httpx.Response:
+        return await self.request("POST", url, **kw)
+
+    async def aclose(self) -> None:
+        """Close this loop's clients; call before the loop ends (e.g. at the end of asyncio.run)."""
+        per_loop = self._loops.pop(asyncio.get_running_loop(), {})
+        for c in per_loop.values():
+            await c.aclose()
+
+
+_POOL = HostPool()
+_APOOL = AsyncHostPool()
+atexit.register(_POOL.close)
+
+
+def session() -> HostPool:
+    """Process-wide pool; has the httpx.Client-style get/post/request methods."""
+    return _POOL
+
+
+def async_session() -> AsyncHostPool:
+    return _APOOL
+
+
+def get(url: str, **kw) -> httpx.Response:
+    return _POOL.get(url, **kw)
+
+
+def post(url: str, **kw) -> httpx.Response:
+    return _POOL.post(url, **kw)
@@ -1,41 +1,46 @@
 from __future__ import annotations
-import os, time
+
+import os
+import time
+
 import httpx
 
+import http_pool
+import venue_limits
+from symbol_registry import canonical, get_registry
+
 # ---- Config ----
 DEFAULT_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "5"))
 RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
 
-# Normalize symbols (UI may pass "BTC-USD" or "BTCUSD")
+# Normalize symbols (UI may pass "BTC-USD", "BTCUSD" or "BTC"; USD is assumed)
 def _norm(symbol: str) -> str:
-    s = symbol.replace("-", "").upper()
-    if s.endswith("USDT"):  # keep USDT as-is
-        return s
-    # assume USD if not specified second asset
-    if s.endswith("USD"): return s
-    if s.endswith("USDC"): return s
-    if s.endswith("EUR"): return s
-    return s + "USD"
+    return canonical(symbol).replace("/", "")
 
 def _bitstamp_pair(symbol: str) -> str:
     # Bitstamp uses lowercase like 'btcusd'
-    return _norm(symbol).lower()
+    return get_registry().native("bitstamp", symbol) or _norm(symbol).lower()
 
 def _bitfinex_pair(symbol: str) -> str:
     # Bitfinex v2 ticker likes 'tBTCUSD'
-    return "t" + _norm(symbol)
+    return get_registry().native("bitfinex", symbol) or "t" + _norm(symbol)
 
-def _get(client: httpx.Client, url: str) -> httpx.Response:
+def _get(client: httpx.Client | http_pool.HostPool, url: str) -> httpx.Response:
+    # http_pool paces and circuit-breaks per venue; retries back off with jitter and
+    # stop at once when the venue's breaker is open
     last_ex = None
-    for _ in range(RETRIES + 1):
+    for attempt in range(RETRIES + 1):
         try:
             return client.get(url, timeout=DEFAULT_TIMEOUT)
+        except venue_limits.VenueUnavailable:
+            raise
         except Exception as ex:
             last_ex = ex
-            time.sleep(0.25)
+            if attempt < RETRIES:
+                time.sleep(venue_limits.backoff(attempt))
     raise last_ex
 
-def fetch_bitstamp_price(client: httpx.Client, symbol: str) -> float:
+def fetch_bitstamp_price(client: httpx.Client | http_pool.HostPool, symbol: str) -> float:
     pair = _bitstamp_pair(symbol)
     # https://www.bitstamp.net/api/v2/ticker/btcusd
     r = _get(client, f"https://www.bitstamp.net/api/v2/ticker/{pair}")
@@ -44,7 +49,7 @@ def fetch_bitstamp_price(client: httpx.Client, symbol: str) -> float:
     # 'last' is a string, e.g. "61234.12"
     return float(data["last"])
 
-def fetch_bitfinex_price(client: httpx.Client, symbol: str) -> float:
+def fetch_bitfinex_price(client: httpx.Client | http_pool.HostPool, symbol: str) -> float:
     pair = _bitfinex_pair(symbol)
     # https://api-pub.bitfinex.com/v2/ticker/tBTCUSD
     r = _get(client, f"https://api-pub.bitfinex.com/v2/ticker/{pair}")
@@ -57,11 +62,11 @@ def fetch_prices(symbol: str) -> dict:
     """Return dict with live prices for Bitstamp and Bitfinex."""
     symbol = _norm(symbol)
     out = {"symbol": symbol, "sources": {}, "ts": time.time()}
-    with httpx.Client(headers={"User-Agent": "coinbase_pipeline/streamlit"}) as client:
-        bs = fetch_bitstamp_price(client, symbol)
-        bf = fetch_bitfinex_price(client, symbol)
-        out["sources"]["bitstamp"] = bs
-        out["sources"]["bitfinex"] = bf
+    client = http_pool.session()  # shared keep-alive clients, one per host
+    bs = fetch_bitstamp_price(client, symbol)
+    bf = fetch_bitfinex_price(client, symbol)
+    out["sources"]["bitstamp"] = bs
+    out["sources"]["bitfinex"] = bf
     # Spread (+ means Bitfinex > Bitstamp)
     diff = out["sources"]["bitfinex"] - out["sources"]["bitstamp"]
     mid = (out["sources"]["bitfinex"] + out["sources"]["bitstamp"]) / 2.0
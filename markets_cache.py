@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+import pickle
+import threading
+import time
+import zlib
+from pathlib import Path
+
+# Persistent cache of ccxt load_markets() results, one zlib-compressed pickle
+# per venue. hydrate() gives a fresh ccxt instance its markets without touching
+# the network; stale entries are still served while a daemon thread refreshes them.
+
+CACHE_DIR = Path(os.getenv("MARKETS_CACHE_DIR", "data/cache/markets"))
+MARKETS_TTL = float(os.getenv("MARKETS_CACHE_TTL", str(6 * 3600)))
+
+_mem: dict[str, tuple[float, dict, dict]] = {}   # venue -> (ts, markets, currencies)
+_lock = threading.Lock()
+_refreshing: set = set()
+
+
+def _path(venue: str) -> Path:
+    return CACHE_DIR / f"{venue}.pkl.z"
+
+
+def load(venue: str) -> tuple[float, dict, dict] | None:
+    """(ts, markets, currencies) from memory or disk, regardless of age."""
+    hit = _mem.get(venue)
+    if hit:
+        return hit
+    try:
+        ts, markets, currencies = pickle.loads(zlib.decompress(_path(venue).read_bytes()))
+    except Exception:
+        return None
+    with _lock:
+        _mem[venue] = (ts, markets, currencies)
+    return _mem[venue]
+
+
+def store(venue: str, markets: dict, currencies: dict | None = None) -> None:
+    entry = (time.time(), markets, currencies or {})
+    with _lock:
+        _mem[venue] = entry
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        p = _path(venue)
+        tmp = p.with_suffix(".tmp")
+        tmp.write_bytes(zlib.compress(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL), 6))
+        tmp.replace(p)
+    except Exception:
+        pass
+
+
+def _refresh(venue: str) -> None:
+    try:
+        import ccxt
+        inst = getattr(ccxt, venue)({"enableRateLimit": True})
+        markets = inst.load_markets(reload=True)
+        store(venue, markets, inst.currencies)
+    except Exception:
+        pass
+    finally:
+        with _lock:
+            _refreshing.discard(venue)
+
+
+def refresh_async(venue: str) -> None:
+    """Reload `venue` markets on a daemon thread (at most one in flight per venue)."""
+    with _lock:
+        if venue in _refreshing:
+            return
+        _refreshing.add(venue)
+    threading.Thread(target=_refresh, args=(venue,), name=f"markets-{venue}", daemon=True).start()
+
+
+def hydrate(inst, venue: str | None = None):
+    """
+    Populate a ccxt instance's markets from the cache (milliseconds), falling back to
+    a blocking load_markets() only when nothing is cached yet. Returns `inst`.
+    """
+    venue = venue or inst.id
+    hit = load(venue)
+    if hit is None:
+        markets = inst.load_markets()
+        store(venue, markets, inst.currencies)
+        return inst
+    ts, markets, currencies = hit
+    inst.set_markets(markets, currencies or None)
+    if time.time() - ts > MARKETS_TTL:
+        refresh_async(venue)
+    return inst
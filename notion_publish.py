@@ -1,9 +1,10 @@
-import os
 import json
+import os
 import time
-from typing import List, Dict, Any, Tuple
+from typing import Any
+
 
-def to_markdown(rows: List[Dict[str, Any]]) -> str:
+def to_markdown(rows: list[dict[str, Any]]) -> str:
     cols = ["pair","spot","24h_low","24h_high","best_bid","best_ask","spread_pct","fee_buy_pct","fee_sell_pct","effective_buy","effective_sell","edge_after_fees_pct"]
     header = "| " + " | ".join(cols) + " |"
     sep = "| " + " | ".join(["---"]*len(cols)) + " |"
@@ -21,14 +22,14 @@ def to_markdown(rows: List[Dict[str, Any]]) -> str:
         lines.append("| " + " | ".join(vals) + " |")
     return "\n".join(lines)
 
-def _notion_headers(token: str) -> Dict[str,str]:
+def _notion_headers(token: str) -> dict[str,str]:
     return {
         "Authorization": f"Bearer {token}",
         "Notion-Version": "2022-06-28",
         "Content-Type": "application/json",
     }
 
-def _mk_paragraph(text: str) -> Dict[str, Any]:
+def _mk_paragraph(text: str) -> dict[str, Any]:
     return {
         "object": "block",
         "type": "paragraph",
@@ -37,7 +38,7 @@ def _mk_paragraph(text: str) -> Dict[str, Any]:
         }
     }
 
-def _mk_md_block(md: str) -> List[Dict[str, Any]]:
+def _mk_md_block(md: str) -> list[dict[str, Any]]:
     # We’ll just dump as a code block for fidelity.
     return [{
         "object":"block",
@@ -48,7 +49,7 @@ def _mk_md_block(md: str) -> List[Dict[str, Any]]:
         }
     }]
 
-def publish_to_notion(page_id: str, rows: List[Dict[str, Any]]) -> Tuple[bool, str]:
+def publish_to_notion(page_id: str, rows: list[dict[str, Any]]) -> tuple[bool, str]:
     token = os.getenv("NOTION_TOKEN") or os.getenv("NOTION_SECRET") or os.getenv("NOTION_API_KEY")
     if not token:
         return False, "No NOTION_TOKEN/NOTION_SECRET found; skipping Notion publish."
@@ -69,6 +70,6 @@ def publish_to_notion(page_id: str, rows: List[Dict[str, Any]]) -> Tuple[bool, s
 
 if __name__ == "__main__":
     # Ad-hoc test run: pull orchestrator, print markdown
-    from orchestrate_feeds import collect_metrics
-    rows = collect_metrics()
+    from orchestrate_feeds import collect_metrics_concurrent
+    rows = collect_metrics_concurrent()
     print(to_markdown(rows))
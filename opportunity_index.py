@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from collections.abc import Iterable
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from fee_schedule import schedule
+from spread_engine import IndexedHeap
+
+# Top-K index over buy/sell routes, one indexed max-heap per ranking metric.
+# Upserting or removing a route is O(log n) per metric; top(k, by) walks the heap
+# best-first and costs O(k log k) regardless of how many routes are indexed, so
+# the publisher and the dashboard's Top Routes view ask for "top 8 by net"
+# without sorting.
+#
+#   idx = OpportunityIndex().load_frame(compute_net_frame(pair_detail))
+#   idx = OpportunityIndex().load_pairs(pair_detail)      # same, fees via route_row
+#   idx.top(8, "gross_usd")           # list of route rows, best first
+#   idx.attach(store)                 # keep routes current from a QuoteStore
+#
+# Route rows carry the compute_net_frame columns (per 1 unit of the base asset).
+
+METRICS = ("gross_usd", "net_usd", "net_pct")
+Route = tuple[str, str, str]            # (symbol, buy_ex, sell_ex)
+
+
+def route_row(symbol: str, buy_ex: str, buy: float, sell_ex: str, sell: float) -> dict[str, Any]:
+    """One compute_net_frame row (taker both legs + withdrawal at the sell price)."""
+    fs = schedule()
+    taker_buy, wd_coin = fs.fee(buy_ex, "taker", symbol), fs.withdraw_coin(buy_ex, symbol)
+    taker_sell = fs.fee(sell_ex, "taker", symbol)
+    gross_usd = sell - buy
+    taker_buy_usd, taker_sell_usd, withdraw_usd = buy * taker_buy, sell * taker_sell, wd_coin * sell
+    fees_usd = taker_buy_usd + taker_sell_usd + withdraw_usd
+    net_usd = gross_usd - fees_usd
+    return {"symbol": symbol, "buy_ex": buy_ex, "buy": buy, "sell_ex": sell_ex, "sell": sell,
+            "edge_pct": gross_usd / buy * 100.0 if buy else np.nan,
+            "gross_usd": gross_usd, "gross_pct": gross_usd / buy * 100.0 if buy else np.nan,
+            "fees_usd": fees_usd, "net_usd": net_usd,
+            "net_pct": net_usd / buy * 100.0 if buy else np.nan,
+            "taker_buy": taker_buy, "taker_sell": taker_sell, "withdraw_coin": wd_coin,
+            "taker_buy_usd": taker_buy_usd, "taker_sell_usd": taker_sell_usd,
+            "withdraw_usd": withdraw_usd}
+
+
+class OpportunityIndex:
+    def __init__(self, metrics: Iterable[str] = METRICS):
+        self.metrics = tuple(metrics)
+        self._heaps: dict[str, IndexedHeap] = {m: IndexedHeap() for m in self.metrics}
+        self._rows: dict[Route, dict[str, Any]] = {}
+        self._px: dict[str, dict[str, float]] = {}     # symbol -> venue -> price (attach mode)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    # ---- writes ----
+    def upsert(self, row: dict[str, Any]) -> None:
+        with self._lock:
+            self._upsert(row)
+
+    def remove(self, symbol: str, buy_ex: str, sell_ex: str) -> None:
+        with self._lock:
+            self._remove((symbol, buy_ex, sell_ex))
+
+    def _upsert(self, row: dict[str, Any]) -> None:
+        key = (row["symbol"], row["buy_ex"], row["sell_ex"])
+        self._rows[key] = row
+        for m, h in self._heaps.items():
+            v = row.get(m)
+            if v is None or not np.isfinite(v):
+                h.remove(key)
+            else:
+                h.set(key, -float(v))       # max-heap
+
+    def _remove(self, key: Route) -> None:
+        self._rows.pop(key, None)
+        for h in self._heaps.values():
+            h.remove(key)
+
+    def load_frame(self, df: pd.DataFrame, replace: bool = True) -> OpportunityIndex:
+        """Index a pair_detail-shaped frame; replace=True drops routes missing from it."""
+        rows = df.to_dict("records")
+        keep = {(r["symbol"], r["buy_ex"], r["sell_ex"]) for r in rows}
+        if replace:
+            for key in [k for k in self._rows if k not in keep]:
+                self.remove(*key)
+        for r in rows:
+            self.upsert(r)
+        return self
+
+    def load_pairs(self, pairs: pd.DataFrame, replace: bool = True) -> OpportunityIndex:
+        """load_frame for a calc_spreads pair_detail (symbol, buy_ex, buy, sell_ex, sell)."""
+        rows = [route_row(r.symbol, r.buy_ex, float(r.buy), r.sell_ex, float(r.sell))
+                for r in pairs.itertuples(index=False)]
+        return self.load_frame(pd.DataFrame(rows), replace)
+
+    def quote(self, venue: str, symbol: str, price: float | None) -> None:
+        """New price for one venue: re-rank the 2(V-1) routes through it."""
+        with self._lock:        # listener threads race on _px; book and heaps move together
+            book = self._px.setdefault(symbol, {})
+            if price is None or not np.isfinite(price) or price <= 0:
+                book.pop(venue, None)
+                for other in book:
+                    self._remove((symbol, venue, other))
+                    self._remove((symbol, other, venue))
+                return
+            book[venue] = float(price)
+            for other, px in book.items():
+                if other == venue:
+                    continue
+                self._upsert(route_row(symbol, venue, price, other, px))
+                self._upsert(route_row(symbol, other, px, venue, price))
+
+    def attach(self, store) -> OpportunityIndex:
+        """Follow a feeds.quote_store.QuoteStore (listener hook), starting from its snapshot."""
+        for q in store.snapshot():
+            self.quote(q.venue, q.symbol, q.price)
+        store.subscribe(lambda q: self.quote(q.venue, q.symbol, q.price))
+        return self
+
+    # ---- reads ----
+    def top(self, k: int, by: str = "net_usd") -> list[dict[str, Any]]:
+        """The k best routes by `by`, best first."""
+        with self._lock:
+            h = self._heaps[by]._h
+            out: list[dict[str, Any]] = []
+            frontier = [(h[0], 0)] if h else []
+            while frontier and len(out) < k:
+                (_, key), i = heapq.heappop(frontier)
+                out.append(self._rows[key])
+                for c in (2 * i + 1, 2 * i + 2):
+                    if c < len(h):
+                        heapq.heappush(frontier, (h[c], c))
+            return out
+
+    def top_frame(self, k: int, by: str = "net_usd") -> pd.DataFrame:
+        return pd.DataFrame(self.top(k, by))
+
+    def best(self, by: str = "net_usd") -> dict[str, Any] | None:
+        top = self.top(1, by)
+        return top[0] if top else None
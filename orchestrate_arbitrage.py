@@ -1,14 +1,19 @@
-import os, json, time
+import json
+import os
+import time
 from pathlib import Path
-from typing import Dict, Tuple
+
 import yaml
-from analytics.arbitrage import load_config, analyze
-from visual_display import make_boxes, render_table, append_history, sparkline
 from rich.console import Console
 from rich.layout import Layout
 from rich.panel import Panel
 
-def console_view(metrics: Dict[str, Tuple[float,bool]], tables: dict):
+from analytics.arbitrage import analyze, load_config
+from feeds.stream_aggregator import start_if_enabled
+from visual_display import append_history, make_boxes, render_table, sparkline
+
+
+def console_view(metrics: dict[str, tuple[float,bool]], tables: dict):
     con = Console()
     layout = Layout()
     layout.split(
@@ -32,7 +37,11 @@ def main_once():
     cfg = load_config()
     symbols = cfg["symbols"]
     providers_cfg = cfg["providers"]
-    metrics, tables = analyze(symbols, providers_cfg, notional=10_000.0)
+    # STREAMING=1: quotes come from the WebSocket aggregator instead of polling providers
+    agg = start_if_enabled(symbols, wait=float(os.getenv("STREAM_WARMUP_S", "3")))
+    metrics, tables = analyze(symbols, providers_cfg, notional=10_000.0,
+                              store=agg.store if agg else None,
+                              max_age=float(os.getenv("STREAM_MAX_AGE", "10")) if agg else None)
     # include fee values in metric titles already; boxes will show blue for "Gas Fee"
     console_view(metrics, tables)
     Path("logs/feeds/last_metrics.json").write_text(json.dumps({k:[v,fee] for k,(v,fee) in metrics.items()}, indent=2), encoding="utf-8")
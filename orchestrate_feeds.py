@@ -1,9 +1,13 @@
+import asyncio
 import os
-from typing import List, Dict, Any
-from feeds.coinbase_public import assemble_pair_metrics
+from typing import Any
+
+import http_pool
+from feeds.coinbase_public import assemble_pair_metrics, assemble_pair_metrics_async
 from visual_display import display_metrics
 
-def _pairs() -> List[str]:
+
+def _pairs() -> list[str]:
     raw = os.getenv("PAIRS", "BTC-USD,ETH-USD,XRP-USD")
     return [p.strip().upper() for p in raw.split(",") if p.strip()]
 
@@ -13,14 +17,35 @@ def _fee(name: str, default: float) -> float:
     except Exception:
         return default
 
-def collect_metrics() -> List[Dict[str, Any]]:
+# Global cap on in-flight HTTP requests for the concurrent collector
+MAX_INFLIGHT = int(os.getenv("FEEDS_MAX_INFLIGHT", "16"))
+
+def _fees():
     fee_buy = _fee("FEE_BUY_TAKER", 0.006)   # 0.6% default (retail-ish)
     fee_sell = _fee("FEE_SELL_TAKER", 0.006) # 0.6% default
+    return fee_buy, fee_sell
+
+def collect_metrics() -> list[dict[str, Any]]:
+    fee_buy, fee_sell = _fees()
     out = []
     for pair in _pairs():
         out.append(assemble_pair_metrics(pair, fee_buy, fee_sell))
     return out
 
+async def collect_metrics_async() -> list[dict[str, Any]]:
+    """All pairs and all three lookups at once, under one MAX_INFLIGHT semaphore."""
+    fee_buy, fee_sell = _fees()
+    limit = asyncio.Semaphore(MAX_INFLIGHT)
+    try:
+        return list(await asyncio.gather(
+            *(assemble_pair_metrics_async(pair, fee_buy, fee_sell, limit) for pair in _pairs())))
+    finally:
+        await http_pool.async_session().aclose()
+
+def collect_metrics_concurrent() -> list[dict[str, Any]]:
+    """Sync entry point for collect_metrics_async (same rows, same order)."""
+    return asyncio.run(collect_metrics_async())
+
 def main():
     rows = collect_metrics()
     display_metrics(rows)
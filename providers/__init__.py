@@ -0,0 +1,35 @@
+# Price provider plugins (wired up in config/feeds.yaml -> providers).
+#
+# Contract:
+#   fetch_prices(symbols) -> {symbol: price}
+#   fetch_quotes(symbols) -> {symbol: {"bid": .., "ask": .., "last": ..}}   optional, bulk
+#
+# fetch_quotes should cost one request per venue for the whole symbol list; any of
+# bid/ask/last may be None. A quote priced off another quote currency's book (a
+# USDT book standing in for USD) carries "quote": "USDT" and is converted with
+# quote_fx before comparison. analytics.arbitrage prefers it when a plugin has one.
+
+
+def quote_price(q: dict[str, float | None]) -> float | None:
+    """last, else mid -- the same preference as exchange_prices._price_of."""
+    if q.get("last"):
+        return q["last"]
+    if q.get("bid") and q.get("ask"):
+        return (q["bid"] + q["ask"]) / 2.0
+    return None
+
+
+def prices_from_quotes(quotes: dict[str, dict[str, float | None]]) -> dict[str, float]:
+    out = {}
+    for s, q in quotes.items():
+        px = quote_price(q)
+        if px is not None:
+            out[s] = float(px)
+    return out
+
+
+def _f(x) -> float | None:
+    try:
+        return float(x) if x not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
@@ -1,18 +1,53 @@
-import httpx
-from typing import Dict, List
+import json
 
-def _bn_symbol(sym: str) -> str:
-    if sym.endswith("-USD"):
-        base = sym.split("-")[0]
-        return f"{base}USDT"
-    return sym.replace("-", "")
+import http_pool
+from providers import _f, prices_from_quotes
+from symbol_registry import canonical, get_registry
 
-def fetch_prices(symbols: List[str]) -> Dict[str, float]:
+
+def _bn_symbol(sym: str) -> str | None:
+    # "BTC-USD" -> "BTCUSDT" (binance has no USD books; registry falls back to USDT/USDC)
+    return get_registry().native("binance", sym, alias_quote=True)
+
+def _bn_quote(sym: str) -> str:
+    # quote currency of the book _bn_symbol picked ("USDT" for BTC-USD)
+    return canonical(get_registry().unified("binance", sym, alias_quote=True) or sym).split("/")[1]
+
+def _by_native(symbols: list[str]) -> dict[str, list[str]]:
+    rev = {}
+    for sym in symbols:
+        b = _bn_symbol(sym)
+        if b:
+            rev.setdefault(b, []).append(sym)
+    return rev
+
+def _ticker_24hr(rev: dict[str, list[str]]):
+    return http_pool.get("https://api.binance.com/api/v3/ticker/24hr",
+                         params={"symbols": json.dumps(sorted(rev), separators=(",", ":"))},
+                         timeout=10)
+
+def fetch_quotes(symbols: list[str]) -> dict[str, dict[str, float]]:
+    rev = _by_native(symbols)
+    if not rev:
+        return {}
+    # one 24hr ticker call for the whole list (lastPrice + bidPrice/askPrice)
+    r = _ticker_24hr(rev)
+    if r.status_code == 400:
+        # an unknown symbol fails the whole batch; drop what binance does not list and retry
+        get_registry().ensure("binance")
+        listed = _by_native(symbols)
+        if not listed:
+            return {}
+        if listed.keys() != rev.keys():
+            rev = listed
+            r = _ticker_24hr(rev)
+    r.raise_for_status()
     out = {}
-    with httpx.Client(timeout=10) as s:
-        for sym in symbols:
-            b = _bn_symbol(sym)
-            r = s.get("https://api.binance.com/api/v3/ticker/price", params={"symbol": b})
-            if r.status_code == 200:
-                out[sym] = float(r.json()["price"])
+    for d in r.json():
+        for sym in rev.get(d.get("symbol"), ()):
+            out[sym] = {"bid": _f(d.get("bidPrice")), "ask": _f(d.get("askPrice")),
+                        "last": _f(d.get("lastPrice")), "quote": _bn_quote(sym)}
     return out
+
+def fetch_prices(symbols: list[str]) -> dict[str, float]:
+    return prices_from_quotes(fetch_quotes(symbols))
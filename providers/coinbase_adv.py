@@ -1,21 +1,41 @@
-import os, httpx
-from typing import Dict, List
+import http_pool
+from providers import _f, prices_from_quotes
+from symbol_registry import canonical
+
 
 def _cb_symbol(sym: str) -> str:
     return sym  # e.g., "BTC-USD"
 
-def fetch_prices(symbols: List[str]) -> Dict[str, float]:
-    out = {}
-    headers = {}
-    # If you want, set COINBASE_API_KEY in .env; not required for public tickers
-    api_key = os.getenv("COINBASE_API_KEY") or os.getenv("CB_API_KEY")
-    if api_key:
-        headers["CB-ACCESS-KEY"] = api_key
-    with httpx.Client(timeout=10) as s:
-        for sym in symbols:
-            p = _cb_symbol(sym)
-            r = s.get(f"https://api.exchange.coinbase.com/products/{p}/ticker", headers=headers)
-            if r.status_code == 200:
-                data = r.json()
-                out[sym] = float(data["price"])
-    return out
+def _best_bid_ask(products: list[str]) -> dict[str, dict[str, float]] | None:
+    # Advanced Trade best_bid_ask takes a product list but needs credentials
+    import exchange_pool
+    ex = exchange_pool.coinbase_private()
+    if ex is None:
+        return None
+    by_unified = {canonical(p): p for p in products}
+    tickers = ex.fetch_bids_asks(list(by_unified))
+    return {by_unified[u]: {"bid": _f(t.get("bid")), "ask": _f(t.get("ask")), "last": None}
+            for u, t in tickers.items() if u in by_unified}
+
+def _market_products(products: list[str]) -> dict[str, dict[str, float]]:
+    # public bulk endpoint: last price only
+    r = http_pool.get("https://api.coinbase.com/api/v3/brokerage/market/products",
+                      params=[("product_ids", p) for p in products], timeout=10)
+    r.raise_for_status()
+    return {d.get("product_id"): {"bid": None, "ask": None, "last": _f(d.get("price"))}
+            for d in r.json().get("products") or ()}
+
+def fetch_quotes(symbols: list[str]) -> dict[str, dict[str, float]]:
+    prod = {_cb_symbol(s): s for s in symbols}
+    if not prod:
+        return {}
+    try:
+        books = _best_bid_ask(list(prod))
+    except Exception:
+        books = None
+    if books is None:
+        books = _market_products(list(prod))
+    return {prod[p]: q for p, q in books.items() if p in prod}
+
+def fetch_prices(symbols: list[str]) -> dict[str, float]:
+    return prices_from_quotes(fetch_quotes(symbols))
@@ -1,22 +1,20 @@
-import httpx
-from typing import Dict, List
+import http_pool
+from symbol_registry import get_registry
 
-_MAP = {
-    "BTC-USD": "bitcoin",
-    "XRP-USD": "ripple",
-}
 
-def fetch_prices(symbols: List[str]) -> Dict[str, float]:
-    ids = ",".join(_MAP[s] for s in symbols if s in _MAP)
-    if not ids:
+def fetch_prices(symbols: list[str]) -> dict[str, float]:
+    reg = get_registry()
+    ids_by_sym = {s: reg.native("coingecko", s) for s in symbols}
+    ids_by_sym = {s: cid for s, cid in ids_by_sym.items() if cid}
+    if not ids_by_sym:
         return {}
-    r = httpx.get("https://api.coingecko.com/api/v3/simple/price",
-                  params={"ids": ids, "vs_currencies": "usd"}, timeout=10)
+    ids = ",".join(sorted(set(ids_by_sym.values())))
+    r = http_pool.get("https://api.coingecko.com/api/v3/simple/price",
+                      params={"ids": ids, "vs_currencies": "usd"}, timeout=10)
     r.raise_for_status()
     j = r.json()
     out = {}
-    for s in symbols:
-        cid = _MAP.get(s)
-        if cid and cid in j and "usd" in j[cid]:
+    for s, cid in ids_by_sym.items():
+        if cid in j and "usd" in j[cid]:
             out[s] = float(j[cid]["usd"])
     return out
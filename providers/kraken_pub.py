@@ -1,22 +1,26 @@
-import httpx
-from typing import Dict, List
+import http_pool
+from providers import _f, prices_from_quotes
+from symbol_registry import get_registry
 
-_MAP = {
-    "BTC-USD": "XXBTZUSD",
-    "XRP-USD": "XRPUSD",
-}
 
-def fetch_prices(symbols: List[str]) -> Dict[str, float]:
-    pairs = ",".join(_MAP[s] for s in symbols if s in _MAP)
-    if not pairs:
+def fetch_quotes(symbols: list[str]) -> dict[str, dict[str, float]]:
+    reg = get_registry()
+    rev = {}
+    for s in symbols:
+        native = reg.native("kraken", s)
+        if native:
+            rev[native] = s
+    if not rev:
         return {}
-    r = httpx.get(f"https://api.kraken.com/0/public/Ticker?pair={pairs}", timeout=10)
+    r = http_pool.get(f"https://api.kraken.com/0/public/Ticker?pair={','.join(rev)}", timeout=10)
     r.raise_for_status()
     j = r.json()["result"]
-    rev = {v:k for k,v in _MAP.items()}
     out = {}
     for k, v in j.items():
         sym = rev.get(k)
         if not sym: continue
-        out[sym] = float(v["c"][0])
+        out[sym] = {"bid": _f(v["b"][0]), "ask": _f(v["a"][0]), "last": _f(v["c"][0])}
     return out
+
+def fetch_prices(symbols: list[str]) -> dict[str, float]:
+    return prices_from_quotes(fetch_quotes(symbols))
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from singleflight import default_flight
+
+# TTL cache for market data with one freshness tier per data class. Within the
+# tier's TTL a value is served as-is; past it (up to STALE_FACTOR x TTL) the stale
+# value is still served while one background refresh replaces it
+# (stale-while-revalidate); older than that is a miss and fetches inline.
+# Least-recently-used entries are evicted past max_entries. None results are not cached.
+#
+#   quote_cache.cached("stats", ("coinbase", "BTC-USD"), lambda: get_24h_stats_uncached("BTC-USD"))
+#   quote_cache.stats()   # per-tier hits / stale / misses / refreshes / errors / evictions
+
+TIERS: dict[str, float] = {
+    "book":    float(os.getenv("QUOTE_TTL_BOOK", "1")),       # top of book
+    "last":    float(os.getenv("QUOTE_TTL_LAST", "2")),       # last trade / ticker
+    "stats":   float(os.getenv("QUOTE_TTL_STATS", "60")),     # 24h stats
+    "fx":      float(os.getenv("QUOTE_TTL_FX", "30")),        # stablecoin/USD rates (quote_fx)
+    "markets": float(os.getenv("QUOTE_TTL_MARKETS", "3600")),
+}
+STALE_FACTOR = float(os.getenv("QUOTE_STALE_FACTOR", "5"))
+MAX_ENTRIES = int(os.getenv("QUOTE_CACHE_MAX", "2048"))
+
+_COUNTERS = ("hits", "stale", "misses", "refreshes", "errors", "evictions")
+
+
+class QuoteCache:
+    def __init__(self, tiers: dict[str, float] | None = None, max_entries: int = MAX_ENTRIES,
+                 stale_factor: float = STALE_FACTOR):
+        self.tiers = dict(tiers or TIERS)
+        self.max_entries = max_entries
+        self.stale_factor = stale_factor
+        self._data: OrderedDict[tuple[str, Hashable], tuple[float, Any]] = OrderedDict()
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="quote-cache")
+        self._flight = default_flight()
+        self.counters: dict[str, dict[str, int]] = {t: dict.fromkeys(_COUNTERS, 0)
+                                                    for t in self.tiers}
+
+    def _bump(self, tier: str, name: str) -> None:
+        # caller holds _lock
+        self.counters.setdefault(tier, dict.fromkeys(_COUNTERS, 0))[name] += 1
+
+    def _count(self, tier: str, name: str) -> None:
+        with self._lock:
+            self._bump(tier, name)
+
+    def _lookup(self, tier: str, key: Hashable) -> tuple[str, Any]:
+        """('fresh' | 'stale' | 'miss', value); counts the outcome."""
+        ttl = self.tiers.get(tier, 0.0)
+        k = (tier, key)
+        with self._lock:
+            hit = self._data.get(k)
+            if hit is not None:
+                age = time.monotonic() - hit[0]
+                if age <= ttl:
+                    self._data.move_to_end(k)
+                    self._bump(tier, "hits")
+                    return "fresh", hit[1]
+                if age <= ttl * self.stale_factor:
+                    self._data.move_to_end(k)
+                    self._bump(tier, "stale")
+                    return "stale", hit[1]
+            self._bump(tier, "misses")
+            return "miss", None
+
+    def put(self, tier: str, key: Hashable, value: Any) -> None:
+        if value is None:
+            return
+        k = (tier, key)
+        with self._lock:
+            self._data[k] = (time.monotonic(), value)
+            self._data.move_to_end(k)
+            while len(self._data) > self.max_entries:
+                (old_tier, _), _ = self._data.popitem(last=False)
+                self._bump(old_tier, "evictions")
+
+    def _fetch(self, tier: str, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        # window=0: coalesce concurrent misses, but freshness is this cache's job
+        val = self._flight.do(("quote_cache", tier, key), fetch, window=0)
+        self.put(tier, key, val)
+        return val
+
+    def _revalidate(self, tier: str, key: Hashable, fetch: Callable[[], Any]) -> None:
+        k = (tier, key)
+        with self._lock:
+            if k in self._refreshing:
+                return
+            self._refreshing.add(k)
+
+        def run():
+            try:
+                self._fetch(tier, key, fetch)
+                self._count(tier, "refreshes")
+            except Exception:
+                self._count(tier, "errors")     # keep serving the stale value
+            finally:
+                with self._lock:
+                    self._refreshing.discard(k)
+        self._pool.submit(run)
+
+    def get(self, tier: str, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        state, val = self._lookup(tier, key)
+        if state == "fresh":
+            return val
+        if state == "stale":
+            self._revalidate(tier, key, fetch)
+            return val
+        try:
+            return self._fetch(tier, key, fetch)
+        except Exception:
+            self._count(tier, "errors")
+            raise
+
+    async def aget(self, tier: str, key: Hashable, afetch: Callable[[], Awaitable[Any]],
+                   refresh: Callable[[], Any] | None = None) -> Any:
+        """
+        Async get(): a miss awaits `afetch()`; a stale hit is refreshed on the cache's
+        thread pool with the sync `refresh` (the event loop may be gone before it lands).
+        """
+        state, val = self._lookup(tier, key)
+        if state == "fresh":
+            return val
+        if state == "stale" and refresh is not None:
+            self._revalidate(tier, key, refresh)
+            return val
+        try:
+            val = await afetch()
+        except Exception:
+            self._count(tier, "errors")
+            raise
+        self.put(tier, key, val)
+        return val
+
+    def invalidate(self, tier: str | None = None) -> None:
+        with self._lock:
+            if tier is None:
+                self._data.clear()
+            else:
+                for k in [k for k in self._data if k[0] == tier]:
+                    del self._data[k]
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            sizes: dict[str, int] = {}
+            for t, _ in self._data:
+                sizes[t] = sizes.get(t, 0) + 1
+        out = {}
+        for t, c in self.counters.items():
+            looked = c["hits"] + c["stale"] + c["misses"]
+            out[t] = {**c, "entries": sizes.get(t, 0), "ttl_s": self.tiers.get(t),
+                      "hit_rate": round((c["hits"] + c["stale"]) / looked, 3) if looked else None}
+        return out
+
+
+_CACHE = QuoteCache()
+
+
+def default_cache() -> QuoteCache:
+    return _CACHE
+
+
+def cached(tier: str, key: Hashable, fetch: Callable[[], Any]) -> Any:
+    return _CACHE.get(tier, key, fetch)
+
+
+async def acached(tier: str, key: Hashable, afetch: Callable[[], Awaitable[Any]],
+                  refresh: Callable[[], Any] | None = None) -> Any:
+    return await _CACHE.aget(tier, key, afetch, refresh)
+
+
+def stats() -> dict[str, dict[str, Any]]:
+    return _CACHE.stats()
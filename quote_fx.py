@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+
+import quote_cache
+
+# Per-venue USD value of each quote currency, as a small dense matrix
+#
+#   R[venue, quote]   USD per 1 unit of quote at that venue   (USD column = 1)
+#
+# filled from each venue's own USDT/USD, USDC/USD (or USDC/USDT) books. Venues
+# without a direct rate use the cross-venue median; with no rate at all the peg
+# (1.0) is assumed. factors() gathers R for whole (exchange, quote) columns at
+# once, so spread_kernel can put every price on a common quote without per-row work.
+#
+#   fx = default_fx(); fx.refresh(["binance"])     # + FX_VENUES
+#   fx.usd("binance", "USDT")                      # 0.9996
+#   fx.factors(["binance", "kraken"], ["USDT", "USD"], to="USD")
+
+QUOTES = ("USD", "USDT", "USDC")
+_QID = {q: i for i, q in enumerate(QUOTES)}
+# (market, quote it prices, quote it is priced in)
+_FX_MARKETS = (("USDT/USD", "USDT", "USD"), ("USDC/USD", "USDC", "USD"),
+               ("USDC/USDT", "USDC", "USDT"))
+QUOTE_FX = os.getenv("QUOTE_FX", "1").lower() in ("1", "true", "yes", "y")
+# USD venues whose USDT/USD and USDC/USD books seed the consensus used by venues
+# with no USD market of their own (Binance)
+FX_VENUES = [v.strip() for v in os.getenv("QUOTE_FX_VENUES", "kraken,coinbase,bitstamp").split(",")
+             if v.strip()]
+
+
+class QuoteFX:
+    def __init__(self):
+        self.venues: list[str] = []
+        self._vid: dict[str, int] = {}
+        self.R = np.full((0, len(QUOTES)), np.nan)
+        self._lock = threading.Lock()
+
+    def _row(self, venue: str) -> int:
+        i = self._vid.get(venue)
+        if i is None:
+            i = self._vid[venue] = len(self.venues)
+            self.venues.append(venue)
+            row = np.full((1, len(QUOTES)), np.nan)
+            row[0, _QID["USD"]] = 1.0
+            self.R = np.vstack([self.R, row])
+        return i
+
+    def set(self, venue: str, quote: str, usd: float | None) -> None:
+        if quote not in _QID or quote == "USD" or not usd or not np.isfinite(usd):
+            return
+        with self._lock:
+            i = self._row(venue)
+            self.R[i, _QID[quote]] = float(usd)
+
+    def set_from_tickers(self, venue: str, tickers: dict[str, dict]) -> None:
+        """Fill one venue's row from {market: ticker} for the _FX_MARKETS it lists."""
+        mids = {}
+        for mkt, _, _ in _FX_MARKETS:
+            t = tickers.get(mkt) or {}
+            bid, ask = t.get("bid"), t.get("ask")
+            mids[mkt] = (bid + ask) / 2.0 if bid and ask else (t.get("last") or None)
+        for mkt, q, via in _FX_MARKETS:
+            if mids[mkt] is None or (via != "USD" and mids.get(f"{q}/USD") is not None):
+                continue            # crosses only when the venue has no direct USD book
+            self.set(venue, q, mids[mkt] * (1.0 if via == "USD" else self.usd(venue, via)))
+
+    def consensus(self) -> np.ndarray:
+        """[quote] cross-venue median, 1.0 where nobody quotes it."""
+        with self._lock:
+            R = self.R.copy()
+        ok = np.isfinite(R)
+        return np.array([np.median(R[ok[:, j], j]) if ok[:, j].any() else 1.0
+                         for j in range(len(QUOTES))])
+
+    def matrix(self) -> np.ndarray:
+        """R with gaps filled by consensus, plus a last row (consensus) for unknown venues."""
+        cons = self.consensus()
+        with self._lock:
+            R = self.R.copy()
+        R = np.where(np.isfinite(R), R, cons[None, :])
+        return np.vstack([R, cons[None, :]])
+
+    def usd(self, venue: str, quote: str, fallback: bool = True) -> float | None:
+        q = _QID.get(quote)
+        if q is None:
+            return None
+        i = self._vid.get(venue)
+        v = self.R[i, q] if i is not None else np.nan
+        if np.isfinite(v):
+            return float(v)
+        return float(self.consensus()[q]) if fallback else None
+
+    def factors(self, exchanges: Sequence[str], quotes: Sequence[str], to="USD") -> np.ndarray:
+        """
+        Multipliers taking a price quoted in quotes[i] at exchanges[i] into `to` (a
+        quote name or a per-row sequence). Unknown quote currencies get NaN.
+        """
+        M = self.matrix()
+        n = len(self.venues)
+        to = [to] * len(quotes) if isinstance(to, str) else list(to)
+        v = np.fromiter((self._vid.get(e, n) for e in exchanges), dtype=np.intp,
+                        count=len(exchanges))
+        q = np.fromiter((_QID.get(x, -1) for x in quotes), dtype=np.intp, count=len(quotes))
+        t = np.fromiter((_QID.get(x, -1) for x in to), dtype=np.intp, count=len(to))
+        same = np.fromiter((a == b for a, b in zip(quotes, to, strict=True)), dtype=bool,
+                           count=len(to))
+        out = M[v, np.maximum(q, 0)] / M[v, np.maximum(t, 0)]
+        return np.where(same, 1.0, np.where((q >= 0) & (t >= 0), out, np.nan))
+
+    def refresh(self, venues: Iterable[str], seed: bool = True) -> QuoteFX:
+        """
+        Pull each venue's stablecoin books (cached in quote_cache's "fx" tier); with
+        seed, FX_VENUES too, so venues without a USD book convert at a live consensus.
+        """
+        from exchange_prices import _load, venue_tickers
+        from symbol_registry import get_registry
+        reg = get_registry()
+        venues = list(dict.fromkeys([*venues, *(FX_VENUES if seed else ())]))
+        for venue, inst in _load(venues).items():
+            reg.ensure(venue, inst)
+            listed = reg.markets(venue)
+            mkts = [listed[m] for m, _, _ in _FX_MARKETS if m in listed]
+            if not mkts:
+                continue
+            try:
+                got = quote_cache.cached("fx", (venue,), lambda inst=inst, mkts=mkts: {
+                    u: t for u, (t, _, _) in venue_tickers(inst, mkts).items() if t})
+            except Exception:
+                continue
+            canon = {u: m for m, u in listed.items()}
+            self.set_from_tickers(venue, {canon.get(u, u): t for u, t in (got or {}).items()})
+        return self
+
+
+_FX = QuoteFX()
+
+
+def default_fx() -> QuoteFX:
+    return _FX
+
+
+def usd_rate(venue: str, quote: str, refresh: bool = True) -> float:
+    """USD per 1 `quote` at `venue` (1.0 for USD; the peg if nothing is known)."""
+    if quote == "USD":
+        return 1.0
+    if refresh and QUOTE_FX:
+        _FX.refresh([venue])
+    return _FX.usd(venue, quote) or 1.0
+
+
+def convert(price: float | None, venue: str, quote: str, to: str = "USD") -> float | None:
+    """`price` quoted in `quote` at `venue`, expressed in `to`."""
+    if price is None or quote == to:
+        return price
+    return price * usd_rate(venue, quote) / usd_rate(venue, to)
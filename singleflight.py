@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from concurrent.futures import Future
+from typing import Any
+
+# Request coalescing. Concurrent calls with the same key share one underlying
+# call and its result (or exception); a successful result is also reused for
+# `window` seconds after it lands, so N dashboard sessions asking for the same
+# ticker within a refresh cost one request. Shared results must be treated as
+# read-only.
+#
+#   flight = SingleFlight(window=0.25)
+#   flight.do(("kraken", "fetch_ticker", "BTC/USD"), lambda: ex.fetch_ticker("BTC/USD"))
+
+COALESCE_WINDOW_S = float(os.getenv("COALESCE_WINDOW_S", "0.25"))
+_RETRY = object()       # handed to async followers when their leader was cancelled
+
+
+class SingleFlight:
+    def __init__(self, window: float = COALESCE_WINDOW_S, max_entries: int = 4096):
+        self.window = window
+        self.max_entries = max_entries
+        self._inflight: dict[Hashable, Future] = {}
+        self._ainflight: dict[tuple[int, Hashable], asyncio.Future] = {}
+        self._done: dict[Hashable, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self.calls = 0          # underlying calls made
+        self.shared = 0         # requests served by another caller's call or a fresh result
+
+    def _fresh(self, key: Hashable, window: float) -> tuple[bool, Any]:
+        hit = self._done.get(key)
+        if hit is not None and time.monotonic() - hit[0] <= window:
+            self.shared += 1
+            return True, hit[1]
+        return False, None
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        if len(self._done) >= self.max_entries:
+            cutoff = time.monotonic() - self.window
+            for k in [k for k, (ts, _) in self._done.items() if ts < cutoff]:
+                self._done.pop(k, None)
+            if len(self._done) >= self.max_entries:
+                self._done.clear()
+        self._done[key] = (time.monotonic(), value)
+
+    def do(self, key: Hashable, fn: Callable[[], Any], window: float | None = None) -> Any:
+        window = self.window if window is None else window
+        with self._lock:
+            ok, val = self._fresh(key, window)
+            if ok:
+                return val
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return fut.result()
+        try:
+            val = fn()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+            if window > 0:
+                self._store(key, val)
+        fut.set_result(val)
+        return val
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]],
+                  window: float | None = None) -> Any:
+        """
+        Async twin of do(); in-flight sharing is per event loop, fresh results are process-wide.
+        A cancelled leader (e.g. a losing hedge) does not cancel its followers: the entry is
+        dropped and the first follower to wake up retries as the new leader.
+        """
+        window = self.window if window is None else window
+        lkey = (id(asyncio.get_running_loop()), key)
+        while True:
+            with self._lock:
+                ok, val = self._fresh(key, window)
+                if ok:
+                    return val
+                fut = self._ainflight.get(lkey)
+                leader = fut is None
+                if leader:
+                    fut = self._ainflight[lkey] = asyncio.get_running_loop().create_future()
+                    self.calls += 1
+                else:
+                    self.shared += 1
+            if not leader:
+                val = await asyncio.shield(fut)
+                if val is _RETRY:
+                    continue
+                return val
+            try:
+                val = await fn()
+            except BaseException as e:
+                with self._lock:
+                    self._ainflight.pop(lkey, None)
+                if isinstance(e, asyncio.CancelledError):
+                    fut.set_result(_RETRY)
+                else:
+                    fut.set_exception(e)
+                    fut.exception()      # mark retrieved when nobody else was waiting
+                raise
+            with self._lock:
+                self._ainflight.pop(lkey, None)
+                if window > 0:
+                    self._store(key, val)
+            fut.set_result(val)
+            return val
+
+
+def arg_key(args: tuple, kwargs: dict) -> Hashable:
+    key = (args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+        return key
+    except TypeError:                    # lists/dicts in the call (e.g. fetch_tickers([...]))
+        return repr(key)
+
+
+_FLIGHT = SingleFlight()
+
+
+def default_flight() -> SingleFlight:
+    return _FLIGHT
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable, Hashable
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from exchange_prices import _PAIR_COLS, _SUMMARY_COLS, spread_kernel
+from fee_schedule import schedule
+
+# Incremental counterpart of exchange_prices.calc_spreads for streaming quotes.
+# Per symbol it keeps four indexed heaps over venues:
+#
+#   lo / hi      raw price (last, else mid)           -> sym_summary (min/max venue)
+#   buy / sell   effective taker prices incl. fees    -> best net route
+#                ask*(1+taker)  /  bid*(1-taker)
+#
+# so one quote update costs O(log venues) instead of a full pivot + rescan.
+# sym_summary() / pair_detail() return calc_spreads' frames on demand.
+#
+#   eng = SpreadEngine().attach(stream_aggregator.get_aggregator(symbols).store)
+#   eng.best("BTC/USD")   # {"buy_ex", "buy", "sell_ex", "sell", "gross_pct", "net_pct"}
+
+
+class IndexedHeap:
+    """Binary min-heap of (key, item) with O(log n) update/remove by item."""
+
+    def __init__(self):
+        self._h: list[tuple[Any, Hashable]] = []
+        self._pos: dict[Hashable, int] = {}
+
+    def __len__(self):
+        return len(self._h)
+
+    def __contains__(self, item):
+        return item in self._pos
+
+    def _swap(self, i: int, j: int) -> None:
+        h = self._h
+        h[i], h[j] = h[j], h[i]
+        self._pos[h[i][1]] = i
+        self._pos[h[j][1]] = j
+
+    def _up(self, i: int) -> None:
+        while i:
+            p = (i - 1) >> 1
+            if self._h[i] < self._h[p]:
+                self._swap(i, p)
+                i = p
+            else:
+                break
+
+    def _down(self, i: int) -> None:
+        n = len(self._h)
+        while True:
+            c = 2 * i + 1
+            if c >= n:
+                break
+            if c + 1 < n and self._h[c + 1] < self._h[c]:
+                c += 1
+            if self._h[c] < self._h[i]:
+                self._swap(i, c)
+                i = c
+            else:
+                break
+
+    def set(self, item: Hashable, key: Any) -> None:
+        i = self._pos.get(item)
+        if i is None:
+            self._h.append((key, item))
+            self._pos[item] = len(self._h) - 1
+            self._up(len(self._h) - 1)
+            return
+        old = self._h[i][0]
+        self._h[i] = (key, item)
+        if (key, item) < (old, item):
+            self._up(i)
+        else:
+            self._down(i)
+
+    def remove(self, item: Hashable) -> None:
+        i = self._pos.pop(item, None)
+        if i is None:
+            return
+        last = self._h.pop()
+        if i < len(self._h):
+            self._h[i] = last
+            self._pos[last[1]] = i
+            self._up(i)
+            self._down(self._pos[last[1]])
+
+    def top(self) -> tuple[Any, Hashable] | None:
+        return self._h[0] if self._h else None
+
+    def top_excluding(self, item: Hashable) -> tuple[Any, Hashable] | None:
+        """Best entry whose item != `item` (root, else the better of its children)."""
+        h = self._h
+        if not h:
+            return None
+        if h[0][1] != item:
+            return h[0]
+        kids = h[1:3]
+        return min(kids) if kids else None
+
+
+class _Book:
+    __slots__ = ("lo", "hi", "buy", "sell", "px")
+
+    def __init__(self):
+        self.lo, self.hi = IndexedHeap(), IndexedHeap()
+        self.buy, self.sell = IndexedHeap(), IndexedHeap()
+        self.px: dict[str, float] = {}
+
+
+def _num(x) -> float | None:
+    if x is None:
+        return None
+    x = float(x)
+    return x if np.isfinite(x) and x > 0 else None
+
+
+class SpreadEngine:
+    def __init__(self, fee: Callable[[str, str], float] | None = None,
+                 on_change: Callable[[str, dict | None], None] | None = None):
+        # fee(venue, symbol) -> taker rate; defaults to the compiled fee_schedule
+        self.fee = fee or (lambda venue, symbol: schedule().fee(venue, "taker", symbol))
+        self.on_change = on_change
+        self._books: dict[str, _Book] = {}
+        self._lock = threading.Lock()
+        self.updates = 0
+
+    # ---- writes ----
+    def update(self, venue: str, symbol: str, price=None, bid=None, ask=None) -> dict | None:
+        """Apply one venue quote; returns the symbol's new best route (see best())."""
+        price, bid, ask = _num(price), _num(bid), _num(ask)
+        if price is None and bid and ask:
+            price = (bid + ask) / 2.0
+        if price is None:
+            return self.remove(venue, symbol)
+        fee = self.fee(venue, symbol)
+        with self._lock:
+            b = self._books.get(symbol)
+            if b is None:
+                b = self._books[symbol] = _Book()
+            b.px[venue] = price
+            b.lo.set(venue, price)
+            b.hi.set(venue, -price)
+            b.buy.set(venue, (ask or price) * (1 + fee))
+            b.sell.set(venue, -(bid or price) * (1 - fee))
+            self.updates += 1
+            best = self._best(b)
+        if self.on_change:
+            self.on_change(symbol, best)
+        return best
+
+    def remove(self, venue: str, symbol: str) -> dict | None:
+        with self._lock:
+            b = self._books.get(symbol)
+            if b is None:
+                return None
+            b.px.pop(venue, None)
+            for h in (b.lo, b.hi, b.buy, b.sell):
+                h.remove(venue)
+            best = self._best(b)
+        if self.on_change:
+            self.on_change(symbol, best)
+        return best
+
+    def load_frame(self, df: pd.DataFrame) -> SpreadEngine:
+        """Seed from a fetch_tickers / tickers_from_store frame (exchange, symbol, price)."""
+        for ex, sym, px in df[["exchange", "symbol", "price"]].itertuples(index=False):
+            self.update(ex, sym, price=px)
+        return self
+
+    def attach(self, store) -> SpreadEngine:
+        """Follow a feeds.quote_store.QuoteStore: every update is applied as it arrives."""
+        for q in store.snapshot():
+            self.update(q.venue, q.symbol, q.last, q.bid, q.ask)
+        store.subscribe(lambda q: self.update(q.venue, q.symbol, q.last, q.bid, q.ask))
+        return self
+
+    # ---- reads ----
+    @staticmethod
+    def _best(b: _Book) -> dict | None:
+        if len(b.buy) < 2:
+            return None
+        (bk, bv), (sk, sv) = b.buy.top(), b.sell.top()
+        if bv == sv:     # same venue both sides: pair each top with the other's runner-up
+            alt_s, alt_b = b.sell.top_excluding(bv), b.buy.top_excluding(sv)
+            if (-alt_s[0] - bk) / bk >= (-sk - alt_b[0]) / alt_b[0]:
+                sk, sv = alt_s
+            else:
+                bk, bv = alt_b
+        buy_px, sell_px = b.px[bv], b.px[sv]
+        return {"buy_ex": bv, "buy": buy_px, "buy_eff": bk,
+                "sell_ex": sv, "sell": sell_px, "sell_eff": -sk,
+                "gross_pct": (sell_px - buy_px) / buy_px * 100.0,
+                "net_pct": (-sk - bk) / bk * 100.0}
+
+    def best(self, symbol: str) -> dict | None:
+        with self._lock:
+            b = self._books.get(symbol)
+            return self._best(b) if b is not None else None
+
+    def symbols(self) -> list[str]:
+        return list(self._books)
+
+    def routes(self) -> pd.DataFrame:
+        """Best net route per symbol, highest net_pct first."""
+        rows = []
+        for sym in self.symbols():
+            r = self.best(sym)
+            if r is not None:
+                rows.append({"symbol": sym, **r})
+        cols = ["symbol", "buy_ex", "buy", "buy_eff", "sell_ex", "sell", "sell_eff",
+                "gross_pct", "net_pct"]
+        out = pd.DataFrame(rows, columns=cols)
+        return out.sort_values("net_pct", ascending=False) if len(out) else out
+
+    def sym_summary(self) -> pd.DataFrame:
+        """calc_spreads' sym_summary, read off the lo/hi heap tops."""
+        rows = []
+        with self._lock:
+            for sym, b in sorted(self._books.items()):      # pivot order, as calc_spreads
+                if not len(b.lo):
+                    continue
+                mn, mn_ex = b.lo.top()
+                mx, mx_ex = b.hi.top()
+                mx = -mx
+                rows.append((sym, mn_ex, mn, mx_ex, mx, mx - mn, (mx - mn) / mn * 100.0))
+        if not rows:
+            return pd.DataFrame(columns=_SUMMARY_COLS)
+        return pd.DataFrame(rows, columns=_SUMMARY_COLS).sort_values("spread_pct", ascending=False)
+
+    def pair_detail(self, min_edge_pct=None) -> pd.DataFrame:
+        """calc_spreads' pair_detail (all buy/sell routes, or those >= min_edge_pct)."""
+        with self._lock:
+            syms = np.array(sorted(self._books), dtype=object)
+            exs = np.array(sorted({v for b in self._books.values() for v in b.px}), dtype=object)
+            col = {e: j for j, e in enumerate(exs)}
+            P = np.full((len(syms), len(exs)), np.nan)
+            for i, s in enumerate(syms):
+                for v, px in self._books[s].px.items():
+                    P[i, col[v]] = px
+        si, bi, ki, edge = spread_kernel(P, min_edge_pct)
+        out = pd.DataFrame({
+            "symbol": syms[si], "buy_ex": exs[bi], "buy": P[si, bi],
+            "sell_ex": exs[ki], "sell": P[si, ki], "edge_pct": edge,
+        }, columns=_PAIR_COLS)
+        return out.sort_values(["symbol", "edge_pct"], ascending=False)
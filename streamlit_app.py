@@ -1,9 +1,11 @@
 import os
-import streamlit as st
-import pandas as pd
-import ccxt
 from datetime import datetime
 
+import pandas as pd
+import streamlit as st
+
+from exchange_pool import get_exchange
+
 # Load environment
 CB_API_KEY = os.getenv("CB_API_KEY", "")
 CB_API_SECRET = os.getenv("CB_API_SECRET", "")
@@ -17,15 +19,15 @@ if CB_API_KEY and CB_API_SECRET and CB_API_PASSPHRASE:
 else:
     st.sidebar.error("Missing Coinbase credentials in .env")
 
-# Set up exchanges
+# Set up exchanges (process-wide pooled clients, shared across reruns and sessions)
 exchanges = {
-    "coinbase": ccxt.coinbase({
+    "coinbase": get_exchange("coinbase", {
         "apiKey": CB_API_KEY,
         "secret": CB_API_SECRET,
         "password": CB_API_PASSPHRASE,
     }),
-    "binance": ccxt.binance(),
-    "kraken": ccxt.kraken(),
+    "binance": get_exchange("binance"),
+    "kraken": get_exchange("kraken"),
 }
 
 def fetch_price(exchange, symbol="BTC/USDT"):
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+# One place that knows how each venue spells a market.
+# Canonical form is ccxt-style "BASE/QUOTE" (e.g. "BTC/USD"); "BTC-USD", "BTCUSD"
+# and bare "BTC" are accepted everywhere and normalized with canonical().
+
+REGISTRY_PATH = os.getenv("SYMBOL_REGISTRY_PATH", "data/cache/symbol_registry.json")
+REGISTRY_TTL = float(os.getenv("SYMBOL_REGISTRY_TTL", str(24 * 3600)))
+
+_QUOTES = ("USDT", "USDC", "USD", "EUR", "GBP", "BTC", "ETH")
+_BASE_ALIASES = {"XBT": "BTC", "XXBT": "BTC", "XETH": "ETH", "XXRP": "XRP", "XLTC": "LTC"}
+# Stablecoin stand-ins when a venue has no book in the requested quote
+# (e.g. binance lists BTC/USDT but not BTC/USD).
+QUOTE_ALIASES = {"USD": ("USDT", "USDC")}
+
+# Static tables for venues without ccxt market metadata, and seeds used until
+# metadata for a ccxt venue has been fetched once.
+_COINGECKO_IDS = {
+    "BTC": "bitcoin", "ETH": "ethereum", "XRP": "ripple",
+    "SOL": "solana", "ADA": "cardano", "LTC": "litecoin",
+}
+_SEED_NATIVE = {
+    "kraken": {"BTC/USD": "XXBTZUSD", "XRP/USD": "XXRPZUSD", "ETH/USD": "XETHZUSD"},
+}
+# quote -> stand-in for venues known to lack that quote (alias_quote lookups
+# before metadata; afterwards QUOTE_ALIASES is checked against listed markets)
+_SEED_QUOTE_ALIASES = {
+    "binance": {"USD": "USDT"},
+}
+
+
+def canonical(symbol: str) -> str:
+    """'BTC-USD' / 'btcusd' / 'BTC' / 'XBT/USD' -> 'BTC/USD'."""
+    s = symbol.strip().upper()
+    for sep in ("/", "-", "_", ":"):
+        if sep in s:
+            base, quote = s.split(sep, 1)
+            break
+    else:
+        base, quote = s, ""
+        for q in _QUOTES:
+            if s.endswith(q) and len(s) > len(q):
+                base, quote = s[: -len(q)], q
+                break
+    base = _BASE_ALIASES.get(base, base)
+    return f"{base}/{quote or 'USD'}"
+
+
+def _split(sym: str) -> tuple[str, str]:
+    base, quote = sym.split("/", 1)
+    return base, quote
+
+
+def _guess_native(venue: str, sym: str) -> str | None:
+    # The per-venue spelling rules we used before market metadata was available.
+    base, quote = _split(sym)
+    if venue == "coingecko":
+        return _COINGECKO_IDS.get(base) if quote == "USD" else None
+    if venue in _SEED_NATIVE and sym in _SEED_NATIVE[venue]:
+        return _SEED_NATIVE[venue][sym]
+    if venue in ("coinbase", "coinbaseexchange", "coinbaseadvanced"):
+        return f"{base}-{quote}"
+    if venue == "bitstamp":
+        return f"{base}{quote}".lower()
+    if venue == "bitfinex":
+        return f"t{base}{quote}"
+    return f"{base}{quote}"
+
+
+class SymbolRegistry:
+    """
+    (venue, canonical symbol) -> venue-native market id / ccxt unified symbol.
+    Built from ccxt market metadata, persisted to REGISTRY_PATH and refreshed
+    after REGISTRY_TTL seconds. Lookups are plain dict hits.
+    """
+
+    def __init__(self, path: str = REGISTRY_PATH, ttl: float = REGISTRY_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._venues: dict[str, dict] = {}
+        self._load()
+
+    # ---- persistence ----
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if isinstance(data, dict):
+                self._venues = data
+        except Exception:
+            self._venues = {}
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._venues), encoding="utf-8")
+            tmp.replace(self.path)
+        except Exception:
+            pass
+
+    # ---- building ----
+    def is_fresh(self, venue: str) -> bool:
+        v = self._venues.get(venue)
+        return bool(v) and (time.time() - v.get("ts", 0)) < self.ttl
+
+    def update_from_markets(self, venue: str, markets: dict) -> None:
+        """Index a ccxt `markets` dict (as returned by load_markets) for `venue`."""
+        native: dict[str, str] = {}
+        unified: dict[str, str] = {}
+        for m in (markets or {}).values():
+            if m.get("active") is False or (m.get("type") not in (None, "spot")):
+                continue
+            base, quote = m.get("base"), m.get("quote")
+            if not (base and quote):
+                continue
+            sym = f"{base}/{quote}"
+            native.setdefault(sym, m.get("id") or sym)
+            unified.setdefault(sym, m.get("symbol") or sym)
+        with self._lock:
+            self._venues[venue] = {"ts": time.time(), "native": native, "unified": unified}
+            self._save()
+
+    def ensure(self, venue: str, inst=None) -> None:
+        """Refresh `venue` from a ccxt instance when its entry is missing or stale."""
+        if self.is_fresh(venue):
+            return
+        try:
+            if inst is None:
+                import ccxt
+
+                from markets_cache import hydrate
+                if not hasattr(ccxt, venue):
+                    return
+                inst = hydrate(getattr(ccxt, venue)({"enableRateLimit": True}), venue)
+            markets = inst.markets or inst.load_markets()
+            self.update_from_markets(venue, markets)
+        except Exception:
+            pass
+
+    # ---- lookups ----
+    def known(self, venue: str) -> bool:
+        return venue in self._venues
+
+    def _resolve(self, venue: str, symbol: str, table: str, alias_quote: bool) -> str | None:
+        sym = canonical(symbol)
+        v = self._venues.get(venue)
+        if v is None:
+            if alias_quote:
+                base, quote = _split(sym)
+                sym = f"{base}/{_SEED_QUOTE_ALIASES.get(venue, {}).get(quote, quote)}"
+            return _guess_native(venue, sym) if table == "native" else sym
+        tbl = v[table]
+        if sym in tbl:
+            return tbl[sym]
+        if alias_quote:
+            base, quote = _split(sym)
+            for alt in QUOTE_ALIASES.get(quote, ()):
+                hit = tbl.get(f"{base}/{alt}")
+                if hit:
+                    return hit
+        return None
+
+    def native(self, venue: str, symbol: str, alias_quote: bool = False) -> str | None:
+        """Venue market id, e.g. ('kraken','BTC/USD') -> 'XXBTZUSD'. None if unlisted."""
+        return self._resolve(venue, symbol, "native", alias_quote)
+
+    def unified(self, venue: str, symbol: str, alias_quote: bool = False) -> str | None:
+        """ccxt unified symbol to request at `venue`. None if unlisted."""
+        return self._resolve(venue, symbol, "unified", alias_quote)
+
+    def markets(self, venue: str) -> dict[str, str]:
+        """Canonical symbol -> ccxt unified symbol for every indexed spot market at `venue`."""
+        v = self._venues.get(venue)
+        return dict(v["unified"]) if v else {}
+
+    def supports(self, venue: str, symbol: str) -> bool:
+        """False only when metadata for `venue` says the market is not listed."""
+        if venue == "coingecko":
+            return _guess_native(venue, canonical(symbol)) is not None
+        v = self._venues.get(venue)
+        return v is None or canonical(symbol) in v["unified"]
+
+    def split(self, venue: str, symbols: Iterable[str]) -> tuple[list[str], list[str]]:
+        """Partition symbols into (supported, skipped) for `venue`."""
+        ok, skip = [], []
+        for s in symbols:
+            (ok if self.supports(venue, s) else skip).append(s)
+        return ok, skip
+
+
+_REGISTRY: SymbolRegistry | None = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_registry() -> SymbolRegistry:
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = SymbolRegistry()
+    return _REGISTRY
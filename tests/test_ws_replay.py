@@ -0,0 +1,66 @@
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("websockets")
+
+from feeds.coinbase_ws import CoinbaseStream  # noqa: E402
+from feeds.ws_replay import ReplayServer, load_messages  # noqa: E402
+
+FIXTURE = Path(__file__).parent / "fixtures" / "coinbase_btc_l2.jsonl"
+TOP = {"best_bid": 114000.50, "best_ask": 114002.00}     # snapshot + first update
+LAST = 114001.25                                         # ticker before the gap
+
+
+def _eventually(cond, timeout=5.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return cond()
+
+
+def test_handle_snapshot_updates_and_gap():
+    msgs = load_messages(FIXTURE)
+    s = CoinbaseStream(["BTC-USD"])
+    assert all(s.handle(m) for m in msgs[:5])
+    assert s.ready()
+    assert s.get_top_of_book("BTC-USD") == TOP
+    assert s.get_spot("btc-usd") == LAST
+    assert s.get_depth("BTC-USD", 5) == {
+        "bids": [(114000.50, 0.30), (114000.00, 0.50), (113999.50, 1.20)],
+        "asks": [(114002.00, 2.00)]}
+    assert s.handle(msgs[5]) is False            # sequence 4 -> 7
+    assert s.gaps == 1
+    assert s.get_top_of_book("BTC-USD") == TOP   # the out-of-sequence update is not applied
+
+
+def test_fresh_ticker_keeps_spot_on_a_quiet_book(monkeypatch):
+    from feeds import coinbase_public
+    s = CoinbaseStream(["BTC-USD"])
+    for m in load_messages(FIXTURE)[:5]:
+        s.handle(m)
+    s.books["BTC-USD"].updated -= coinbase_public.STREAM_MAX_AGE + 1   # book went quiet
+    monkeypatch.setattr(coinbase_public, "_stream", s)
+    assert coinbase_public._from_stream("BTC-USD", "get_top_of_book") is None
+    assert coinbase_public._from_stream("BTC-USD", "get_spot") == LAST
+
+
+def test_stream_resyncs_through_replay_server():
+    srv = ReplayServer(FIXTURE).start()
+    stream = CoinbaseStream(["BTC-USD"], url=srv.url).start()
+    try:
+        assert stream.wait_ready(5)
+        # the gap drops the connection; a second connection resubscribes and re-snapshots
+        assert _eventually(lambda: stream.gaps >= 2 and len(srv.received) >= 6)
+        assert srv.received[0]["type"] == "subscribe"
+        assert {m["channel"] for m in srv.received[:3]} == {"ticker", "level2", "heartbeats"}
+        assert _eventually(lambda: stream.get_top_of_book("BTC-USD") == TOP)
+        assert stream.get_spot("BTC-USD") == LAST
+        bids = dict(stream.get_depth("BTC-USD", 10)["bids"])
+        assert 114010.00 not in bids
+    finally:
+        stream.stop()
+        srv.stop()
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Per-venue request controller shared by every fetch path (http_pool for the
+# httpx feeds/providers, exchange_pool for ccxt clients):
+#
+#   token bucket   sized from the venue's documented public REST limits
+#   AIMD           halve the rate on 429/418 (honouring Retry-After), creep back on success
+#   breaker        after VENUE_CB_FAILS consecutive failures stop calling the venue for a
+#                  cool-down; one probe is let through afterwards (half-open)
+#
+# A venue whose breaker is open raises VenueUnavailable immediately, so an unhealthy
+# venue costs ~0 ms per call instead of a full timeout.
+
+CB_FAILS = int(os.getenv("VENUE_CB_FAILS", "3"))
+CB_COOLDOWN_S = float(os.getenv("VENUE_CB_COOLDOWN", "30"))
+CB_COOLDOWN_MAX_S = float(os.getenv("VENUE_CB_COOLDOWN_MAX", "300"))
+MAX_WAIT_S = float(os.getenv("VENUE_MAX_WAIT", "5"))     # longer Retry-After -> open the breaker
+AIMD_DECREASE = 0.5
+AIMD_INCREASE = 0.05                                      # fraction of the nominal rate per success
+
+# (requests/s, burst) from each venue's public REST docs;
+# override with VENUE_RATE_<VENUE>="rps,burst"
+LIMITS: dict[str, tuple[float, float]] = {
+    "coinbase":          (10.0, 15.0),   # Advanced Trade public
+    "coinbase-exchange": (10.0, 15.0),   # Exchange public, 10/s burst 15
+    "kraken":            (1.0, 3.0),     # public endpoints ~1/s
+    "binance":           (20.0, 50.0),   # 6000 weight/min
+    "bitstamp":          (13.0, 40.0),   # 8000 per 10 min
+    "bitfinex":          (1.5, 10.0),    # 90/min on ticker endpoints
+    "coingecko":         (0.5, 5.0),     # free tier ~30/min
+}
+DEFAULT_LIMIT = (5.0, 10.0)
+
+_HOSTS = {
+    "api.coinbase.com": "coinbase",
+    "api.exchange.coinbase.com": "coinbase-exchange",
+    "api.pro.coinbase.com": "coinbase-exchange",
+    "api.kraken.com": "kraken",
+    "api.binance.com": "binance",
+    "api.binance.us": "binanceus",
+    "www.bitstamp.net": "bitstamp",
+    "api-pub.bitfinex.com": "bitfinex",
+    "api.bitfinex.com": "bitfinex",
+    "api.coingecko.com": "coingecko",
+}
+
+
+class VenueUnavailable(Exception):
+    """The venue's breaker is open; the call was not made."""
+
+
+def _limit(venue: str) -> tuple[float, float]:
+    env = os.getenv(f"VENUE_RATE_{venue.upper().replace('-', '_')}")
+    if env:
+        try:
+            rps, burst = (float(x) for x in env.split(","))
+            return rps, burst
+        except ValueError:
+            pass
+    return LIMITS.get(venue, DEFAULT_LIMIT)
+
+
+def _retry_after(value) -> float | None:
+    try:
+        return max(0.0, float(value)) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+class VenueController:
+    def __init__(self, venue: str):
+        self.venue = venue
+        self.nominal, self.burst = _limit(venue)
+        self.rate = self.nominal
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        self.not_before = 0.0            # monotonic; set by Retry-After
+        self.fails = 0
+        self.open_until = 0.0            # monotonic; breaker open while now < open_until
+        self.cooldown = CB_COOLDOWN_S
+        self.probing = False
+        self.counts = {"ok": 0, "fail": 0, "throttled": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    # ---- admission ----
+    def _reserve(self) -> tuple[float, bool]:
+        """Take a token (possibly going negative); (how long to wait for it, is half-open probe)."""
+        now = time.monotonic()
+        probe = False
+        with self._lock:
+            if self.fails >= CB_FAILS or now < self.open_until:
+                if now < self.open_until or self.probing:
+                    self.counts["rejected"] += 1
+                    raise VenueUnavailable(f"{self.venue}: circuit open "
+                                           f"({max(0.0, self.open_until - now):.0f}s left)")
+                self.probing = probe = True      # half-open: this call is the probe
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= 1.0
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.not_before - now), probe
+
+    # A probe interrupted while waiting (cancelled hedge loser, Ctrl-C) gives its
+    # half-open slot back; otherwise the breaker would reject every call forever.
+    def acquire(self) -> None:
+        wait, probe = self._reserve()
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            except BaseException:
+                if probe:
+                    self.abandon()
+                raise
+
+    async def aacquire(self) -> None:
+        wait, probe = self._reserve()
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except BaseException:
+                if probe:
+                    self.abandon()
+                raise
+
+    # ---- outcomes ----
+    def success(self) -> None:
+        with self._lock:
+            self.counts["ok"] += 1
+            self.fails = 0
+            self.probing = False
+            self.cooldown = CB_COOLDOWN_S
+            self.rate = min(self.nominal, self.rate + self.nominal * AIMD_INCREASE)
+
+    def failure(self) -> None:
+        with self._lock:
+            self.counts["fail"] += 1
+            self.fails += 1
+            if self.probing or self.fails >= CB_FAILS:
+                if self.probing:
+                    self.cooldown = min(CB_COOLDOWN_MAX_S, self.cooldown * 2)
+                self.open_until = time.monotonic() + self.cooldown
+                self.probing = False
+
+    def throttled(self, retry_after: float | None = None) -> None:
+        """429/418: multiplicative decrease, and hold off for Retry-After when given."""
+        with self._lock:
+            self.counts["throttled"] += 1
+            self.probing = False
+            self.rate = max(self.nominal * 0.05, self.rate * AIMD_DECREASE)
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                now = time.monotonic()
+                if retry_after > MAX_WAIT_S:
+                    self.open_until = max(self.open_until, now + retry_after)
+                else:
+                    self.not_before = max(self.not_before, now + retry_after)
+
+    def abandon(self) -> None:
+        """The call was cancelled before an outcome; free the half-open probe slot."""
+        with self._lock:
+            self.probing = False
+
+    def record_status(self, status: int, retry_after=None) -> None:
+        if status in (418, 429):
+            self.throttled(_retry_after(retry_after))
+        elif status >= 500:
+            self.failure()
+        else:
+            self.success()
+
+    # ---- introspection ----
+    def is_open(self) -> bool:
+        return time.monotonic() < self.open_until
+
+    def snapshot(self) -> dict:
+        return {"venue": self.venue, "rate": round(self.rate, 3), "nominal": self.nominal,
+                "open": self.is_open(), "fails": self.fails,
+                "open_for_s": round(max(0.0, self.open_until - time.monotonic()), 1), **self.counts}
+
+
+_controllers: dict[str, VenueController] = {}
+_lock = threading.Lock()
+
+
+def controller(venue: str) -> VenueController:
+    venue = (venue or "").lower()
+    c = _controllers.get(venue)
+    if c is None:
+        with _lock:
+            c = _controllers.setdefault(venue, VenueController(venue))
+    return c
+
+
+def venue_for_url(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return _HOSTS.get(host, host)
+
+
+def for_url(url: str) -> VenueController:
+    return controller(venue_for_url(url))
+
+
+def is_open(venue: str) -> bool:
+    return controller(venue).is_open()
+
+
+def backoff(attempt: int, base: float = 0.25, cap: float = 5.0) -> float:
+    """Full-jitter exponential backoff for retry loops."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def snapshot() -> dict[str, dict]:
+    return {v: c.snapshot() for v, c in list(_controllers.items())}